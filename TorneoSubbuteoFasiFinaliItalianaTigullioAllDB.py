@@ -14,7 +14,7 @@ import io
 import json
 import os
 import re
-import time
+import threading
 import uuid
 from datetime import datetime as dt, timedelta
 from io import BytesIO
@@ -24,10 +24,9 @@ import numpy as np
 import pandas as pd
 import pymongo
 import pytz
-import requests
 from bson import ObjectId
 from bson.json_util import dumps, loads
-from pymongo import MongoClient, server_api
+from pymongo import MongoClient, UpdateOne, server_api
 import urllib.parse
 from fpdf import FPDF
 import warnings
@@ -42,12 +41,20 @@ from shared.auth import login as auth
 # Importa moduli comuni per stili, audio e componenti UI
 from common.styles import inject_all_styles
 from common.audio import (
-    autoplay_background_audio, autoplay_audio,
+    autoplay_background_audio, riproduci_celebrazione,
     toggle_audio_callback, start_background_audio, setup_audio_sidebar
 )
+from common.classifica import calcola_classifica
+from common.rating import stato_vuoto, aggiorna_rating_da_db, ordina_per_rating
+from common.partite_torneo import CAMPO_LAYOUT, completa_calendario
+from common.risultati import upsert_incontri
+from common.tabellone import (
+    crea_tabellone, aggiorna_round, rounds_da_tabellone, turni_tabellone,
+    tabellone_da_calendario, tabellone_da_rounds
+)
 from common.ui_components import (
     render_tournament_header, setup_common_sidebar,
-    enable_session_keepalive
+    enable_session_keepalive, celebrazione_vittoria
 )
 
 def render_sidebar_collapse_workaround():
@@ -250,64 +257,13 @@ def tournament_is_complete(df: pd.DataFrame) -> tuple[bool, str]:
 def classifica_complessiva(df: pd.DataFrame) -> pd.DataFrame:
     """Calcola la classifica complessiva (tutte le partite validate), 2 punti vittoria / 1 pareggio."""
     columns = ['Pos', 'Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR']
-    partite = df[to_bool_series(df['Valida'])].copy()
-    partite['GolCasa'] = pd.to_numeric(partite['GolCasa'], errors='coerce').fillna(0).astype(int)
-    partite['GolOspite'] = pd.to_numeric(partite['GolOspite'], errors='coerce').fillna(0).astype(int)
-    
-    partite['Casa'] = partite['Casa'].astype(str).fillna('')
-    partite['Ospite'] = partite['Ospite'].astype(str).fillna('')
-    
-    squadre = pd.unique(partite[['Casa', 'Ospite']].values.ravel())
-    stats = {s: {'Punti':0,'V':0,'P':0,'S':0,'GF':0,'GS':0,'DR':0} for s in squadre}
-    
-    squadre_casa = set(partite['Casa'].unique())
-    squadre_ospite = set(partite['Ospite'].unique())
-    all_squadre = list(squadre_casa.union(squadre_ospite))
-    
-    stats = {s: {'Punti':0,'G':0,'V':0,'P':0,'S':0,'GF':0,'GS':0,'DR':0} for s in all_squadre}
-
-    for _, r in partite.iterrows():
-        casa, osp = r['Casa'], r['Ospite']
-        gc, go = int(r['GolCasa']), int(r['GolOspite'])
-        
-        # Gestisce i casi in cui una squadra potrebbe non aver giocato partite
-        if casa in stats:
-            stats[casa]['G'] += 1
-            stats[casa]['GF'] += gc; stats[casa]['GS'] += go
-        if osp in stats:
-            stats[osp]['G'] += 1
-            stats[osp]['GF'] += go; stats[osp]['GS'] += gc
-        
-        if gc > go:
-            if casa in stats:
-                stats[casa]['Punti'] += 2; stats[casa]['V'] += 1
-            if osp in stats:
-                stats[osp]['S'] += 1
-        elif gc < go:
-            if osp in stats:
-                stats[osp]['Punti'] += 2; stats[osp]['V'] += 1
-            if casa in stats:
-                stats[casa]['S'] += 1
-        else:
-            if casa in stats:
-                stats[casa]['Punti'] += 1
-            if osp in stats:
-                stats[osp]['Punti'] += 1
-
-        if casa in stats: stats[casa]['P'] += 1
-        if osp in stats: stats[osp]['P'] += 1
-
-    rows = []
-    for s, d in stats.items():
-        d['DR'] = d['GF'] - d['GS']
-        rows.append({'Squadra': s, **d})
-    dfc = pd.DataFrame(rows)
+    df = df.assign(Casa=df['Casa'].astype(str), Ospite=df['Ospite'].astype(str))
+    dfc = calcola_classifica(df, col_valida='Valida', spareggi=('Punti', 'DR', 'GF', 'V', 'Squadra'))
     if dfc.empty:
         return pd.DataFrame(columns=columns)
-    dfc = dfc.sort_values(by=['Punti','DR','GF','V','Squadra'], ascending=[False, False, False, False, True]).reset_index(drop=True)
-    dfc.index = dfc.index + 1
-    dfc.insert(0, 'Pos', dfc.index)
-    return dfc.reset_index(drop=True)
+    dfc['P'] = dfc['G']  # P = partite disputate
+    dfc.insert(0, 'Pos', range(1, len(dfc) + 1))
+    return dfc[columns]
 
 def serpentino_seed(squadre_ordinate: list[str], num_gironi: int) -> list[list[str]]:
     """Distribuzione 1..N a serpentina: G1,G2,...,Gk, poi Gk,...,G1, ecc."""
@@ -375,43 +331,14 @@ def standings_from_matches(df: pd.DataFrame, key_group: str) -> pd.DataFrame:
     """Classifica per gruppi su DataFrame con colonne: key_group, Casa, Ospite, GolCasa, GolOspite, Valida"""
     if df.empty:
         return pd.DataFrame()
-    partite = df[to_bool_series(df['Valida'])].copy()
-    if partite.empty:
-        return pd.DataFrame()
-    partite['GolCasa'] = pd.to_numeric(partite['GolCasa'], errors='coerce').fillna(0).astype(int)
-    partite['GolOspite'] = pd.to_numeric(partite['GolOspite'], errors='coerce').fillna(0).astype(int)
-    
-    partite['Casa'] = partite['Casa'].astype(str).fillna('')
-    partite['Ospite'] = partite['Ospite'].astype(str).fillna('')
-    
-    out = []
-    for gruppo, blocco in partite.groupby(key_group):
-        blocco['Casa'] = blocco['Casa'].astype(str).fillna('')
-        blocco['Ospite'] = blocco['Ospite'].astype(str).fillna('')
-        
-        squadre = pd.unique(blocco[['Casa','Ospite']].values.ravel())
-        stats = {s: {'Punti':0,'G':0,'V':0,'P':0,'S':0,'GF':0,'GS':0,'DR':0} for s in squadre}
-        for _, r in blocco.iterrows():
-            c, o = r['Casa'], r['Ospite']
-            gc, go = int(r['GolCasa']), int(r['GolOspite'])
-            stats[c]['G'] += 1; stats[o]['G'] += 1
-            stats[c]['GF'] += gc; stats[c]['GS'] += go
-            stats[o]['GF'] += go; stats[o]['GS'] += gc
-            if gc > go:
-                stats[c]['Punti'] += 2; stats[c]['V'] += 1; stats[o]['S'] += 1
-            elif gc < go:
-                stats[o]['Punti'] += 2; stats[o]['V'] += 1; stats[c]['S'] += 1
-            else:
-                stats[c]['Punti'] += 1; stats[o]['Punti'] += 1
-            stats[c]['P'] += 1; stats[o]['P'] += 1
-        for s, d in stats.items():
-            d['DR'] = d['GF'] - d['GS']
-            out.append({'Gruppo': gruppo, 'Squadra': s, **d})
-    dfc = pd.DataFrame(out)
+    df = df.assign(Casa=df['Casa'].astype(str), Ospite=df['Ospite'].astype(str))
+    dfc = calcola_classifica(df, gruppo=key_group, col_valida='Valida',
+                             spareggi=('Punti', 'DR', 'GF', 'V', 'Squadra'))
     if dfc.empty:
-        return dfc
-    dfc = dfc.sort_values(by=['Gruppo','Punti','DR','GF','V','Squadra'], ascending=[True,False,False,False,False,True])
-    return dfc.reset_index(drop=True)
+        return pd.DataFrame()
+    dfc['P'] = dfc['G']  # P = partite disputate
+    dfc = dfc.rename(columns={key_group: 'Gruppo'})
+    return dfc[['Gruppo', 'Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR']]
 
 # ==============================================================================
 # 📄 FUNZIONI PER EXPORT PDF
@@ -926,11 +853,25 @@ def render_round(df_round, round_idx, modalita_visualizzazione="squadre"):
         st.session_state['rounds_ko'][round_idx] = df_round.copy()
 
 def render_visual_bracket(rounds_ko, modalita_visualizzazione="squadre"):
-    """Renderizza un tabellone a eliminazione diretta (bracket) in HTML/CSS."""
+    """
+    Renderizza un tabellone a eliminazione diretta (bracket) in HTML/CSS.
+    Accetta il tabellone persistente (dict `tabellone_ko`, mostra anche i turni futuri)
+    oppure la lista di DataFrame dei turni KO.
+    """
     if not rounds_ko:
         return
+
+    if isinstance(rounds_ko, dict):
+        turni = turni_tabellone(rounds_ko)
+    else:
+        turni = [
+            (df_round['Round'].iloc[0] if not df_round.empty else f"Turno {round_idx+1}", df_round.to_dict('records'))
+            for round_idx, df_round in enumerate(rounds_ko)
+        ]
         
     def parse_team_player(val):
+        if val is None or (not isinstance(val, str) and pd.isna(val)):
+            return "", ""
         if isinstance(val, str) and "-" in val:
             squadra, giocatore = val.split("-", 1)
             return squadra.strip(), giocatore.strip()
@@ -1018,11 +959,10 @@ def render_visual_bracket(rounds_ko, modalita_visualizzazione="squadre"):
 <div class="bracket-container">
 '''
     
-    for round_idx, df_round in enumerate(rounds_ko):
-        round_name = df_round['Round'].iloc[0] if not df_round.empty else f"Turno {round_idx+1}"
+    for round_idx, (round_name, partite) in enumerate(turni):
         html += f'<div class="bracket-column" id="round-{round_idx}">'
         html += f'<div style="text-align:center; font-weight:800; margin-bottom:10px; opacity:0.7;">{round_name.upper()}</div>'
-        for _, match in df_round.iterrows():
+        for match in partite:
             squadra_a, giocatore_a = parse_team_player(match['SquadraA'])
             squadra_b, giocatore_b = parse_team_player(match['SquadraB'])
             
@@ -1031,9 +971,9 @@ def render_visual_bracket(rounds_ko, modalita_visualizzazione="squadre"):
             if not nome_a: nome_a = "TBD"
             if not nome_b: nome_b = "TBD"
             
-            valida = bool(match.get('Valida', False))
-            gol_a = int(match['GolA']) if pd.notna(match['GolA']) and valida else ""
-            gol_b = int(match['GolB']) if pd.notna(match['GolB']) and valida else ""
+            valida = bool(match.get('Valida') or False)
+            gol_a = int(match['GolA']) if pd.notna(match.get('GolA')) and valida else ""
+            gol_b = int(match['GolB']) if pd.notna(match.get('GolB')) and valida else ""
             
             win_a = valida and (gol_a > gol_b)
             win_b = valida and (gol_b > gol_a)
@@ -1053,9 +993,9 @@ def render_visual_bracket(rounds_ko, modalita_visualizzazione="squadre"):
         html += '</div>'
     
     # Check if there is a final winner
-    if rounds_ko:
-        last_round = rounds_ko[-1]
-        last_match = last_round.iloc[0] if not last_round.empty else None
+    if turni:
+        last_round = turni[-1][1]
+        last_match = last_round[0] if len(last_round) == 1 else None
         if last_match is not None and last_match.get('Valida', False):
             try:
                 gol_a = float(last_match['GolA'])
@@ -1087,7 +1027,7 @@ def reset_fase_finale():
     keys = [
         'fase_scelta','gironi_num','gironi_ar','gironi_seed',
         'df_finale_gironi','girone_sel','giornata_sel',
-        'round_corrente','rounds_ko','seeds_ko','n_inizio_ko',
+        'round_corrente','rounds_ko','tabellone_ko','seeds_ko','n_inizio_ko',
         'giornate_mode', 'tournament_name_raw', 'filter_player', 'filter_girone',
         'df_torneo_preliminare'
     ]
@@ -1131,6 +1071,33 @@ def init_mongo_connection(uri, db_name, collection_name, show_ok: bool = False):
         return None
 
 
+@st.cache_resource
+def _motore_rating_elo():
+    """Stato del motore Elo condiviso tra le sessioni (aggiornato in modo incrementale)."""
+    return {"stato": stato_vuoto(), "lock": threading.Lock()}
+
+
+def carica_rating_elo() -> dict:
+    """
+    Rating Elo dei giocatori sullo storico completo (Italiana, Fasi Finali e Svizzero).
+    Ad ogni chiamata vengono letti dal DB solo i tornei modificati dall'ultimo aggiornamento.
+
+    Returns:
+        {giocatore: elo}
+    """
+    motore = _motore_rating_elo()
+    with motore["lock"]:
+        try:
+            collections_italiana = [init_mongo_connection(st.secrets["MONGO_URI_TOURNEMENTS"], db_name, col_name)]
+            collections_svizzero = []
+            if st.secrets.get("MONGO_URI"):
+                collections_svizzero.append(init_mongo_connection(st.secrets["MONGO_URI"], db_name, f"{col_name}Svizzero"))
+            aggiorna_rating_da_db(motore["stato"], collections_italiana, collections_svizzero)
+        except Exception as e:
+            st.warning(f"⚠️ Rating Elo non aggiornato: {e}")
+        return dict(motore["stato"]["rating"])
+
+
 # ------------------------------------------------------------------------------
 # 🛰️ Gestione automatica del parametro `?torneo=` in query string (con debug)
 # ------------------------------------------------------------------------------
@@ -1280,7 +1247,9 @@ def carica_torneo_da_db(tournaments_collection, tournament_id):
     if tournaments_collection is None:
         return None
     try:
-        torneo_data = tournaments_collection.find_one({"_id": ObjectId(tournament_id)})
+        torneo_data = completa_calendario(
+            tournaments_collection, tournaments_collection.find_one({"_id": ObjectId(tournament_id)})
+        )
         if torneo_data and 'calendario' in torneo_data:
             # Assicurati che l'ID del torneo sia incluso nei dati restituiti
             torneo_data['_id'] = str(torneo_data['_id'])  # Converti ObjectId in stringa
@@ -1312,6 +1281,45 @@ def aggiorna_torneo_su_db(tournaments_collection, tournament_id, df_torneo):
         st.error(f"❌ Errore aggiornamento torneo: {e}")
         return False
 
+KO_CHIAVI = ['Girone', 'Giornata', 'Casa', 'Ospite']
+KO_COLONNE = ['GolCasa', 'GolOspite', 'Valida', 'GiocatoreCasa', 'GiocatoreOspite', 'Vincitore']
+
+def aggiorna_incontri_su_db(tournaments_collection, tournament_id, df_modificati, df_aggiunti, campi_extra=None):
+    """
+    Invia a MongoDB solo gli incontri KO cambiati, senza riscrivere tutto il calendario.
+    Le righe esistenti sono aggiornate per chiave (arrayFilters su Girone/Giornata/Casa/Ospite),
+    quelle nuove accodate con $push; il tutto in un unico bulk_write.
+    campi_extra: eventuali campi di primo livello da aggiornare insieme (es. tabellone_ko).
+    """
+    if tournaments_collection is None:
+        return False
+    try:
+        filtro = {"_id": ObjectId(tournament_id)}
+        now = datetime.now()
+        operazioni = [UpdateOne(filtro, {"$set": {**(campi_extra or {}), "data_modifica": now}})]
+
+        modificati = df_modificati.where(pd.notna(df_modificati), None).to_dict('records')
+        if modificati:
+            set_fields = {}
+            array_filters = []
+            for i, riga in enumerate(modificati):
+                ident = f"m{i}"
+                array_filters.append({f"{ident}.{k}": riga[k] for k in KO_CHIAVI})
+                for col in KO_COLONNE:
+                    if col in riga:
+                        set_fields[f"calendario.$[{ident}].{col}"] = riga[col]
+            operazioni.append(UpdateOne(filtro, {"$set": set_fields}, array_filters=array_filters))
+
+        aggiunti = df_aggiunti.where(pd.notna(df_aggiunti), None).to_dict('records')
+        if aggiunti:
+            operazioni.append(UpdateOne(filtro, {"$push": {"calendario": {"$each": aggiunti}}}))
+
+        tournaments_collection.bulk_write(operazioni, ordered=True)
+        return True
+    except Exception as e:
+        st.error(f"❌ Errore aggiornamento torneo: {e}")
+        return False
+
 def clona_torneo_su_db(tournaments_collection, source_id, new_name):
     """Clona un torneo esistente su MongoDB, gli assegna un nuovo nome e ne ripulisce il calendario."""
     if tournaments_collection is None:
@@ -1327,6 +1335,7 @@ def clona_torneo_su_db(tournaments_collection, source_id, new_name):
         source_data.pop('_id')
         source_data['nome_torneo'] = new_name
         source_data['calendario'] = []
+        source_data.pop(CAMPO_LAYOUT, None)
         source_data['data_creazione'] = now
         source_data['data_modifica'] = now
         result = tournaments_collection.insert_one(source_data)
@@ -1439,25 +1448,20 @@ def salva_risultati_ko():
     df_ko_da_salvare['Girone'] = 'Eliminazione Diretta'
     df_ko_da_salvare['Giornata'] = len(st.session_state['rounds_ko'])
 
-    df_final_torneo = st.session_state.get('df_torneo_preliminare', pd.DataFrame()).copy()
-
-    # Aggiorna solo le righe KO già presenti (Girone, Giornata, Casa, Ospite)
-    for idx, row in df_ko_da_salvare.iterrows():
-        mask = (
-            (df_final_torneo['Girone'] == row['Girone']) &
-            (df_final_torneo['Giornata'] == row['Giornata']) &
-            (df_final_torneo['Casa'] == row['Casa']) &
-            (df_final_torneo['Ospite'] == row['Ospite'])
-        )
-        if mask.any():
-            # Aggiorna la riga esistente
-            for col in ['GolCasa', 'GolOspite', 'Valida', 'GiocatoreCasa', 'GiocatoreOspite', 'Vincitore']:
-                df_final_torneo.loc[mask, col] = row[col]
-        else:
-            # Se non esiste, aggiungi la riga (caso raro)
-            df_final_torneo = pd.concat([df_final_torneo, pd.DataFrame([row])], ignore_index=True)
+    # Registra i risultati nel tabellone persistente: i vincitori avanzano tramite i puntatori agli slot
+    tabellone = st.session_state.get('tabellone_ko') or tabellone_da_rounds(st.session_state['rounds_ko'])
+    aggiorna_round(tabellone, current_round_idx, current_round_df)
+    st.session_state['tabellone_ko'] = tabellone
+
+    # Upsert per chiave (Girone, Giornata, Casa, Ospite): aggiorna le righe KO presenti e accoda le nuove
+    df_final_torneo, df_ko_modificati, df_ko_aggiunti = upsert_incontri(
+        st.session_state.get('df_torneo_preliminare', pd.DataFrame()),
+        df_ko_da_salvare,
+        KO_CHIAVI,
+        KO_COLONNE
+    )
     
-    if aggiorna_torneo_su_db(tournaments_collection, st.session_state['tournament_id'], df_final_torneo):
+    if aggiorna_incontri_su_db(tournaments_collection, st.session_state['tournament_id'], df_ko_modificati, df_ko_aggiunti, {"tabellone_ko": tabellone}):
         username = st.session_state.get('user', {}).get('username', 'sconosciuto')
         round_name = st.session_state.get('round_corrente', 'Round sconosciuto')
         
@@ -1490,36 +1494,12 @@ def salva_risultati_ko():
     else:
         st.error("❌ Errore nel salvataggio su DB.")
     
-    if len(winners) > 1:
-        if len(winners) == 32:
-            next_round_name = "Sedicesimi di finale"
-        elif len(winners) == 16:
-            next_round_name = "Ottavi di finale"
-        elif len(winners) == 8:
-            next_round_name = "Quarti di finale"
-        elif len(winners) == 4:
-            next_round_name = "Semifinali"
-        elif len(winners) == 2:
-            next_round_name = "Finale"
-    
-        next_matches = []
-        
-        # Uso la player map salvata in session_state per i prossimi round
-        player_map = st.session_state.get('player_map', {})
-
-        for i in range(0, len(winners), 2):
-            winner_a = winners[i]
-            winner_b = winners[i+1]
-            next_matches.append({
-                'Round': next_round_name,
-                'Match': (i // 2) + 1,
-                'SquadraA': winner_a,
-                'GiocatoreA': player_map.get(winner_a, ''),
-                'SquadraB': winner_b,
-                'GiocatoreB': player_map.get(winner_b, ''),
-                'GolA': None, 'GolB': None, 'Valida': False, 'Vincitore': None
-            })
-        st.session_state['rounds_ko'].append(pd.DataFrame(next_matches))
+    rounds_tabellone = rounds_da_tabellone(tabellone)
+    if len(winners) > 1 and len(rounds_tabellone) > current_round_idx + 1:
+        # Il turno successivo è già popolato nel tabellone (vincitori avanzati negli slot)
+        df_next_round = rounds_tabellone[current_round_idx + 1]
+        next_round_name = df_next_round['Round'].iloc[0]
+        st.session_state['rounds_ko'].append(df_next_round)
         st.session_state['round_corrente'] = next_round_name
         
         # Log della generazione del nuovo round
@@ -1539,37 +1519,14 @@ def salva_risultati_ko():
         st.success(f"Prossimo turno: {next_round_name} generato!")
     
     elif len(winners) == 1 and st.session_state.get('round_corrente') == "Finale":
-        st.balloons()
         #st.success(f"🏆 Il torneo è finito! Il vincitore è: {winners[0]}")
         # Salva il vincitore nella session_state
         st.session_state['vincitore_torneo'] = winners[0]
         
-        # we are the champions
-        # Codice corretto per scaricare l'audio dall'URL
-        audio_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
-        #audio_url = "./wearethechamp.mp3"
-        try:
-            response = requests.get(audio_url, timeout=10) # Imposta un timeout
-            response.raise_for_status() # Lancia un'eccezione per risposte HTTP errate
-            autoplay_audio(response.content)
-        except requests.exceptions.RequestException as e:
-            st.error(f"Errore durante lo scaricamento dell'audio: {e}")
-
-        # Crea un contenitore vuoto per i messaggi
-        placeholder = st.empty()
-
-        # Lancia i palloncini in un ciclo per 3 secondi
-        with placeholder.container():
-            st.balloons()
-            time.sleep(1) # Aspetta 1 secondo
-        
-        with placeholder.container():
-            st.balloons()
-            time.sleep(1) # Aspetta 1 secondo
-        
-        with placeholder.container():
-            st.balloons()
-            time.sleep(1) # Aspetta 1 secondo
+        # we are the champions (file statico, scaricato dal browser)
+        riproduci_celebrazione()
+        # Palloncini temporizzati nel browser, senza bloccare lo script
+        celebrazione_vittoria()
         
         
         if not st.session_state['tournament_name'].startswith('finito_'):
@@ -1577,32 +1534,23 @@ def salva_risultati_ko():
             
             # --- AGGIORNAMENTO PALMARES SUPERBA ---
             try:
-                from palmares_utils import register_win
-                from pymongo import MongoClient
-                import certifi
-                # Connessione al DB giocatori (Tigullio_players)
-                client_pl = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                db_pl = client_pl["giocatori_subbuteo"]
-                players_col_pl = db_pl["tigullio_players"]
+                from palmares_utils import register_wins, get_players_collection
                 
                 vincitore = winners[0] # Il vincitore è già estratto qui
                 
-                register_win(
-                    db_players_col=players_col_pl,
-                    winner_name=vincitore,
-                    tournament_name=st.session_state['tournament_name'],
-                    tournament_type="fasi_finali",
-                    mode_fasi_finali="eliminazione_diretta"
-                )
+                # Client condiviso (cached) sul DB giocatori (Tigullio_players)
+                register_wins([{
+                    "winner_name": vincitore,
+                    "tournament_name": st.session_state['tournament_name'],
+                    "tournament_type": "fasi_finali",
+                    "mode_fasi_finali": "eliminazione_diretta"
+                }], get_players_collection("Tigullio"))
             except Exception as e:
                 print(f"[PALMARES] Errore: {e}")
             # --- FINE PALMARES ---
 
             rinomina_torneo_su_db(tournaments_collection, st.session_state['tournament_id'], nuovo_nome)
             st.session_state['tournament_name'] = nuovo_nome
-            
-    time.sleep(1)
-    #st.rerun()
 
 # ==============================================================================
 # 🚀 LOGICA APPLICAZIONE PRINCIPALE
@@ -1720,21 +1668,8 @@ def main():
                     🏆 Il vincitore del torneo è {st.session_state['vincitore_torneo']}! 🎉
                  </div>
                  """, unsafe_allow_html=True)                        
-            st.balloons()
-            try:
-                import requests
-                audio_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
-                response = requests.get(audio_url, timeout=10) 
-                response.raise_for_status() 
-                autoplay_audio(response.content)
-            except Exception:
-                pass
-            placeholder_c = st.empty()
-            for _ in range(3):
-                import time
-                with placeholder_c.container():
-                    st.balloons()
-                    time.sleep(1)
+            riproduci_celebrazione()
+            celebrazione_vittoria()
     # ✅ Configurazione Sidebar (Modulo Comune)
     # L'audio e le info utente sono ora gestiti internamente ai componenti comuni
     _, sidebar_button_col = st.columns([1, 0.18])
@@ -2061,7 +1996,10 @@ def main():
                                 
                                 # Carica il torneo preliminare per ottenere i nomi dei giocatori
                                 base_name = get_base_name(st.session_state['tournament_name'])
-                                preliminary_data = tournaments_collection.find_one({"nome_torneo": f"completato_{base_name}"})
+                                preliminary_data = completa_calendario(
+                                    tournaments_collection,
+                                    tournaments_collection.find_one({"nome_torneo": f"completato_{base_name}"})
+                                )
                                 
                                 if preliminary_data and 'calendario' in preliminary_data:
                                     df_preliminary = pd.DataFrame(preliminary_data['calendario'])
@@ -2085,37 +2023,17 @@ def main():
                                 #if is_ko_tournament:
                                 if is_ko_tournament:
                                     st.session_state['ko_setup_complete'] = True
-                                    df_ko_esistente = df_torneo_completo[df_torneo_completo['Girone'] == 'Eliminazione Diretta'].copy()
-                                    
-                                    # Aggiungi i nomi dei giocatori al dataframe KO
-                                    df_ko_esistente['GiocatoreCasa'] = df_ko_esistente['Casa'].map(st.session_state['player_map'])
-                                    df_ko_esistente['GiocatoreOspite'] = df_ko_esistente['Ospite'].map(st.session_state['player_map'])
-
-                                    # Ricostruzione rounds_ko senza duplicati
-                                    rounds_list = []
-                                    accoppiamenti_visti = set()
-                                    for r in sorted(df_ko_esistente['Giornata'].unique()):
-                                        df_round = df_ko_esistente[df_ko_esistente['Giornata'] == r].copy()
-                                        df_round.rename(columns={'Casa': 'SquadraA', 'Ospite': 'SquadraB', 'GolCasa': 'GolA', 'GolOspite': 'GolB', 'GiocatoreCasa': 'GiocatoreA', 'GiocatoreOspite': 'GiocatoreB'}, inplace=True)
-                                        # Crea una tupla ordinata degli accoppiamenti per questo round
-                                        accoppiamenti = tuple(sorted((row['SquadraA'], row['SquadraB']) for _, row in df_round.iterrows()))
-                                        if accoppiamenti in accoppiamenti_visti:
-                                            continue  # Salta round duplicato
-                                        accoppiamenti_visti.add(accoppiamenti)
-                                        # Determine round name based on the number of matches
-                                        num_matches = len(df_round)
-                                        if num_matches == 16: round_name = "Sedicesimi di finale"
-                                        elif num_matches == 8: round_name = "Ottavi di finale"
-                                        elif num_matches == 4: round_name = "Quarti di finale"
-                                        elif num_matches == 2: round_name = "Semifinali"
-                                        elif num_matches == 1: round_name = "Finale"
-                                        else: round_name = f"Round {int(r)}"
-                                        df_round['Round'] = round_name
-                                        df_round['Match'] = range(1, len(df_round) + 1)
-                                        df_round['Vincitore'] = df_round.apply(lambda row: row['SquadraA'] if pd.notna(row['GolA']) and row['GolA'] > row['GolB'] else row['SquadraB'] if pd.notna(row['GolB']) and row['GolB'] > row['GolA'] else None, axis=1)
-                                        rounds_list.append(df_round)
-
-                                    # Ricostruisci la lista completa dei round KO senza duplicati
+                                    # Tabellone persistente: lettura diretta O(incontri), nessuna ricostruzione
+                                    tabellone = torneo_data.get('tabellone_ko')
+                                    if not tabellone:
+                                        # Tornei salvati prima del tabellone: ricostruzione una tantum dal calendario piatto
+                                        df_ko_esistente = df_torneo_completo[df_torneo_completo['Girone'] == 'Eliminazione Diretta'].copy()
+                                        df_ko_esistente['GiocatoreCasa'] = df_ko_esistente['Casa'].map(st.session_state['player_map'])
+                                        df_ko_esistente['GiocatoreOspite'] = df_ko_esistente['Ospite'].map(st.session_state['player_map'])
+                                        tabellone = tabellone_da_calendario(df_ko_esistente)
+
+                                    st.session_state['tabellone_ko'] = tabellone
+                                    rounds_list = rounds_da_tabellone(tabellone) if tabellone else []
                                     st.session_state['rounds_ko'] = rounds_list
                                     
                                     # Trova l'ultimo turno non validato, o l'ultimissimo turno se tutti sono validati
@@ -2209,6 +2127,16 @@ def main():
                     # Ottieni le squadre qualificate in ordine di classifica
                     qualificati = list(df_classifica.head(num_partecipanti_gironi)['Squadra'])
                     
+                    distribuzione = "Per classifica"
+                    if num_gironi > 1:
+                        distribuzione = st.radio(
+                            "Distribuzione automatica nei gironi:",
+                            ["Per classifica", "Serpentina per rating Elo"],
+                            horizontal=True,
+                            help="La serpentina ordina le qualificate per rating Elo storico dei giocatori "
+                                 "e le distribuisce G1, G2, ..., Gk, Gk, ..., G1 per gironi equilibrati."
+                        )
+                    
                     # Calcola quante squadre per girone (arrotondando per eccesso)
                     squadre_per_girone = (num_partecipanti_gironi + num_gironi - 1) // num_gironi
                     
@@ -2231,9 +2159,24 @@ def main():
                                 gironi_auto[f'Girone {girone_idx + 1}'].append(qualificati[idx_squadra])
                                 idx_squadra += 1
                     
+                    if distribuzione == "Serpentina per rating Elo":
+                        giocatori_qualificati = (
+                            df_classifica.set_index('Squadra')['Giocatore'].dropna().to_dict()
+                            if 'Giocatore' in df_classifica.columns else {}
+                        )
+                        ordinati = ordina_per_rating(qualificati, carica_rating_elo(), giocatori_qualificati)
+                        gironi_auto = {
+                            f'Girone {i + 1}': squadre
+                            for i, squadre in enumerate(serpentino_seed(ordinati, num_gironi))
+                        }
+                    
                     # Inizializza i gironi nella sessione se non esistono o se è cambiato il numero di gironi
-                    if 'gironi_manuali' not in st.session_state or len(st.session_state.gironi_manuali) != num_gironi:
+                    # o il criterio di distribuzione automatica
+                    if ('gironi_manuali' not in st.session_state
+                            or len(st.session_state.gironi_manuali) != num_gironi
+                            or st.session_state.get('gironi_distribuzione') != distribuzione):
                         st.session_state.gironi_manuali = gironi_auto
+                        st.session_state.gironi_distribuzione = distribuzione
                     
                     # Mostra la composizione manuale solo se c'è più di un girone
                     if num_gironi > 1:
@@ -2392,6 +2335,7 @@ def main():
                         df_initial_round['Vincitore'] = None
 
                         st.session_state['rounds_ko'] = [df_initial_round]
+                        st.session_state['tabellone_ko'] = crea_tabellone(df_initial_round)
                         st.session_state['giornate_mode'] = 'ko'
                     
                         df_to_save_initial = df_initial_round.rename(columns={'SquadraA': 'Casa', 'SquadraB': 'Ospite', 'GolA': 'GolCasa', 'GolB': 'GolOspite', 'GiocatoreA': 'GiocatoreCasa', 'GiocatoreB': 'GiocatoreOspite'})
@@ -2415,6 +2359,7 @@ def main():
                                 {"$set": {
                                     "phase_metadata": {"phase_id": phase_id, "phase_mode": "KO"},
                                     "calendario": df_final_torneo.to_dict('records'),
+                                    "tabellone_ko": st.session_state['tabellone_ko'],
                                     "data_modifica": datetime.now()
                                 }}
                             )
@@ -2501,7 +2446,7 @@ def main():
 
                     visualizzazione_preferita = st.session_state.get("modalita_visualizzazione_ko", "squadre")
                     with st.expander("Tabellone", expanded=False):
-                        render_visual_bracket(st.session_state['rounds_ko'], visualizzazione_preferita)
+                        render_visual_bracket(st.session_state.get('tabellone_ko') or st.session_state['rounds_ko'], visualizzazione_preferita)
                     
                     #inizio
                     if st.session_state.get('show_all_ko_matches', False):
@@ -12,7 +12,6 @@ import pandas as pd
 import numpy as np
 import json
 import os
-import time
 import datetime
 import pytz
 from datetime import datetime, timedelta
@@ -26,7 +25,6 @@ import hmac
 import base64
 import urllib.parse
 import urllib3
-import requests
 import io
 from PIL import Image
 import base64
@@ -56,14 +54,27 @@ from shared.auth import verify_write_access
 # Importa moduli comuni per stili, audio e componenti UI
 from common.styles import inject_all_styles
 from common.audio import (
-    autoplay_background_audio, autoplay_audio, 
+    autoplay_background_audio, riproduci_celebrazione,
     toggle_audio_callback, start_background_audio, setup_audio_sidebar
 )
 from common.ui_components import (
     render_tournament_header, setup_common_sidebar, 
     setup_player_selection_mode, navigation_buttons,
-    enable_session_keepalive
+    enable_session_keepalive, celebrazione_vittoria
 )
+from common.risultati import aggiorna_risultati, applica_abbandoni
+from common.classifica import calcola_classifica, to_bool_series
+from common.coda_offline import (
+    CodaOffline, ReplayerCoda, percorso_coda, STATO_IN_ATTESA, STATO_CONFLITTO, errore_di_connessione
+)
+from common.concorrenza import CAMPO_REV, salva_calendario_versionato, modifiche_sessione, unisci_modifiche
+from common.partite_torneo import (
+    CAMPO_LAYOUT, CAMPO_TORNEO, SUFFISSO_COLLECTION, collection_partite, usa_collection_partite,
+    completa_calendario, leggi_partite, partite_modificate, salva_partite_modificate
+)
+from common.osservatore_tornei import osservatore_torneo
+from common.vista_pubblica import snapshot_html
+from common.qualificazione import N_SIMULAZIONI, probabilita_qualificazione
 
 
 def render_sidebar_collapse_workaround():
@@ -395,10 +406,44 @@ def mostra_avviso_landscape():
 # -------------------------
 # FUNZIONI CONNESSIONE MONGO (SENZA SUCCESS VERDI)
 # -------------------------
+DB_TORNEI = "TorneiSubbuteo"
+COLLECTION_TORNEI = "PierCrew"
+# Secondi tra due controlli dei risultati salvati da altri dispositivi
+INTERVALLO_AGGIORNAMENTO_LIVE = 5
+# Tabellone pubblico: ?torneo=<nome>&view=board
+VISTA_PUBBLICA = "board"
+CAMPI_VISTA_PUBBLICA = ("nome_torneo", "calendario", "tabellone_ko", "data_modifica", CAMPO_LAYOUT)
+
+
+def _crea_italiana_client(uri):
+    """Client MongoDB con timeout brevi: senza rete il salvataggio passa subito alla coda locale."""
+    return MongoClient(uri, server_api=ServerApi('1'), connectTimeoutMS=5000, serverSelectionTimeoutMS=5000)
+
+
 @st.cache_resource
 def _get_italiana_client(uri):
     """Crea e cache il client MongoDB per evitare riconnessioni ad ogni rerun."""
-    return MongoClient(uri, server_api=ServerApi('1'))
+    return _crea_italiana_client(uri)
+
+
+@st.cache_resource
+def coda_offline():
+    """Journal locale dei salvataggi di questa app e club e relativo replayer in background (uno per processo)."""
+    coda = CodaOffline(percorso_coda("italiana", COLLECTION_TORNEI))
+    uri = st.secrets.get("MONGO_URI_TOURNEMENTS")
+    replayer = ReplayerCoda(coda, lambda: _crea_italiana_client(uri))
+    replayer.start()
+    return coda, replayer
+
+
+def mostra_stato_coda_offline():
+    """Segnala nella sidebar i salvataggi in attesa di sincronizzazione o in conflitto."""
+    conteggi = coda_offline()[0].conteggi()
+    if conteggi[STATO_IN_ATTESA]:
+        st.sidebar.warning(f"📴 {conteggi[STATO_IN_ATTESA]} salvataggi in attesa di sincronizzazione")
+    if conteggi[STATO_CONFLITTO]:
+        st.sidebar.error(f"⚠️ {conteggi[STATO_CONFLITTO]} salvataggi offline non applicati: "
+                         "il torneo è stato modificato da un'altra sessione. Ricarica e verifica i risultati.")
 
 def init_mongo_connection(uri, db_name, collection_name, show_ok: bool = False):
     """
@@ -463,21 +508,129 @@ def carica_tornei_da_db(tournaments_collection):
         st.error(f"❌ Errore caricamento tornei: {e}")
         return []
 
+def calendario_da_records(calendario):
+    """DataFrame del calendario con i tipi usati dall'app (Valida bool, gol Int64)."""
+    df_torneo = pd.DataFrame(calendario)
+    df_torneo['Valida'] = df_torneo['Valida'].astype(bool)
+    # Pulisci e converti esplicitamente
+    df_torneo['GolCasa'] = pd.to_numeric(df_torneo['GolCasa'], errors='coerce')
+    df_torneo['GolOspite'] = pd.to_numeric(df_torneo['GolOspite'], errors='coerce')
+    df_torneo = df_torneo.fillna(0)
+    df_torneo['GolCasa'] = df_torneo['GolCasa'].astype('Int64')
+    df_torneo['GolOspite'] = df_torneo['GolOspite'].astype('Int64')
+    return df_torneo
+
+def calendario_a_records(df_torneo):
+    """Lista di record del calendario pronta per MongoDB (NaN -> None)."""
+    return df_torneo.where(pd.notna(df_torneo), None).to_dict('records')
+
+def sincronizza_calendario_sessione(df_torneo, rev, data_modifica, base=None):
+    """
+    Registra nella sessione la versione del calendario presente sul DB: è la base da cui
+    vengono calcolate le partite modificate al salvataggio successivo.
+    Se `base` non è indicata, il calendario della sessione coincide con quello del DB.
+    """
+    st.session_state['df_torneo'] = df_torneo
+    st.session_state['calendario_base'] = base if base is not None else calendario_a_records(df_torneo)
+    st.session_state['rev_torneo'] = rev
+    # Versione di partenza per il controllo dei conflitti dei salvataggi offline
+    st.session_state['data_modifica_torneo'] = data_modifica
+
+def dimentica_widget_partite(chiavi):
+    """Rimuove lo stato dei widget delle partite indicate: verranno ridisegnati con i valori del DB."""
+    suffissi = tuple(f"_{girone}_{giornata}_{casa}_{ospite}" for girone, giornata, casa, ospite in chiavi)
+    if not suffissi:
+        return
+    for chiave in list(st.session_state.keys()):
+        if (isinstance(chiave, str) and chiave.endswith(suffissi)
+                and any(p in chiave for p in ("golcasa_", "golospite_", "valida_"))):
+            del st.session_state[chiave]
+
+@st.fragment(run_every=INTERVALLO_AGGIORNAMENTO_LIVE)
+def aggiornamenti_live(tournaments_collection, tournament_id):
+    """
+    Porta nella sessione i risultati salvati da altri dispositivi, senza interazione.
+
+    Legge la copia condivisa dell'osservatore del torneo (un solo thread per processo
+    segue il DB), quindi ogni tick costa solo un confronto di revisione.
+    """
+    _, documento = osservatore_torneo(tournaments_collection, ObjectId(tournament_id)).istantanea()
+    if not documento or documento.get(CAMPO_REV, 0) <= st.session_state.get('rev_torneo', 0):
+        return
+    base = st.session_state.get('calendario_base', [])
+    # Modifiche della sessione non ancora sul DB (es. salvataggi in coda offline)
+    proprie = modifiche_sessione(base, calendario_a_records(st.session_state['df_torneo']))
+    if st.session_state.get('layout_partite'):
+        partite_remote = leggi_partite(tournaments_collection, ObjectId(tournament_id))
+    else:
+        partite_remote = documento.get('calendario', [])
+    remoto = calendario_a_records(calendario_da_records(partite_remote))
+    cambiate = modifiche_sessione(base, remoto)
+    sincronizza_calendario_sessione(
+        calendario_da_records(unisci_modifiche(remoto, proprie)),
+        documento.get(CAMPO_REV, 0), documento.get('data_modifica'), base=remoto
+    )
+    dimentica_widget_partite(cambiate.keys() - proprie.keys())
+    st.rerun()
+
+def _collection_tornei():
+    return _get_italiana_client(st.secrets["MONGO_URI_TOURNEMENTS"])[DB_TORNEI][COLLECTION_TORNEI]
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _id_torneo_pubblico(nome_torneo):
+    """_id (stringa) del torneo più recente con il nome indicato, None se non esiste."""
+    torneo = _collection_tornei().find_one({"nome_torneo": nome_torneo}, {"_id": 1}, sort=[("data_modifica", -1)])
+    return str(torneo["_id"]) if torneo else None
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _snapshot_vista_pubblica(tournament_id, data_modifica, _documento):
+    """HTML del tabellone pubblico, calcolato una volta per versione (data_modifica) del torneo."""
+    # Tornei migrati: le partite si leggono qui, solo quando cambia la versione
+    return snapshot_html(completa_calendario(_collection_tornei(), dict(_documento)))
+
+@st.fragment(run_every=INTERVALLO_AGGIORNAMENTO_LIVE)
+def _controlla_versione_pubblica(osservatore, versione):
+    """Ricarica la pagina solo quando l'osservatore ha una nuova versione del torneo."""
+    if osservatore.istantanea()[0] != versione:
+        st.rerun()
+
+def mostra_vista_pubblica(nome_torneo):
+    """
+    Tabellone pubblico in sola lettura (classifiche, giornata in corso, eliminazione diretta).
+
+    Nessun login e nessun widget: tutti gli spettatori di un torneo condividono lo stesso
+    osservatore e lo stesso snapshot HTML, quindi il costo per spettatore è trascurabile.
+    """
+    try:
+        tournament_id = _id_torneo_pubblico(nome_torneo)
+        if tournament_id is None:
+            st.error(f"❌ Torneo '{nome_torneo}' non trovato.")
+            return
+        osservatore = osservatore_torneo(_collection_tornei(), ObjectId(tournament_id), CAMPI_VISTA_PUBBLICA)
+    except Exception as e:
+        st.error(f"❌ Errore di connessione al servizio di salvataggio: {e}")
+        return
+    versione, documento = osservatore.istantanea()
+    if documento is None:
+        # Primo spettatore: nessuna attesa bloccante, il fragment ricarica la pagina
+        # appena l'osservatore completa la lettura iniziale (nuova versione)
+        st.info("⏳ Caricamento del torneo in corso...")
+    else:
+        st.markdown(_snapshot_vista_pubblica(tournament_id, documento.get('data_modifica'), documento),
+                    unsafe_allow_html=True)
+    _controlla_versione_pubblica(osservatore, versione)
+
 def carica_torneo_da_db(tournaments_collection, tournament_id):
     if tournaments_collection is None:
         return None
     try:
-        torneo_data = tournaments_collection.find_one({"_id": ObjectId(tournament_id)})
+        torneo_data = completa_calendario(
+            tournaments_collection, tournaments_collection.find_one({"_id": ObjectId(tournament_id)})
+        )
         if torneo_data and 'calendario' in torneo_data:
-            df_torneo = pd.DataFrame(torneo_data['calendario'])
-            df_torneo['Valida'] = df_torneo['Valida'].astype(bool)
-            # Pulisci e converti esplicitamente
-            df_torneo['GolCasa'] = pd.to_numeric(df_torneo['GolCasa'], errors='coerce')
-            df_torneo['GolOspite'] = pd.to_numeric(df_torneo['GolOspite'], errors='coerce')
-            df_torneo = df_torneo.fillna(0)
-            df_torneo['GolCasa'] = df_torneo['GolCasa'].astype('Int64')
-            df_torneo['GolOspite'] = df_torneo['GolOspite'].astype('Int64')
-            st.session_state['df_torneo'] = df_torneo
+            df_torneo = calendario_da_records(torneo_data['calendario'])
+            st.session_state['layout_partite'] = usa_collection_partite(torneo_data)
+            sincronizza_calendario_sessione(df_torneo, torneo_data.get(CAMPO_REV, 0), torneo_data.get('data_modifica'))
             # Salva l'ID del torneo nella sessione
             st.session_state['tournament_id'] = str(torneo_data['_id'])
             st.session_state['nome_torneo'] = torneo_data.get('nome_torneo', 'Torneo senza nome')
@@ -506,10 +659,13 @@ def salva_torneo_su_db(tournaments_collection, df_torneo, nome_torneo, tournamen
         
         # Se abbiamo un ID torneo, aggiorniamo il torneo esistente
         if tournament_id:
+            # Il calendario riscritto per intero torna incorporato nel documento torneo
             tournaments_collection.update_one(
                 {"_id": ObjectId(tournament_id)},
-                {"$set": data}
+                {"$set": data, "$unset": {CAMPO_LAYOUT: ""}, "$inc": {CAMPO_REV: 1}}
             )
+            collection_partite(tournaments_collection).delete_many({CAMPO_TORNEO: ObjectId(tournament_id)})
+            st.session_state['layout_partite'] = False
             # logging: aggiornamento torneo
             try:
                 user = st.session_state.get('user', 'unknown') if 'st' in globals() else 'system'
@@ -525,6 +681,7 @@ def salva_torneo_su_db(tournaments_collection, df_torneo, nome_torneo, tournamen
         else:
             # Altrimenti creiamo un nuovo torneo
             data["data_creazione"] = now
+            data[CAMPO_REV] = 0
             result = tournaments_collection.insert_one(data)
             # logging: creazione torneo
             try:
@@ -542,18 +699,93 @@ def salva_torneo_su_db(tournaments_collection, df_torneo, nome_torneo, tournamen
         st.error(f"❌ Errore salvataggio torneo: {e}")
         return None
 
+def aggiorna_torneo_offline(tournament_id, calendario, now):
+    """Accoda il calendario nel journal locale quando il servizio non è raggiungibile."""
+    coda, replayer = coda_offline()
+    base_modifica = st.session_state.get('data_modifica_torneo')
+    if st.session_state.get('layout_partite'):
+        # Una operazione per partita modificata, più il segnale di modifica sul torneo
+        modificate, _ = partite_modificate(
+            ObjectId(tournament_id), st.session_state.get('calendario_base', []), calendario
+        )
+        op_ids = [
+            coda.accoda(DB_TORNEI, COLLECTION_TORNEI + SUFFISSO_COLLECTION, filtro, {**partita, "data_modifica": now},
+                        base_modifica=base_modifica)
+            for filtro, partita, _ in modificate
+        ]
+        op_ids.append(coda.accoda(DB_TORNEI, COLLECTION_TORNEI, {"_id": ObjectId(tournament_id)},
+                                  {"data_modifica": now}))
+    else:
+        op_ids = [coda.accoda(
+            DB_TORNEI, COLLECTION_TORNEI,
+            {"_id": ObjectId(tournament_id)},
+            {"calendario": calendario, "data_modifica": now},
+            base_modifica=base_modifica,
+        )]
+    st.session_state.setdefault('operazioni_offline_sessione', []).extend(op_ids)
+    st.session_state['data_modifica_torneo'] = now
+    replayer.sveglia()
+    st.toast("📴 Servizio non raggiungibile: risultati salvati in locale, verranno sincronizzati automaticamente.")
+    return True
+
 def aggiorna_torneo_su_db(tournaments_collection, tournament_id, df_torneo):
-    if tournaments_collection is None:
+    """
+    Salva il calendario con controllo ottimistico della concorrenza sul campo `rev`.
+
+    Se un altro arbitro ha salvato nel frattempo, il torneo viene riletto e le partite
+    modificate da questa sessione vengono unite a quelle del DB; il calendario unito
+    diventa quello della sessione. Per i tornei migrati nella collection delle partite
+    (common.partite_torneo) si scrivono solo le partite modificate. Se il servizio non è
+    raggiungibile i risultati passano dal journal locale e vengono sincronizzati in background.
+    """
+    if not tournament_id:
         return False
+    calendario = calendario_a_records(df_torneo)
+    now = datetime.now()
+    if tournaments_collection is None:
+        return aggiorna_torneo_offline(tournament_id, calendario, now)
     try:
-        df_torneo_pulito = df_torneo.where(pd.notna(df_torneo), None)
-        tournaments_collection.update_one(
-            {"_id": ObjectId(tournament_id)},
-            {"$set": {
-                "calendario": df_torneo_pulito.to_dict('records'),
-                "data_modifica": datetime.now()
-            }}
+        if st.session_state.get('layout_partite'):
+            # Una partita per documento: si scrivono solo le partite cambiate, senza conflitti
+            esito = salva_partite_modificate(
+                tournaments_collection,
+                ObjectId(tournament_id),
+                st.session_state.get('calendario_base', []),
+                calendario,
+                campi={"data_modifica": now},
+            )
+            if esito is not None:
+                rev_sessione = st.session_state.get('rev_torneo', 0)
+                if esito["rev"] > rev_sessione + 1:
+                    # Altri arbitri hanno salvato nel frattempo: il prossimo aggiornamento live rilegge le partite
+                    esito["rev"] = rev_sessione
+                esito.update({"calendario": calendario, "conflitti": 0, "sovrascritte": []})
+        else:
+            esito = salva_calendario_versionato(
+                tournaments_collection,
+                {"_id": ObjectId(tournament_id)},
+                st.session_state.get('calendario_base', []),
+                calendario,
+                st.session_state.get('rev_torneo', 0),
+                campi={"data_modifica": now},
+            )
+        if esito is None:
+            st.error("❌ Il torneo è stato modificato da troppi dispositivi contemporaneamente "
+                     "(o non esiste più): ricarica il torneo e riprova.")
+            return False
+        sincronizza_calendario_sessione(
+            calendario_da_records(esito["calendario"]) if esito["conflitti"] else df_torneo,
+            esito["rev"], now
         )
+        # I salvataggi offline di questa sessione sono compresi nel calendario appena scritto
+        op_offline = st.session_state.pop('operazioni_offline_sessione', [])
+        if op_offline:
+            coda_offline()[0].segna_applicate(op_offline, "Compresa in un salvataggio successivo della sessione")
+        if esito["conflitti"]:
+            st.toast("🔀 Risultati uniti con quelli salvati da un altro dispositivo.")
+        if esito["sovrascritte"]:
+            partite = ", ".join(f"{casa} vs {ospite}" for _, _, casa, ospite in esito["sovrascritte"])
+            st.warning(f"⚠️ Partite modificate anche da un altro dispositivo, è stato mantenuto il tuo risultato: {partite}")
         # logging: aggiornamento torneo
         try:
             user = st.session_state.get('user', 'unknown') if 'st' in globals() else 'system'
@@ -567,6 +799,8 @@ def aggiorna_torneo_su_db(tournaments_collection, tournament_id, df_torneo):
             print(f"[LOGGING] errore in aggiorna_torneo_su_db: {e}")
         return True
     except Exception as e:
+        if errore_di_connessione(e):
+            return aggiorna_torneo_offline(tournament_id, calendario, now)
         st.error(f"❌ Errore aggiornamento torneo: {e}")
         return False
         
@@ -620,41 +854,17 @@ def genera_calendario_from_list(gironi, tipo="Solo andata"):
 def aggiorna_classifica(df):
     if 'Girone' not in df.columns:
         return pd.DataFrame()
-    gironi = df['Girone'].dropna().unique()
-    classifiche = []
-    for girone in gironi:
-        partite = df[(df['Girone'] == girone) & (df['Valida'] == True)]
-        if partite.empty:
-            continue
-        squadre = pd.unique(partite[['Casa', 'Ospite']].values.ravel())
-        stats = {s: {'Punti': 0, 'G': 0, 'V': 0, 'P': 0, 'S': 0, 'GF': 0, 'GS': 0, 'DR': 0} for s in squadre}
-        for _, r in partite.iterrows():
-            gc, go = int(r['GolCasa'] or 0), int(r['GolOspite'] or 0)
-            casa, ospite = r['Casa'], r['Ospite']
-            stats[casa]['G'] += 1
-            stats[ospite]['G'] += 1
-            stats[casa]['GF'] += gc; stats[casa]['GS'] += go
-            stats[ospite]['GF'] += go; stats[ospite]['GS'] += gc
-            if gc > go:
-                stats[casa]['Punti'] += 2; stats[casa]['V'] += 1; stats[ospite]['S'] += 1
-            elif gc < go:
-                stats[ospite]['Punti'] += 2; stats[ospite]['V'] += 1; stats[casa]['S'] += 1
-            else:
-                stats[casa]['Punti'] += 1; stats[ospite]['Punti'] += 1; stats[casa]['P'] += 1; stats[ospite]['P'] += 1
-        for s in squadre:
-            stats[s]['DR'] = stats[s]['GF'] - stats[s]['GS']
-        df_stat = pd.DataFrame.from_dict(stats, orient='index').reset_index().rename(columns={'index': 'Squadra'})
-        df_stat['Girone'] = girone
-        classifiche.append(df_stat)
-    if not classifiche:
+    df_classifica = calcola_classifica(df, gruppo='Girone', col_valida='Valida', spareggi=('Punti', 'DR'))
+    if df_classifica.empty:
         return pd.DataFrame()
-    df_classifica = pd.concat(classifiche, ignore_index=True)
+    # Convenzione di visualizzazione dell'Italiana: P = pareggi, S = sconfitte
+    df_classifica = df_classifica.rename(columns={'N': 'P'})[
+        ['Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR', 'Girone']
+    ]
     
     # Aggiungi una colonna 'Ritirato'
     giocatori_ritirati = st.session_state.get('giocatori_ritirati', [])
-    df_classifica['Ritirato'] = df_classifica['Squadra'].apply(lambda x: x in giocatori_ritirati)
-    
-    df_classifica = df_classifica.sort_values(by=['Girone', 'Punti', 'DR'], ascending=[True, False, False])
+    df_classifica['Ritirato'] = df_classifica['Squadra'].isin(giocatori_ritirati)
     return df_classifica
 
 # -------------------------
@@ -670,9 +880,7 @@ from pymongo.server_api import ServerApi
 from bson.objectid import ObjectId
 import json
 import urllib.parse
-import requests
 import base64
-import time
 import re # Aggiungi la libreria 're' per le espressioni regolari
 
 
@@ -1095,28 +1303,25 @@ def mostra_calendario_compact(df, girone_sel, giornata_sel, modalita_visualizzaz
 def salva_risultati_giornata(tournaments_collection, girone_sel, giornata_sel):
     try:
         print(f"[DEBUG] Inizio salvataggio risultati per girone: {girone_sel}, giornata: {giornata_sel}")
-        df = st.session_state['df_torneo'].copy()
+        df = st.session_state['df_torneo']
         
         # Filtra le partite della giornata corrente
         mask = (df['Girone'] == girone_sel) & (df['Giornata'] == giornata_sel)
-        df_giornata = df[mask].copy()
-        print(f"[DEBUG] Trovate {len(df_giornata)} partite per questa giornata")
+        indici = df.index[mask]
+        print(f"[DEBUG] Trovate {len(indici)} partite per questa giornata")
 
-        # Aggiorna i risultati
-        for idx, row in df_giornata.iterrows():
-            key_golcasa = f"golcasa_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
-            key_golospite = f"golospite_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
-            key_valida = f"valida_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
-            
-            # Converti esplicitamente i valori in tipi nativi di Python
-            gol_casa = int(st.session_state.get(key_golcasa, 0) or 0)
-            gol_ospite = int(st.session_state.get(key_golospite, 0) or 0)
-            valida = bool(st.session_state.get(key_valida, False))
-
-            # Aggiorna il DataFrame
-            df.loc[idx, 'GolCasa'] = gol_casa
-            df.loc[idx, 'GolOspite'] = gol_ospite
-            df.loc[idx, 'Valida'] = valida
+        # Legge i valori dei widget e aggiorna i risultati in blocco (nessuna copia del calendario)
+        prefissi = [
+            f"{girone_sel}_{giornata_sel}_{casa}_{ospite}"
+            for casa, ospite in zip(df.loc[indici, 'Casa'], df.loc[indici, 'Ospite'])
+        ]
+        aggiorna_risultati(
+            df,
+            indici,
+            [st.session_state.get(f"golcasa_{k}", 0) or 0 for k in prefissi],
+            [st.session_state.get(f"golospite_{k}", 0) or 0 for k in prefissi],
+            [bool(st.session_state.get(f"valida_{k}", False)) for k in prefissi],
+        )
 
         # Conversione esplicita dei tipi
         df['GolCasa'] = pd.to_numeric(df['GolCasa'], errors='coerce').fillna(0).astype(int)
@@ -1140,6 +1345,9 @@ def salva_risultati_giornata(tournaments_collection, girone_sel, giornata_sel):
             print("[ERROR] Errore durante l'aggiornamento del torneo su MongoDB")
             st.error("❌ Errore durante il salvataggio del torneo.")
             return False
+        # Calendario unito con i risultati salvati da altri dispositivi
+        df = st.session_state['df_torneo']
+        mask = (df['Girone'] == girone_sel) & (df['Giornata'] == giornata_sel)
             
         # ------------------------------------------------------------------
         # CORREZIONE DEL LOGGING: Usiamo il DataFrame AGGIORNATO (df) filtrato
@@ -1191,15 +1399,11 @@ def salva_risultati_giornata(tournaments_collection, girone_sel, giornata_sel):
             
             # --- PALMARES SUPERBA ---
             try:
-                from palmares_utils import register_win
-                from pymongo import MongoClient
-                import certifi
-                client_pl = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                db_pl = client_pl["giocatori_subbuteo"]
-                players_col = db_pl["piercrew_players"]
+                from palmares_utils import register_wins, get_players_collection
                 
                 num_gironi_palmares = len(df['Girone'].unique()) if 'Girone' in df.columns else 1
                 
+                vittorie = []
                 for girone_name in df['Girone'].unique():
                     gir_classifica = classifica_finale[classifica_finale['Girone'] == girone_name]
                     if not gir_classifica.empty:
@@ -1208,13 +1412,14 @@ def salva_risultati_giornata(tournaments_collection, girone_sel, giornata_sel):
                         squadra_est, giocatore_est = parse_team_player(vincitore_str)
                         nome_giocatore = giocatore_est if giocatore_est else vincitore_str
                         
-                        register_win(
-                            db_players_col=players_col, 
-                            winner_name=nome_giocatore, 
-                            tournament_name=st.session_state['nome_torneo'], 
-                            tournament_type="italiana", 
-                            num_gironi=num_gironi_palmares
-                        )
+                        vittorie.append({
+                            "winner_name": nome_giocatore,
+                            "tournament_name": st.session_state['nome_torneo'],
+                            "tournament_type": "italiana",
+                            "num_gironi": num_gironi_palmares
+                        })
+                # Tutti i vincitori di girone in un'unica bulk_write (client condiviso)
+                register_wins(vittorie, get_players_collection("PierCrew"))
             except Exception as e:
                 print(f"[PALMARES] Errore salvataggio palmares: {e}")
             # --- FINE PALMARES ---
@@ -1231,7 +1436,7 @@ def salva_risultati_giornata(tournaments_collection, girone_sel, giornata_sel):
         return False
         
 def gestisci_abbandoni(df_torneo, giocatori_da_ritirare, tournaments_collection):
-    df = df_torneo.copy()
+    df = df_torneo
     
     # Aggiungi a session state la lista dei giocatori che hanno abbandonato
     if 'giocatori_ritirati' not in st.session_state:
@@ -1261,29 +1466,8 @@ def gestisci_abbandoni(df_torneo, giocatori_da_ritirare, tournaments_collection)
 
     st.info(f"🔄 Gestione abbandono per i seguenti giocatori: {', '.join(giocatori_da_ritirare)}")
     
-    matches_to_update = 0
-    # Aggiorna il DataFrame
-    for idx, row in df.iterrows():
-        casa_ritirato = any(ritirato in row['Casa'] for ritirato in squadre_da_ritirare)
-        ospite_ritirato = any(ritirato in row['Ospite'] for ritirato in squadre_da_ritirare)
-
-        # Caso: giocatore ritirato contro giocatore attivo
-        if casa_ritirato and not ospite_ritirato:
-            df.loc[idx, 'GolCasa'] = 0
-            df.loc[idx, 'GolOspite'] = 3
-            df.loc[idx, 'Valida'] = True
-            matches_to_update += 1
-        elif ospite_ritirato and not casa_ritirato:
-            df.loc[idx, 'GolCasa'] = 3
-            df.loc[idx, 'GolOspite'] = 0
-            df.loc[idx, 'Valida'] = True
-            matches_to_update += 1
-        # Caso: due giocatori ritirati (risultato 0-0)
-        elif casa_ritirato and ospite_ritirato:
-            df.loc[idx, 'GolCasa'] = 0
-            df.loc[idx, 'GolOspite'] = 0
-            df.loc[idx, 'Valida'] = True
-            matches_to_update += 1
+    # Aggiorna il DataFrame: 0-3 / 3-0 contro un attivo, 0-0 tra due ritirati
+    matches_to_update = applica_abbandoni(df, squadre_da_ritirare)
 
     st.session_state['df_torneo'] = df
     
@@ -1334,6 +1518,58 @@ def mostra_classifica_stilizzata(df_classifica, girone_sel):
 
     st.dataframe(styled_df, width="stretch", hide_index=True)
 
+
+COLONNE_SIMULAZIONE = ['Girone', 'Casa', 'Ospite', 'GolCasa', 'GolOspite', 'Valida']
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def calcola_probabilita_girone(df_calendario, girone_sel, posti):
+    """Probabilità Monte Carlo di un girone, cached per stato del calendario (risultati e validazioni)."""
+    return probabilita_qualificazione(df_calendario, posti=posti, seed=0, gironi=[girone_sel])
+
+
+def mostra_probabilita_qualificazione(df, girone_sel):
+    """Mostra, accanto alla classifica, la probabilità di ogni squadra di qualificarsi dal girone."""
+    if df is None or df.empty or not set(COLONNE_SIMULAZIONE).issubset(df.columns):
+        return
+    df_calendario = df[COLONNE_SIMULAZIONE]
+    df_girone = df_calendario[df_calendario['Girone'] == girone_sel]
+    if df_girone.empty or to_bool_series(df_girone['Valida']).all():
+        return  # Girone concluso: vale la classifica
+
+    n_squadre = len(pd.unique(df_girone[['Casa', 'Ospite']].to_numpy(dtype=object).ravel()))
+    with st.expander("🎲 Probabilità di qualificazione", expanded=False):
+        posti = st.number_input(
+            "Posti validi per la qualificazione",
+            min_value=1,
+            max_value=max(1, n_squadre - 1),
+            value=min(2, max(1, n_squadre - 1)),
+            step=1,
+            key=f"posti_qualificazione_{girone_sel}"
+        )
+        with st.spinner("Simulazione delle partite rimanenti..."):
+            tabella = calcola_probabilita_girone(df_calendario, girone_sel, int(posti))
+        if tabella.empty:
+            st.info("Nessuna squadra da simulare.")
+            return
+        tabella = tabella.drop(columns=['Girone']).dropna(axis=1, how='all')
+        colonne_pct = [c for c in tabella.columns if c != 'Squadra']
+        tabella[colonne_pct] = (tabella[colonne_pct] * 100).round(1)
+        st.dataframe(
+            tabella,
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "Qualificazione": st.column_config.ProgressColumn(
+                    "Qualificazione", format="%.1f%%", min_value=0, max_value=100
+                ),
+                **{c: st.column_config.NumberColumn(c, format="%.1f%%") for c in colonne_pct if c != 'Qualificazione'},
+            },
+        )
+        n_sim = f"{N_SIMULAZIONI:,}".replace(",", ".")
+        st.caption(f"Stima su {n_sim} simulazioni delle partite non ancora validate, "
+                   "con la distribuzione dei gol osservata nel torneo.")
+
 # -------------------------
 #  export PDF (NON MODIFICARE)
 from datetime import datetime
@@ -1742,6 +1978,11 @@ def inject_css():
 # APP
 # -------------------------
 def main():
+    # Tabellone pubblico in sola lettura: niente autenticazione né editor
+    if st.query_params.get("view") == VISTA_PUBBLICA and st.query_params.get("torneo"):
+        mostra_vista_pubblica(st.query_params.get("torneo"))
+        return
+
     # Mostra la schermata di autenticazione
     #authenticated = auth.show_auth_screen()
     #if not authenticated:
@@ -1938,15 +2179,11 @@ def main():
                 
                 # --- PALMARES SUPERBA (AGGIORNAMENTO AL CLICK CELEBRAZIONE) ---
                 try:
-                    from palmares_utils import register_win
-                    from pymongo import MongoClient
-                    import certifi
-                    client_pl = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                    db_pl = client_pl["giocatori_subbuteo"]
-                    players_col = db_pl["piercrew_players"]
+                    from palmares_utils import register_wins, get_players_collection
                     
                     if not df_torneo_check.empty and not classifica_celebra.empty:
                         num_gironi_palmares = len(df_torneo_check['Girone'].unique()) if 'Girone' in df_torneo_check.columns else 1
+                        vittorie = []
                         for girone_name in df_torneo_check['Girone'].unique():
                             gir_classifica = classifica_celebra[classifica_celebra['Girone'] == girone_name]
                             if not gir_classifica.empty:
@@ -1954,13 +2191,13 @@ def main():
                                 squadra_est, giocatore_est = parse_team_player(vincitore_str)
                                 nome_giocatore = giocatore_est if giocatore_est else vincitore_str
                                 
-                                register_win(
-                                    db_players_col=players_col, 
-                                    winner_name=nome_giocatore, 
-                                    tournament_name=st.session_state.get('nome_torneo', 'Torneo Sconosciuto'), 
-                                    tournament_type="italiana", 
-                                    num_gironi=num_gironi_palmares
-                                )
+                                vittorie.append({
+                                    "winner_name": nome_giocatore,
+                                    "tournament_name": st.session_state.get('nome_torneo', 'Torneo Sconosciuto'),
+                                    "tournament_type": "italiana",
+                                    "num_gironi": num_gironi_palmares
+                                })
+                        register_wins(vittorie, get_players_collection("PierCrew"))
                 except Exception as e:
                     print(f"[PALMARES CELEBRAZIONE] Errore salvataggio palmares manuale: {e}")
                 # --- FINE PALMARES ---
@@ -1979,19 +2216,8 @@ def main():
                         🎉 Torneo Completato! Vincitori → {vincitori_str_celebra}
                     </div>
                     """, unsafe_allow_html=True)
-                st.balloons()
-                try:
-                    audio_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
-                    response = requests.get(audio_url, timeout=10)
-                    response.raise_for_status()
-                    autoplay_audio(response.content)
-                except Exception:
-                    pass
-                placeholder_c = st.empty()
-                for _ in range(3):
-                    with placeholder_c.container():
-                        st.balloons()
-                        time.sleep(1)
+                riproduci_celebrazione()
+                celebrazione_vittoria()
 
     # Avvio audio di sottofondo 
     if not st.session_state.bg_audio_disabled:
@@ -2018,9 +2244,12 @@ def main():
         render_sidebar_collapse_workaround()
     setup_common_sidebar(show_user_info=False, hub_url=HUB_URL, home_url=auth.make_authenticated_url(HOME_URL))  # user info già mostrata sopra
     setup_audio_sidebar()
+    mostra_stato_coda_offline()
     setup_player_selection_mode(on_change=sync_multiselect, args=("sidebar_usa_multiselect_giocatori",))
     
     if st.session_state.get('calendario_generato', False):
+        if st.session_state.get('tournament_id') and tournaments_collection is not None:
+            aggiornamenti_live(tournaments_collection, st.session_state['tournament_id'])
         df = st.session_state['df_torneo']
         classifica = aggiorna_classifica(df)
         
@@ -2594,6 +2823,7 @@ def main():
                 classifica = aggiorna_classifica(df)
                 if classifica is not None and not classifica.empty:
                     mostra_classifica_stilizzata(classifica, girone)
+                    mostra_probabilita_qualificazione(df, girone)
                 else:
                     st.info("⚽ Nessuna partita validata per questo girone.")
                 
@@ -3142,6 +3372,9 @@ def main():
 
                         if tid:
                             st.session_state['df_torneo'] = df_torneo
+                            st.session_state['calendario_base'] = calendario_a_records(df_torneo)
+                            # Revisione sconosciuta se il torneo esisteva: il primo salvataggio la rilegge
+                            st.session_state.pop('rev_torneo', None)
                             st.session_state['tournament_id'] = str(tid)
                             st.session_state['calendario_generato'] = True
                             st.session_state['debug_message'] = {
@@ -3184,35 +3417,9 @@ def main():
         
         # Esegui l'animazione e la musica solo se c'è almeno un girone
         if num_gironi > 0:
-            try:
-                # Riproduci l'audio della vittoria
-                try:
-                    audio_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
-                    response = requests.get(audio_url, timeout=10)
-                    response.raise_for_status()
-                    autoplay_audio(response.content)
-                except Exception as e:
-                    st.warning(f"Impossibile caricare l'audio: {str(e)}")
-                    st.warning("La riproduzione dell'audio non è disponibile")
-                
-                # Crea un contenitore vuoto per i messaggi
-                placeholder = st.empty()
-                
-                # Lancia i palloncini in un ciclo per 3 secondi
-                with placeholder.container():
-                    st.balloons()
-                    time.sleep(1)
-                
-                with placeholder.container():
-                    st.balloons()
-                    time.sleep(1)
-                
-                with placeholder.container():
-                    st.balloons()
-                    time.sleep(1)
-                    
-            except requests.exceptions.RequestException as e:
-                st.error(f"Errore durante il caricamento dell'audio: {e}")
+            # Audio e palloncini gestiti dal browser: lo script non resta in attesa
+            riproduci_celebrazione()
+            celebrazione_vittoria()
 
         
         # Nuovo blocco di codice per il reindirizzamento
@@ -18,11 +18,10 @@ import numpy as np
 from pymongo import MongoClient
 from pymongo.server_api import ServerApi
 from bson.objectid import ObjectId
-import requests
 import base64
-import time
 import urllib.parse
 import os
+import threading
 import streamlit.components.v1 as components
 
 # Import auth utilities
@@ -33,12 +32,12 @@ from shared.auth import verify_write_access
 # Importa moduli comuni per stili, audio e componenti UI
 from common.styles import inject_all_styles
 from common.audio import (
-    autoplay_background_audio, autoplay_audio,
+    autoplay_background_audio, riproduci_celebrazione,
     toggle_audio_callback, start_background_audio, setup_audio_sidebar
 )
 from common.ui_components import (
     render_tournament_header, setup_common_sidebar,
-    setup_player_selection_mode, enable_session_keepalive
+    setup_player_selection_mode, enable_session_keepalive, celebrazione_vittoria
 )
 
 def render_sidebar_collapse_workaround():
@@ -251,10 +250,45 @@ st.markdown("""
 # Connessione a MongoDB Atlas
 # -------------------------
 from common.db_utils import check_internet_connection as _check_internet
+from common.coda_offline import (
+    CodaOffline, ReplayerCoda, percorso_coda, STATO_IN_ATTESA, STATO_CONFLITTO, errore_di_connessione
+)
+from common.accoppiamenti_svizzero import (
+    fase_turno, ordina_squadre, scegli_riposo, accoppia, classifica_svizzera
+)
+from common.torneo_svizzero import leggi_torneo, normalizza_partite, risultati_temp_turno
+from common.rating import ELO_BASE, stato_vuoto, aggiorna_rating_da_db, potenziale_a_rating
 
 players_collection = None
 tournaments_collection = None
 
+DB_TORNEI = "TorneiSubbuteo"
+COLLECTION_TORNEI = "TigullioSvizzero"
+
+
+@st.cache_resource
+def coda_offline():
+    """Journal locale dei salvataggi di questa app e club e relativo replayer in background (uno per processo)."""
+    coda = CodaOffline(percorso_coda("svizzero", COLLECTION_TORNEI))
+    uri = st.secrets.get("MONGO_URI")
+    replayer = ReplayerCoda(coda, lambda: MongoClient(uri,
+                                                      server_api=ServerApi('1'),
+                                                      connectTimeoutMS=5000,
+                                                      socketTimeoutMS=5000,
+                                                      serverSelectionTimeoutMS=5000))
+    replayer.start()
+    return coda, replayer
+
+
+def mostra_stato_coda_offline():
+    """Segnala nella sidebar i salvataggi in attesa di sincronizzazione o in conflitto."""
+    conteggi = coda_offline()[0].conteggi()
+    if conteggi[STATO_IN_ATTESA]:
+        st.sidebar.warning(f"📴 {conteggi[STATO_IN_ATTESA]} salvataggi in attesa di sincronizzazione")
+    if conteggi[STATO_CONFLITTO]:
+        st.sidebar.error(f"⚠️ {conteggi[STATO_CONFLITTO]} salvataggi offline non applicati: "
+                         "il torneo è stato modificato da un'altra sessione. Ricarica e verifica i risultati.")
+
 if not _check_internet():
     st.sidebar.error("❌ Nessuna connessione Internet rilevata. Verifica la tua connessione e riprova.")
 else:
@@ -316,15 +350,11 @@ def salva_torneo_su_db(action_type="salvataggio", details=None):
         st.error("⛔ Accesso in sola lettura. Non è possibile salvare le modifiche.")
         return False
         
-    if tournaments_collection is None:
-        st.error("❌ Servizio di salvataggio non disponibile, impossibile salvare.")
-        return False
-    
     # Ottieni il nome utente corrente o 'sconosciuto' se non disponibile
     current_user = st.session_state.get('user', {}).get('username', 'sconosciuto')
     
     # Verifica se abbiamo già un ID torneo valido nella sessione
-    if 'tournament_id' in st.session_state and st.session_state.tournament_id:
+    if tournaments_collection is not None and 'tournament_id' in st.session_state and st.session_state.tournament_id:
         try:
             # Verifica se il torneo esiste ancora nel database
             existing = tournaments_collection.find_one({"_id": ObjectId(st.session_state.tournament_id)})
@@ -339,6 +369,9 @@ def salva_torneo_su_db(action_type="salvataggio", details=None):
                     details={"errore": "Torneo non trovato nel database"}
                 )
         except Exception as e:
+            if errore_di_connessione(e):
+                # Servizio non raggiungibile: l'ID resta valido, il salvataggio andrà in coda
+                return salva_torneo_offline(_dati_torneo_da_sessione())
             # In caso di errore (es. ID non valido), rimuoviamo l'ID dalla sessione
             del st.session_state.tournament_id
             # Log dell'errore
@@ -349,48 +382,9 @@ def salva_torneo_su_db(action_type="salvataggio", details=None):
                 details={"errore": str(e)}
             )
 
-    # Crea una copia del dataframe per la serializzazione
-    df_torneo_to_save = st.session_state.df_torneo.copy()
-    
-    # ----------------------------------------------------
-    # NEW PATCH 1: Validazione 0-0 automatica per RIPOSA
-    # ----------------------------------------------------
-    
-    # Trova le righe in cui una delle due squadre è 'RIPOSA'
-    riposo_mask = (df_torneo_to_save['Casa'] == 'RIPOSA') | (df_torneo_to_save['Ospite'] == 'RIPOSA')
-
-    # Applica 0-0 e valida tutte le partite di riposo
-    if riposo_mask.any():
-        df_torneo_to_save.loc[riposo_mask, 'GolCasa'] = 0
-        df_torneo_to_save.loc[riposo_mask, 'GolOspite'] = 0
-        df_torneo_to_save.loc[riposo_mask, 'Validata'] = True
-        
-    # ----------------------------------------------------
-    
-    # Assicurati che la colonna 'Validata' esista e sia booleana
-    if 'Validata' not in df_torneo_to_save.columns:
-        df_torneo_to_save['Validata'] = False
-    df_torneo_to_save['Validata'] = df_torneo_to_save['Validata'].astype(bool)
-    
-    # Assicurati che le colonne dei goal siano intere
-    if 'GolCasa' in df_torneo_to_save.columns:
-        df_torneo_to_save['GolCasa'] = df_torneo_to_save['GolCasa'].fillna(0).astype(int)
-    if 'GolOspite' in df_torneo_to_save.columns:
-        df_torneo_to_save['GolOspite'] = df_torneo_to_save['GolOspite'].fillna(0).astype(int)
-
-    data_modifica = datetime.now()
-    torneo_data = {
-        "nome_torneo": st.session_state.nome_torneo,
-        "data_salvataggio": data_modifica,
-        "data_modifica": data_modifica,
-        "df_torneo": df_torneo_to_save.to_dict('records'),
-        "df_squadre": st.session_state.df_squadre.to_dict('records'),
-        "turno_attivo": st.session_state.turno_attivo,
-        "torneo_iniziato": st.session_state.torneo_iniziato,
-        "torneo_finito": st.session_state.get('torneo_finito', False),
-        "modalita_turni": st.session_state.get('modalita_turni', 'illimitati'),
-        "max_turni": st.session_state.get('max_turni'),
-    }
+    torneo_data = _dati_torneo_da_sessione()
+    if tournaments_collection is None:
+        return salva_torneo_offline(torneo_data)
 
     try:
         # Prepara i dettagli del log
@@ -402,10 +396,28 @@ def salva_torneo_su_db(action_type="salvataggio", details=None):
         
         # Se abbiamo un ID torneo nella sessione, aggiorniamo quel documento specifico
         if 'tournament_id' in st.session_state and st.session_state.tournament_id:
-            tournaments_collection.update_one(
+            coda, replayer = coda_offline()
+            stato = coda.salva(
+                DB_TORNEI, COLLECTION_TORNEI,
                 {"_id": ObjectId(st.session_state.tournament_id)},
-                {"$set": torneo_data}
+                torneo_data,
+                base_modifica=st.session_state.get('data_modifica_torneo'),
+                client=tournaments_collection.database.client,
             )
+            if stato == STATO_CONFLITTO:
+                st.error("❌ Torneo non trovato sul database (eliminato da un'altra sessione?): salvataggio non applicato.")
+                log_action(
+                    username=current_user,
+                    action="errore_salvataggio",
+                    torneo=st.session_state.nome_torneo,
+                    details={"errore": "documento non trovato", **log_details}
+                )
+                return False
+            st.session_state.data_modifica_torneo = torneo_data["data_modifica"]
+            if stato == STATO_IN_ATTESA:
+                replayer.sveglia()
+                st.toast("📴 Servizio non raggiungibile: torneo salvato in locale, verrà sincronizzato automaticamente.")
+                return True
             log_action(
                 username=current_user,
                 action=action_type,
@@ -442,11 +454,190 @@ def salva_torneo_su_db(action_type="salvataggio", details=None):
                     details={"tipo_operazione": "creazione", **log_details}
                 )
                 st.toast(f"✅ Nuovo torneo '{st.session_state.nome_torneo}' salvato con successo!")
+            st.session_state.data_modifica_torneo = torneo_data["data_modifica"]
         return True
     except Exception as e:
+        if errore_di_connessione(e):
+            return salva_torneo_offline(torneo_data)
         st.error(f"❌ Errore durante il salvataggio del torneo: {e}")
 
 
+def salva_torneo_offline(torneo_data):
+    """Accoda il salvataggio nel journal locale quando il servizio non è raggiungibile."""
+    coda, replayer = coda_offline()
+    if st.session_state.get('tournament_id'):
+        filtro, upsert = {"_id": ObjectId(st.session_state.tournament_id)}, False
+    else:
+        # Torneo creato offline: verrà creato (o aggiornato per nome) alla riconnessione
+        filtro, upsert = {"nome_torneo": torneo_data["nome_torneo"]}, True
+    coda.accoda(
+        DB_TORNEI, COLLECTION_TORNEI, filtro, torneo_data,
+        base_modifica=st.session_state.get('data_modifica_torneo'), upsert=upsert
+    )
+    st.session_state.data_modifica_torneo = torneo_data["data_modifica"]
+    replayer.sveglia()
+    st.toast("📴 Servizio non raggiungibile: torneo salvato in locale, verrà sincronizzato automaticamente.")
+    return True
+
+
+def aggiungi_turno_su_db(df_turno, action_type="generazione_nuovo_turno", details=None):
+    """
+    Salvataggio incrementale di un nuovo turno: `$push` delle sole partite del turno e
+    `$set` dei campi di stato (turno_attivo, ...), senza riscrivere turni precedenti e squadre.
+    Ricade sul salvataggio completo se il torneo non è ancora sul DB, se il turno è già
+    presente o se il servizio non risponde.
+    """
+    if not verify_write_access():
+        st.error("⛔ Accesso in sola lettura. Non è possibile salvare le modifiche.")
+        return False
+    if tournaments_collection is None or not st.session_state.get('tournament_id'):
+        return salva_torneo_su_db(action_type=action_type, details=details)
+
+    turno = int(df_turno['Turno'].iloc[0])
+    data_modifica = datetime.now()
+    try:
+        risultato = tournaments_collection.update_one(
+            {"_id": ObjectId(st.session_state.tournament_id), "df_torneo.Turno": {"$ne": turno}},
+            {
+                "$push": {"df_torneo": {"$each": _righe_torneo_da_salvare(df_turno).to_dict('records')}},
+                "$set": {**_stato_torneo_da_sessione(), "data_modifica": data_modifica},
+            },
+        )
+    except Exception as e:
+        print(f"[SALVATAGGIO INCREMENTALE] {e}")
+        return salva_torneo_su_db(action_type=action_type, details=details)
+    if not risultato.matched_count:
+        return salva_torneo_su_db(action_type=action_type, details=details)
+
+    st.session_state.data_modifica_torneo = data_modifica
+    _log_salvataggio_incrementale(action_type, details)
+    return True
+
+
+def salva_risultati_turno_su_db(turno, squadre_casa=None, action_type="salvataggio_turno_corrente", details=None):
+    """
+    Salvataggio incrementale dei risultati: aggiorna solo GolCasa, GolOspite e Validata
+    delle partite del turno (array filters su Turno, Casa e Ospite). La query richiede
+    ogni partita ($elemMatch per riga): se sul DB ne manca anche una (turno rigenerato,
+    DB non allineato alla sessione) non scrive nulla e ripiega sul salvataggio completo.
+
+    Args:
+        turno: Turno delle partite da aggiornare.
+        squadre_casa: Squadre di casa delle partite da aggiornare (default tutto il turno).
+        action_type: Tipo di azione da registrare.
+        details: Dettagli aggiuntivi da registrare (opzionale).
+    """
+    if not verify_write_access():
+        st.error("⛔ Accesso in sola lettura. Non è possibile salvare le modifiche.")
+        return False
+    if tournaments_collection is None or not st.session_state.get('tournament_id'):
+        return salva_torneo_su_db(action_type=action_type, details=details)
+
+    df = st.session_state.df_torneo
+    righe = _righe_torneo_da_salvare(df[df['Turno'] == turno])
+    if squadre_casa is not None:
+        righe = righe[righe['Casa'].isin(squadre_casa)]
+
+    data_modifica = datetime.now()
+    campi = {**_stato_torneo_da_sessione(), "data_modifica": data_modifica}
+    filtri, partite = [], []
+    for i, riga in enumerate(righe.to_dict('records')):
+        for campo in ('GolCasa', 'GolOspite', 'Validata'):
+            campi[f"df_torneo.$[p{i}].{campo}"] = riga[campo]
+        filtri.append({f"p{i}.Turno": int(turno), f"p{i}.Casa": riga['Casa'], f"p{i}.Ospite": riga['Ospite']})
+        partite.append({"df_torneo": {"$elemMatch": {"Turno": int(turno), "Casa": riga['Casa'], "Ospite": riga['Ospite']}}})
+    query = {"_id": ObjectId(st.session_state.tournament_id), "df_torneo.Turno": int(turno)}
+    if partite:
+        query["$and"] = partite
+    try:
+        risultato = tournaments_collection.update_one(
+            query,
+            {"$set": campi},
+            array_filters=filtri or None,
+        )
+    except Exception as e:
+        print(f"[SALVATAGGIO INCREMENTALE] {e}")
+        return salva_torneo_su_db(action_type=action_type, details=details)
+    if not risultato.matched_count:
+        # Turno o partite non presenti sul DB: riallinea con il salvataggio completo
+        return salva_torneo_su_db(action_type=action_type, details=details)
+
+    st.session_state.data_modifica_torneo = data_modifica
+    _log_salvataggio_incrementale(action_type, details)
+    return True
+
+
+def _log_salvataggio_incrementale(action_type, details):
+    log_action(
+        username=st.session_state.get('user', {}).get('username', 'sconosciuto'),
+        action=action_type,
+        torneo=st.session_state.nome_torneo,
+        details={
+            "tipo_operazione": "aggiornamento_incrementale",
+            "turno_corrente": st.session_state.get('turno_attivo', 0),
+            **({} if details is None else details)
+        }
+    )
+
+
+def _stato_torneo_da_sessione():
+    """Campi di stato del torneo (piccoli) aggiornati ad ogni salvataggio."""
+    return {
+        "turno_attivo": st.session_state.turno_attivo,
+        "torneo_iniziato": st.session_state.torneo_iniziato,
+        "torneo_finito": st.session_state.get('torneo_finito', False),
+        "modalita_turni": st.session_state.get('modalita_turni', 'illimitati'),
+        "max_turni": st.session_state.get('max_turni'),
+    }
+
+
+def _righe_torneo_da_salvare(df_torneo):
+    """Copia delle partite pronta per MongoDB: riposi validati 0-0, Validata bool, gol interi."""
+    # Crea una copia del dataframe per la serializzazione
+    df_torneo_to_save = df_torneo.copy()
+    
+    # ----------------------------------------------------
+    # NEW PATCH 1: Validazione 0-0 automatica per RIPOSA
+    # ----------------------------------------------------
+    
+    # Trova le righe in cui una delle due squadre è 'RIPOSA'
+    riposo_mask = (df_torneo_to_save['Casa'] == 'RIPOSA') | (df_torneo_to_save['Ospite'] == 'RIPOSA')
+
+    # Applica 0-0 e valida tutte le partite di riposo
+    if riposo_mask.any():
+        df_torneo_to_save.loc[riposo_mask, 'GolCasa'] = 0
+        df_torneo_to_save.loc[riposo_mask, 'GolOspite'] = 0
+        df_torneo_to_save.loc[riposo_mask, 'Validata'] = True
+        
+    # ----------------------------------------------------
+    
+    # Assicurati che la colonna 'Validata' esista e sia booleana
+    if 'Validata' not in df_torneo_to_save.columns:
+        df_torneo_to_save['Validata'] = False
+    df_torneo_to_save['Validata'] = df_torneo_to_save['Validata'].astype(bool)
+    
+    # Assicurati che le colonne dei goal siano intere
+    if 'GolCasa' in df_torneo_to_save.columns:
+        df_torneo_to_save['GolCasa'] = df_torneo_to_save['GolCasa'].fillna(0).astype(int)
+    if 'GolOspite' in df_torneo_to_save.columns:
+        df_torneo_to_save['GolOspite'] = df_torneo_to_save['GolOspite'].fillna(0).astype(int)
+    return df_torneo_to_save
+
+
+def _dati_torneo_da_sessione():
+    """Documento del torneo (serializzabile su MongoDB) a partire dallo stato della sessione."""
+    data_modifica = datetime.now()
+    torneo_data = {
+        "nome_torneo": st.session_state.nome_torneo,
+        "data_salvataggio": data_modifica,
+        "data_modifica": data_modifica,
+        "df_torneo": _righe_torneo_da_salvare(st.session_state.df_torneo).to_dict('records'),
+        "df_squadre": st.session_state.df_squadre.to_dict('records'),
+        **_stato_torneo_da_sessione(),
+    }
+
+    return torneo_data
+
 
 def carica_nomi_tornei_da_db():
     """Carica i nomi dei tornei disponibili dal DB."""
@@ -474,69 +665,41 @@ def carica_nomi_tornei_da_db():
         return []
 
 def carica_torneo_da_db(nome_torneo):
-    """Carica un singolo torneo dal DB e lo ripristina nello stato della sessione."""
+    """
+    Carica un singolo torneo dal DB e lo ripristina nello stato della sessione.
+
+    Sola lettura: una find_one con proiezione, nessun salvataggio e nessun log.
+    """
     if tournaments_collection is None:
         st.error("❌ Servizio di salvataggio non disponibile.")
         return False
         
     try:
         # Cerca il torneo per nome
-        torneo = tournaments_collection.find_one(
-            {"nome_torneo": nome_torneo},
-            sort=[
-                ("data_modifica", -1),
-                ("data_salvataggio", -1),
-                ("_id", -1)
-            ]
-        )
+        torneo = leggi_torneo(tournaments_collection, nome_torneo)
         if not torneo:
             st.error(f"❌ Nessun torneo trovato con il nome '{nome_torneo}'")
             return False
             
         # Ripristina lo stato della sessione
-        st.session_state.df_torneo = pd.DataFrame(torneo['df_torneo'])
+        st.session_state.df_torneo = normalizza_partite(torneo['df_torneo'])
         st.session_state.df_squadre = pd.DataFrame(torneo['df_squadre'])
         st.session_state.turno_attivo = torneo['turno_attivo']
         st.session_state.torneo_iniziato = torneo['torneo_iniziato']
         st.session_state.torneo_finito = torneo.get('torneo_finito', False)
         st.session_state.tournament_id = str(torneo['_id'])
+        st.session_state.data_modifica_torneo = torneo.get('data_modifica')
         
         # Ripristina le impostazioni dei turni
         st.session_state.modalita_turni = torneo.get('modalita_turni', 'illimitati')
         st.session_state.max_turni = torneo.get('max_turni')
         
-        # Inizializza i risultati temporanei per tutte le partite del turno corrente
+        # Risultati temporanei solo per il turno attivo (gli altri turni non hanno widget)
         if 'risultati_temp' not in st.session_state:
             st.session_state.risultati_temp = {}
-            
-        # Carica i risultati delle partite del turno corrente
-        df_turno_corrente = st.session_state.df_torneo[st.session_state.df_torneo['Turno'] == st.session_state.turno_attivo]
-        for _, row in df_turno_corrente.iterrows():
-            key_gc = f"gc_{st.session_state.turno_attivo}_{row['Casa']}_{row['Ospite']}"
-            key_go = f"go_{st.session_state.turno_attivo}_{row['Casa']}_{row['Ospite']}"
-            key_val = f"val_{st.session_state.turno_attivo}_{row['Casa']}_{row['Ospite']}"
-            
-            st.session_state.risultati_temp[key_gc] = int(row.get('GolCasa', 0))
-            st.session_state.risultati_temp[key_go] = int(row.get('GolOspite', 0))
-            st.session_state.risultati_temp[key_val] = bool(row.get('Validata', False))
-        
-        # Assicurati che le colonne necessarie esistano e siano del tipo corretto
-        # Assicurati che le colonne necessarie esistano prima di accedere
-        for col in ['GolCasa', 'GolOspite', 'Validata']:
-            if col not in st.session_state.df_torneo.columns:
-                st.session_state.df_torneo[col] = 0 if col.startswith('Gol') else False
-                
-        # Converti esplicitamente i tipi di dati in modo più sicuro
-        st.session_state.df_torneo['GolCasa'] = st.session_state.df_torneo['GolCasa'].fillna(0).astype(int)
-        st.session_state.df_torneo['GolOspite'] = st.session_state.df_torneo['GolOspite'].fillna(0).astype(int)
-        
-        # Gestione robusta del flag 'Validata' per ogni riga
-        st.session_state.df_torneo['Validata'] = st.session_state.df_torneo['Validata'].apply(lambda x: bool(x) if x is not None else False)
-        
-        # Inizializza i risultati temporanei
-        init_results_temp_from_df(st.session_state.df_torneo)
-        # MODIFICA: Salvataggio immediato dopo generazione calendario
-        salva_torneo_su_db(action_type="creazione_torneo_generato", details={"turno_generato": 1})
+        st.session_state.risultati_temp.update(
+            risultati_temp_turno(st.session_state.df_torneo, st.session_state.turno_attivo)
+        )
         return True
         
     except Exception as e:
@@ -563,6 +726,35 @@ def carica_giocatori_da_db():
             return pd.DataFrame()
     return pd.DataFrame()
 
+
+@st.cache_resource
+def _motore_rating_elo():
+    """Stato del motore Elo condiviso tra le sessioni (aggiornato in modo incrementale)."""
+    return {"stato": stato_vuoto(), "lock": threading.Lock()}
+
+
+def carica_rating_elo():
+    """
+    Rating Elo dei giocatori sullo storico completo (Svizzero, Italiana e Fasi Finali).
+    Ad ogni chiamata vengono letti dal DB solo i tornei modificati dall'ultimo aggiornamento.
+
+    Returns:
+        Tupla ({giocatore: elo}, {giocatore: partite giocate}).
+    """
+    if tournaments_collection is None:
+        return {}, {}
+    motore = _motore_rating_elo()
+    with motore["lock"]:
+        try:
+            collections_italiana = []
+            uri_italiana = st.secrets.get("MONGO_URI_TOURNEMENTS")
+            if uri_italiana:
+                collections_italiana.append(_get_svizzero_client(uri_italiana)["TorneiSubbuteo"]["Tigullio"])
+            aggiorna_rating_da_db(motore["stato"], collections_italiana, [tournaments_collection])
+        except Exception as e:
+            st.warning(f"⚠️ Rating Elo non aggiornato: {e}")
+        return dict(motore["stato"]["rating"]), dict(motore["stato"]["partite"])
+
 from datetime import datetime
 import os
 
@@ -791,94 +983,20 @@ def esporta_pdf(df_torneo, nome_torneo):
         return None
 
 
-def calcola_punti_scontro_diretto(squadra1, squadra2, df):
-    """Calcola i punti nello scontro diretto tra due squadre"""
-    scontri = df[
-        ((df['Casa'] == squadra1) & (df['Ospite'] == squadra2)) |
-        ((df['Casa'] == squadra2) & (df['Ospite'] == squadra1))
-    ]
-    
-    punti1 = punti2 = 0
-    
-    for _, r in scontri.iterrows():
-        if not bool(r.get('Validata', False)):
-            continue
-            
-        if r['Casa'] == squadra1:
-            gc, go = int(r['GolCasa']), int(r['GolOspite'])
-        else:
-            go, gc = int(r['GolCasa']), int(r['GolOspite'])
-            
-        if gc > go:
-            punti1 += 2
-        elif go > gc:
-            punti2 += 2
-        else:
-            punti1 += 1
-            punti2 += 1
-            
-    return punti1, punti2
-
 def aggiorna_classifica(df):
-    # controlla che il df sia valido e abbia le colonne necessarie
-    colonne_richieste = {"Casa", "Ospite", "GolCasa", "GolOspite", "Validata"}
-    if not isinstance(df, pd.DataFrame) or not colonne_richieste.issubset(set(df.columns)):
-        # restituisci classifica vuota se non ci sono ancora partite
-        return pd.DataFrame(columns=[
-            "Squadra", "Punti", "G", "V", "N", "P",
-            "GF", "GS", "DR"
-        ])
+    """
+    Classifica del torneo svizzero: 2 punti vittoria / 1 pareggio.
 
-    stats = {}
-    
-    # Inizializza le statistiche per ogni squadra
-    squadre = set(df['Casa'].unique()).union(set(df['Ospite'].unique()))
-    for squadra in squadre:
-        stats[squadra] = {'Punti': 0, 'GF': 0, 'GS': 0, 'DR': 0, 'G': 0, 'V': 0, 'N': 0, 'P': 0}
-    
-    # Calcola le statistiche di base
-    for _, r in df.iterrows():
-        if not bool(r.get('Validata', False)):
-            continue
-            
-        casa, osp = r['Casa'], r['Ospite']
-        gc, go = int(r['GolCasa']), int(r['GolOspite'])
-        
-        # Aggiorna statistiche generali
-        stats[casa]['G'] += 1
-        stats[osp]['G'] += 1
-        stats[casa]['GF'] += gc
-        stats[casa]['GS'] += go
-        stats[osp]['GF'] += go
-        stats[osp]['GS'] += gc
-        
-        # Aggiorna punteggi
-        if gc > go:
-            stats[casa]['Punti'] += 2
-            stats[casa]['V'] += 1
-            stats[osp]['P'] += 1
-        elif gc < go:
-            stats[osp]['Punti'] += 2
-            stats[osp]['V'] += 1
-            stats[casa]['P'] += 1
-        else:
-            stats[casa]['Punti'] += 1
-            stats[osp]['Punti'] += 1
-            stats[casa]['N'] += 1
-            stats[osp]['N'] += 1
-    
-    # Calcola la differenza reti per ogni squadra
-    for squadra in stats:
-        stats[squadra]['DR'] = stats[squadra]['GF'] - stats[squadra]['GS']
-    
-    # Crea il DataFrame
-    if not stats:
-        return pd.DataFrame(columns=['Squadra', 'Punti', 'G', 'V', 'N', 'P', 'GF', 'GS', 'DR'])
-    
-    df_classifica = pd.DataFrame([(k, v['Punti'], v['G'], v['V'], v['N'], v['P'], v['GF'], v['GS'], v['DR']) 
-                                for k, v in stats.items()],
-                              columns=['Squadra', 'Punti', 'G', 'V', 'N', 'P', 'GF', 'GS', 'DR'])
-                              
+    Ordinamento: Punti, punti negli scontri diretti tra squadre a pari punti,
+    differenza reti, gol fatti, nome squadra (senza distinzione maiuscole/minuscole).
+    Gli incontri con la squadra fittizia "RIPOSA" non contano e "RIPOSA" non compare.
+    """
+    colonne = ["Squadra", "Punti", "G", "V", "N", "P", "GF", "GS", "DR"]
+    df_classifica = classifica_svizzera(df if isinstance(df, pd.DataFrame) else None)
+    # Convenzione di visualizzazione dello Svizzero: N = pareggi, P = perse
+    df_classifica = df_classifica.rename(columns={'S': 'P'})[colonne]
+    if df_classifica.empty:
+        return df_classifica
 
     # 🔥 Merge con potenziale delle squadre
     if "df_squadre" in st.session_state and not st.session_state.df_squadre.empty:
@@ -887,91 +1005,22 @@ def aggiorna_classifica(df):
             on="Squadra",
             how="left"
         )
+    return df_classifica
 
-    # ----------------------------------------------------
-    # NEW PATCH 2 & 3: Correzione Statistica e Nascondimento
-    # ----------------------------------------------------
-    
-    # Correzione statistica per il riposo (Patch 3)
-    # Troviamo le partite di riposo e le squadre coinvolte
-    df_riposi = df[(df['Ospite'] == 'RIPOSA') | (df['Casa'] == 'RIPOSA')]
-    riposi_count = {}
-
-    # 1. Contiamo quante volte ogni squadra ha riposato
-    for _, r in df_riposi.iterrows():
-        # Identifica la squadra vera che ha riposato
-        squadra_vera = r['Casa'] if r['Ospite'] == 'RIPOSA' else r['Ospite']
-        riposi_count[squadra_vera] = riposi_count.get(squadra_vera, 0) + 1
-
-    # 2. Applichiamo la correzione a tutte le squadre in classifica che hanno riposato
-    # Sottraiamo 1 punto, 1 partita giocata (G), 1 pareggiata (N) per ogni riposo
-    for idx in df_classifica.index:
-        squadra = df_classifica.loc[idx, 'Squadra']
-        num_riposi = riposi_count.get(squadra, 0)
-        
-        if num_riposi > 0:
-            df_classifica.loc[idx, 'Punti'] -= num_riposi
-            df_classifica.loc[idx, 'G'] -= num_riposi
-            df_classifica.loc[idx, 'N'] -= num_riposi
-
-    # 3. Nascondi la squadra fittizia "RIPOSA" dalla classifica (Patch 2)
-    df_classifica = df_classifica[df_classifica['Squadra'] != 'RIPOSA'].reset_index(drop=True)
 
-    # ----------------------------------------------------
-    # Ordina usando una chiave personalizzata che include il confronto diretto
-    def sort_key(row):
-        # Crea una tupla con i criteri di ordinamento
-        # 1. Punti (decrescente)
-        # 2. Punti negli scontri diretti (se ci sono)
-        # 3. Differenza reti (decrescente)
-        # 4. Gol fatti (decrescente)
-        # 5. Nome squadra (crescente)
-        
-        punti = -row['Punti']  # Moltiplicato per -1 per ordinamento decrescente
-        dr = -row['DR']
-        gf = -row['GF']
-        squadra = row['Squadra'].lower()  # Converti in minuscolo per ordinamento case-insensitive
-        
-        # Calcola i punti negli scontri diretti con le squadre con gli stessi punti
-        stesse_punti = df_classifica[df_classifica['Punti'] == row['Punti']]['Squadra'].tolist()
-        if len(stesse_punti) > 1 and row['Squadra'] in stesse_punti:
-            # Calcola la classifica parziale solo tra le squadre a pari punti
-            punteggi_scontri = {}
-            for s in stesse_punti:
-                punteggi_scontri[s] = 0
-                
-            for i, s1 in enumerate(stesse_punti):
-                for s2 in stesse_punti[i+1:]:
-                    p1, p2 = calcola_punti_scontro_diretto(s1, s2, df)
-                    punteggi_scontri[s1] += p1
-                    punteggi_scontri[s2] += p2
-            
-            # Usa il punteggio negli scontri diretti come secondo criterio
-            punti_scontri = -punteggi_scontri.get(row['Squadra'], 0)
-        else:
-            punti_scontri = 0
-            
-        # Aggiungi un log per debug
-        # st.write(f"{row['Squadra']}: Punti={-punti}, Scontri={-punti_scontri}, DR={-dr}, GF={-gf}")
-            
-        return (punti, punti_scontri, dr, gf, squadra)
-    
-    # Applica l'ordinamento personalizzato
-    indici_ordinati = sorted(df_classifica.index, key=lambda x: sort_key(df_classifica.loc[x]))
-    df_classifica = df_classifica.loc[indici_ordinati].reset_index(drop=True)
-    
-    #return df_classifica
-    # ----------------------------------------------------
-    # NEW FIX 4: Applica e finalizza l'ordinamento per la stabilità
-    # ----------------------------------------------------
-    
-    # Applica la chiave di ordinamento (sort_key) a tutte le righe
-    df_classifica['sort_key'] = df_classifica.apply(sort_key, axis=1)
-    
-    # Ordina definitivamente il DataFrame in base alla chiave e rimuovi la colonna temporanea
-    df_classifica = df_classifica.sort_values(by='sort_key').drop(columns=['sort_key']).reset_index(drop=True)
-    
-    return df_classifica
+def potenziale_accoppiamenti(classifica):
+    """
+    Forza delle squadre usata negli accoppiamenti basati sul potenziale: il rating Elo
+    salvato in df_squadre (colonna Rating) se il torneo è stato creato con la fonte Elo,
+    altrimenti il Potenziale manuale.
+    """
+    squadre = st.session_state.df_squadre
+    if "Rating" in squadre.columns:
+        rating = pd.to_numeric(
+            squadre.drop_duplicates("Squadra").set_index("Squadra")["Rating"], errors="coerce"
+        )
+        return classifica["Squadra"].map(rating).fillna(ELO_BASE)
+    return pd.to_numeric(classifica["Potenziale"], errors="coerce").fillna(0)
 
 #inizio
 # ==============================
@@ -1026,64 +1075,20 @@ def genera_accoppiamenti(classifica, precedenti, primo_turno=False):
     1. Backtracking sull'ordine di classifica/potenziale (svizzero "stretto")
     2. Fallback: backtracking su ordine casuale (svizzero "permissivo")
     """
-    import random
     turno_attuale = st.session_state.get("turno_attivo", 1)
-    num_squadre = len(st.session_state.df_squadre)
+    fase = fase_turno(turno_attuale)
 
     # ═══════════════════════════════════════════════════════
     # FASE 1 (Turni 1-2): Ordinamento SOLO per Potenziale
-    # ═══════════════════════════════════════════════════════
-    if turno_attuale <= 2:
-        fase = "potenziale"
-        classifica = st.session_state.df_squadre.copy()
-        classifica["Potenziale"] = pd.to_numeric(
-            classifica["Potenziale"], errors="coerce"
-        ).fillna(0)
-        classifica = classifica.sort_values(
-            by="Potenziale", ascending=False
-        ).reset_index(drop=True)
-
-    # ═══════════════════════════════════════════════════════
     # FASE 2 (Turni 3-4): MIX 50% Potenziale + 50% Classifica
+    # FASE 3 (Turno 5+):  Ordinamento SOLO per Classifica
     # ═══════════════════════════════════════════════════════
-    elif turno_attuale <= 4:
-        fase = "mix"
-        classifica = aggiorna_classifica(st.session_state.df_torneo)
-        
-        # Assicura colonna Potenziale presente
-        if "Potenziale" not in classifica.columns:
-            if "df_squadre" in st.session_state and not st.session_state.df_squadre.empty:
-                classifica = classifica.merge(
-                    st.session_state.df_squadre[["Squadra", "Potenziale"]],
-                    on="Squadra",
-                    how="left"
-                )
-            else:
-                classifica["Potenziale"] = 0
-                
-        classifica["Potenziale"] = pd.to_numeric(
-            classifica["Potenziale"], errors="coerce"
-        ).fillna(0)
-        
-        # Calcola un punteggio misto:
-        classifica["PosClassifica"] = range(1, len(classifica) + 1)
-        classifica["RankPotenziale"] = classifica["Potenziale"].rank(ascending=False, method="min")
-        classifica["MixScore"] = (
-            classifica["RankPotenziale"] * 0.5 +
-            classifica["PosClassifica"] * 0.5
-        )
-        classifica = classifica.sort_values(
-            by="MixScore", ascending=True
-        ).reset_index(drop=True)
-
-    # ═══════════════════════════════════════════════════════
-    # FASE 3 (Turno 5+): Ordinamento SOLO per Classifica
-    # ═══════════════════════════════════════════════════════
+    if fase == "potenziale":
+        classifica = st.session_state.df_squadre.copy()
     else:
-        fase = "classifica"
         classifica = aggiorna_classifica(st.session_state.df_torneo)
         
-        # Assicura colonna Potenziale presente (serve per gestione riposo)
+        # Assicura colonna Potenziale presente (serve anche per gestione riposo)
         if "Potenziale" not in classifica.columns:
             if "df_squadre" in st.session_state and not st.session_state.df_squadre.empty:
                 classifica = classifica.merge(
@@ -1093,10 +1098,14 @@ def genera_accoppiamenti(classifica, precedenti, primo_turno=False):
                 )
             else:
                 classifica["Potenziale"] = 0
-                
+
+    if fase == "classifica":
         classifica["Potenziale"] = pd.to_numeric(
             classifica["Potenziale"], errors="coerce"
         ).fillna(0)
+    else:
+        classifica["Potenziale"] = potenziale_accoppiamenti(classifica)
+    classifica = ordina_squadre(fase, classifica)
 
     squadre = classifica["Squadra"].tolist()
     riposa = None
@@ -1116,53 +1125,15 @@ def genera_accoppiamenti(classifica, precedenti, primo_turno=False):
                 ]
             )
 
-        # Candidati = squadre che non hanno ancora riposato
-        candidati = [s for s in squadre if s not in gia_riposo]
-
-        # Se tutte le squadre hanno già riposato, resetta il ciclo
-        if not candidati:
+        riposa, ciclo_azzerato = scegli_riposo(classifica, fase, gia_riposo)
+        if ciclo_azzerato:
             st.info("🔄 Tutte le squadre hanno già riposato. Si ricomincia il ciclo dei riposi.")
-            candidati = list(squadre)  # Tutte sono di nuovo candidabili
-
-        # Scelta del riposo in base alla fase
-        df_candidati = classifica[classifica["Squadra"].isin(candidati)]
-        if fase == "potenziale":
-            # Fase potenziale: riposa la squadra con potenziale più basso
-            riposa = df_candidati.sort_values(by="Potenziale", ascending=True).iloc[0]["Squadra"]
-        else:
-            # Fase classifica/mix: riposa l'ultima in classifica (già ordinata, prendi l'ultima)
-            riposa = df_candidati.iloc[-1]["Squadra"]
-
         squadre.remove(riposa)
 
-    # --- Algoritmo backtracking per formare coppie ---
-    # L'algoritmo prende la prima squadra della lista e prova ad accoppiarla
-    # con la più vicina disponibile (= quella subito dopo nella lista ordinata).
-    # Se quella coppia è già stata giocata, prova con la successiva.
-    # Se nessun accoppiamento funziona per tutto il gruppo, torna indietro (backtrack).
-    def backtrack(da_accoppiare, accoppiamenti):
-        if not da_accoppiare:
-            return accoppiamenti
-        s1 = da_accoppiare[0]
-        for i, s2 in enumerate(da_accoppiare[1:], 1):
-            if (s1, s2) in precedenti or (s2, s1) in precedenti:
-                continue
-            nuovi_accoppiamenti = accoppiamenti + [(s1, s2)]
-            nuove_rimanenti = [x for j, x in enumerate(da_accoppiare) if j not in (0, i)]
-            risultato = backtrack(nuove_rimanenti, nuovi_accoppiamenti)
-            if risultato is not None:
-                return risultato
-        return None
-
-    # PASS 1: Backtracking "stretto" (rispetta l'ordine di classifica/potenziale)
-    accoppiamenti = backtrack(squadre, [])
-
-    # PASS 2: Fallback "permissivo" (shuffle + backtracking)
-    if accoppiamenti is None:
+    # --- Backtracking "stretto" sull'ordine, poi fallback "permissivo" su ordine casuale ---
+    accoppiamenti, permissivo = accoppia(squadre, precedenti)
+    if permissivo:
         st.warning("🔄 Accoppiamento stretto fallito. Riprovo in modalità permissiva...")
-        squadre_permissive = squadre.copy()
-        random.shuffle(squadre_permissive)
-        accoppiamenti = backtrack(squadre_permissive, [])
 
     # Se nemmeno il fallback trova soluzione (backtrack ha fallito)
     if accoppiamenti is None:
@@ -1439,7 +1410,8 @@ def visualizza_incontri_attivi(df_turno_corrente, turno_attivo, modalita_visuali
                 df_turno_corrente.loc[partita_idx, 'Validata'] = True
                 st.session_state.df_torneo.loc[partita_idx, ['GolCasa', 'GolOspite', 'Validata']] = df_turno_corrente.loc[partita_idx, ['GolCasa', 'GolOspite', 'Validata']]
                 
-                if salva_torneo_su_db(
+                if salva_risultati_turno_su_db(
+                    st.session_state.turno_attivo, [casa],
                     action_type="validazione_risultato",
                     details={
                         "partita": f"{casa} vs {ospite}",
@@ -1454,7 +1426,8 @@ def visualizza_incontri_attivi(df_turno_corrente, turno_attivo, modalita_visuali
                 df_turno_corrente.loc[partita_idx, 'Validata'] = False
                 st.session_state.df_torneo.loc[partita_idx, 'Validata'] = False
                 
-                if salva_torneo_su_db(
+                if salva_risultati_turno_su_db(
+                    st.session_state.turno_attivo, [casa],
                     action_type="rimozione_validazione",
                     details={
                         "partita": f"{casa} vs {ospite}",
@@ -1535,22 +1508,8 @@ if st.session_state.get('torneo_finito', False):
                     🏆 Il vincitore del torneo {st.session_state.nome_torneo} è {vincitore_top}! 🎉
                  </div>
                  """, unsafe_allow_html=True)
-            st.balloons()
-            try:
-                import requests
-                audio_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
-                response = requests.get(audio_url, timeout=10) 
-                response.raise_for_status() 
-                autoplay_audio(response.content)
-            except Exception:
-                pass
-
-            placeholder_s = st.empty()
-            for _ in range(3):
-                import time
-                with placeholder_s.container():
-                    st.balloons()
-                    time.sleep(1)
+            riproduci_celebrazione()
+            celebrazione_vittoria()
 
 # -------------------------
 # Se torneo non è iniziato e non è stato ancora selezionato un setup
@@ -1820,6 +1779,17 @@ if st.session_state.setup_mode == "nuovo":
         if 'gioc_info' not in st.session_state:
             st.session_state['gioc_info'] = {}
 
+        fonte_potenziale = st.radio(
+            "Fonte del potenziale per gli accoppiamenti dei primi turni:",
+            ["Manuale", "Rating Elo (storico partite)"],
+            horizontal=True,
+            key="fonte_potenziale",
+            help="Con il rating Elo i primi turni usano la forza calcolata su tutte le partite validate; "
+                 "per chi non ha storico vale il potenziale manuale."
+        )
+        usa_rating_elo = fonte_potenziale != "Manuale"
+        rating_elo, partite_elo = carica_rating_elo() if usa_rating_elo else ({}, {})
+
         for gioc_df in st.session_state.df_squadre.to_dict('records'):
             gioc = gioc_df['Giocatore']
             
@@ -1846,6 +1816,12 @@ if st.session_state.setup_mode == "nuovo":
                     key=f"potenziale_slider_{gioc}"
                 )
                 
+                if usa_rating_elo:
+                    if gioc in rating_elo:
+                        st.caption(f"📈 Rating Elo: **{rating_elo[gioc]:.0f}** ({partite_elo.get(gioc, 0)} partite)")
+                    else:
+                        st.caption("📈 Nessuno storico: per il rating vale il potenziale manuale")
+                
                 st.session_state['gioc_info'][gioc]["Squadra"] = squadra_nuova
                 st.session_state['gioc_info'][gioc]["Potenziale"] = potenziale_nuovo
 
@@ -1854,11 +1830,14 @@ if st.session_state.setup_mode == "nuovo":
             if st.button("Genera calendario ▶️", type="primary", width="stretch"):
                 df_squadre_aggiornato = []
                 for gioc, info in st.session_state['gioc_info'].items():
-                    df_squadre_aggiornato.append({
+                    riga_squadra = {
                         "Giocatore": gioc,
                         "Squadra": info["Squadra"],
                         "Potenziale": info["Potenziale"]
-                    })
+                    }
+                    if usa_rating_elo:
+                        riga_squadra["Rating"] = round(rating_elo.get(gioc, potenziale_a_rating(info["Potenziale"])), 1)
+                    df_squadre_aggiornato.append(riga_squadra)
                 
                 st.session_state.df_squadre = pd.DataFrame(df_squadre_aggiornato)
                 
@@ -1903,6 +1882,7 @@ setup_common_sidebar(show_user_info=True, show_hub_link=True, hub_url=HUB_URL, h
 
 # Audio di sottofondo
 setup_audio_sidebar()
+mostra_stato_coda_offline()
 
 # ✅ 1. 🕹 Gestione Rapida + 👤 Mod Selezione Partecipanti
 setup_player_selection_mode()
@@ -2172,15 +2152,7 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                                 
                                 # --- PALMARES SUPERBA SVIZZERO ---
                                 try:
-                                    from palmares_utils import register_win
-                                    from pymongo import MongoClient
-                                    import certifi
-                                    import os
-                                    
-                                    # Usa la collection corretta
-                                    client_tmp = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                                    db_pl = client_tmp["giocatori_subbuteo"]
-                                    players_col_pl = db_pl["tigullio_players"]
+                                    from palmares_utils import register_wins, get_players_collection
                                     
                                     classifica_finale_sw = aggiorna_classifica(st.session_state.df_torneo)
                                     if not classifica_finale_sw.empty:
@@ -2200,12 +2172,11 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                                             parts = vincitore_str.split("-", 1)
                                             giocatore_vincitore = parts[1].strip() if len(parts)>1 else vincitore_str
 
-                                        register_win(
-                                            db_players_col=players_col_pl,
-                                            winner_name=giocatore_vincitore,
-                                            tournament_name=st.session_state.nome_torneo,
-                                            tournament_type="svizzero"
-                                        )
+                                        register_wins([{
+                                            "winner_name": giocatore_vincitore,
+                                            "tournament_name": st.session_state.nome_torneo,
+                                            "tournament_type": "svizzero"
+                                        }], get_players_collection("Tigullio"))
                                 except Exception as e:
                                     print(f"[PALMARES SVIZZERO] Errore salvataggio palmares: {e}")
                                 # --- FINE PALMARES ---
@@ -2220,7 +2191,8 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                         nuovo_turno = st.session_state.turno_attivo + 1
                         
                         # Salva i risultati del turno corrente
-                        if not salva_torneo_su_db(
+                        if not salva_risultati_turno_su_db(
+                            st.session_state.turno_attivo,
                             action_type="salvataggio_turno_corrente",
                             details={"turno": st.session_state.turno_attivo}
                         ):
@@ -2234,8 +2206,9 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                         st.session_state.risultati_temp = {}
                         init_results_temp_from_df(df_turno_prossimo)
                         
-                        # Salva il nuovo turno
-                        if salva_torneo_su_db(
+                        # Salva il nuovo turno (solo le sue partite)
+                        if aggiungi_turno_su_db(
+                            df_turno_prossimo,
                             action_type="generazione_nuovo_turno",
                             details={"nuovo_turno": st.session_state.turno_attivo + 1}
                         ):
@@ -2264,12 +2237,7 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                         
                         # --- PALMARES SUPERBA SVIZZERO (Fine accoppiamenti) ---
                         try:
-                            from palmares_utils import register_win
-                            from pymongo import MongoClient
-                            import certifi
-                            client_tmp = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                            db_pl = client_tmp["giocatori_subbuteo"]
-                            players_col_pl = db_pl["tigullio_players"]
+                            from palmares_utils import register_wins, get_players_collection
                             
                             # Vincitore già determinato sopra (vincitore = classifica_attuale.iloc[0]['Squadra'])
                             giocatore_vincitore = vincitore
@@ -2281,12 +2249,11 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                                 parts = vincitore.split("-", 1)
                                 giocatore_vincitore = parts[1].strip() if len(parts)>1 else vincitore
 
-                            register_win(
-                                db_players_col=players_col_pl,
-                                winner_name=giocatore_vincitore,
-                                tournament_name=st.session_state.nome_torneo,
-                                tournament_type="svizzero"
-                            )
+                            register_wins([{
+                                "winner_name": giocatore_vincitore,
+                                "tournament_name": st.session_state.nome_torneo,
+                                "tournament_type": "svizzero"
+                            }], get_players_collection("Tigullio"))
                         except Exception as e:
                             print(f"[PALMARES SVIZZERO] Errore salvataggio palmares: {e}")
                         # --- FINE PALMARES ---
@@ -2304,12 +2271,7 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                         
                         # --- PALMARES SUPERBA SVIZZERO (Meno di 2 squadre) ---
                         try:
-                            from palmares_utils import register_win
-                            from pymongo import MongoClient
-                            import certifi
-                            client_tmp = MongoClient(st.secrets["MONGO_URI"], tlsCAFile=certifi.where())
-                            db_pl = client_tmp["giocatori_subbuteo"]
-                            players_col_pl = db_pl["tigullio_players"]
+                            from palmares_utils import register_wins, get_players_collection
                             
                             classifica_finale_sw = aggiorna_classifica(st.session_state.df_torneo)
                             if not classifica_finale_sw.empty:
@@ -2323,12 +2285,11 @@ if st.session_state.torneo_iniziato and not st.session_state.torneo_finito:
                                     parts = vincitore_str.split("-", 1)
                                     giocatore_vincitore = parts[1].strip() if len(parts)>1 else vincitore_str
 
-                                register_win(
-                                    db_players_col=players_col_pl,
-                                    winner_name=giocatore_vincitore,
-                                    tournament_name=st.session_state.nome_torneo,
-                                    tournament_type="svizzero"
-                                )
+                                register_wins([{
+                                    "winner_name": giocatore_vincitore,
+                                    "tournament_name": st.session_state.nome_torneo,
+                                    "tournament_type": "svizzero"
+                                }], get_players_collection("Tigullio"))
                         except Exception as e:
                             print(f"[PALMARES SVIZZERO] Errore salvataggio palmares: {e}")
                         # --- FINE PALMARES ---
@@ -0,0 +1,142 @@
+"""
+bench_apertura_svizzero.py — Benchmark della latenza di apertura di un torneo svizzero.
+
+Confronta il percorso di sola lettura usato dall'app (common.torneo_svizzero: find_one
+con proiezione, tipi vettoriali, stato dei widget del solo turno attivo) con il vecchio
+percorso, riprodotto qui come riferimento: find_one completo, iterrows sul turno attivo
+e sull'intero calendario, verifica di esistenza, riscrittura dell'intero documento e
+inserimento del log.
+
+Uso:
+    python bench_apertura_svizzero.py [--uri mongodb://localhost:27017] [--mongomock]
+                                      [--squadre 32] [--turni 7] [--ripetizioni 50]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from common.torneo_svizzero import leggi_torneo, normalizza_partite, risultati_temp_turno
+
+DB_BENCH = "BenchAperturaSvizzero"
+
+
+def torneo_sintetico(n_squadre: int, n_turni: int) -> dict:
+    """Documento torneo svizzero completo: turni precedenti validati, ultimo turno in corso."""
+    rng = np.random.default_rng(0)
+    squadre = [f"Squadra {i:02d}" for i in range(n_squadre)]
+    partite = []
+    for turno in range(1, n_turni + 1):
+        ordine = rng.permutation(squadre)
+        for casa, ospite in zip(ordine[::2], ordine[1::2]):
+            partite.append({"Casa": str(casa), "Ospite": str(ospite), "GolCasa": int(rng.integers(0, 5)),
+                            "GolOspite": int(rng.integers(0, 5)), "Validata": turno < n_turni, "Turno": turno})
+    return {
+        "nome_torneo": "bench_svizzero",
+        "data_salvataggio": datetime.now(),
+        "data_modifica": datetime.now(),
+        "df_torneo": partite,
+        "df_squadre": [{"Giocatore": s, "Squadra": s, "Potenziale": int(rng.integers(1, 10))} for s in squadre],
+        "turno_attivo": n_turni,
+        "torneo_iniziato": True,
+        "torneo_finito": False,
+        "modalita_turni": "fisso",
+        "max_turni": n_turni,
+        "operazioni_offline": [f"{i:032x}" for i in range(200)],
+    }
+
+
+def apertura_precedente(collection, log_collection, nome_torneo: str) -> dict:
+    """Vecchio carica_torneo_da_db: lettura completa, cicli per riga e salvataggio finale."""
+    torneo = collection.find_one({"nome_torneo": nome_torneo},
+                                 sort=[("data_modifica", -1), ("data_salvataggio", -1), ("_id", -1)])
+    df = pd.DataFrame(torneo['df_torneo'])
+    pd.DataFrame(torneo['df_squadre'])
+    turno_attivo = torneo['turno_attivo']
+    risultati_temp = {}
+    for _, row in df[df['Turno'] == turno_attivo].iterrows():
+        risultati_temp[f"gc_{turno_attivo}_{row['Casa']}_{row['Ospite']}"] = int(row.get('GolCasa', 0))
+        risultati_temp[f"go_{turno_attivo}_{row['Casa']}_{row['Ospite']}"] = int(row.get('GolOspite', 0))
+        risultati_temp[f"val_{turno_attivo}_{row['Casa']}_{row['Ospite']}"] = bool(row.get('Validata', False))
+    df['GolCasa'] = df['GolCasa'].fillna(0).astype(int)
+    df['GolOspite'] = df['GolOspite'].fillna(0).astype(int)
+    df['Validata'] = df['Validata'].apply(lambda x: bool(x) if x is not None else False)
+    for _, row in df.iterrows():
+        t = row.get('Turno', 1)
+        risultati_temp.setdefault(f"gc_{t}_{row['Casa']}_{row['Ospite']}", int(row.get('GolCasa', 0)))
+        risultati_temp.setdefault(f"go_{t}_{row['Casa']}_{row['Ospite']}", int(row.get('GolOspite', 0)))
+        risultati_temp.setdefault(f"val_{t}_{row['Casa']}_{row['Ospite']}", bool(row.get('Validata', False)))
+
+    # salva_torneo_su_db(action_type="creazione_torneo_generato")
+    collection.find_one({"_id": torneo["_id"]})
+    dati = {k: v for k, v in torneo.items() if k != "_id"}
+    dati.update({"df_torneo": df.to_dict('records'), "data_modifica": datetime.now()})
+    collection.update_one({"_id": torneo["_id"]}, {"$set": dati})
+    log_collection.insert_one({"action": "creazione_torneo_generato", "torneo": nome_torneo, "timestamp": datetime.now()})
+    return risultati_temp
+
+
+def apertura_sola_lettura(collection, nome_torneo: str) -> dict:
+    """Nuovo carica_torneo_da_db: find_one con proiezione e stato del solo turno attivo."""
+    torneo = leggi_torneo(collection, nome_torneo)
+    df = normalizza_partite(torneo['df_torneo'])
+    pd.DataFrame(torneo['df_squadre'])
+    return risultati_temp_turno(df, torneo['turno_attivo'])
+
+
+def misura(funzione, ripetizioni: int) -> np.ndarray:
+    funzione()  # riscaldamento
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return np.array(tempi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latenza di apertura di un torneo svizzero.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB locale da usare")
+    parser.add_argument("--mongomock", action="store_true", help="Usa un DB in memoria (mongomock)")
+    parser.add_argument("--squadre", type=int, default=32, help="Squadre del torneo")
+    parser.add_argument("--turni", type=int, default=7, help="Turni giocati")
+    parser.add_argument("--ripetizioni", type=int, default=50, help="Aperture misurate per percorso")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ --mongomock richiede il pacchetto mongomock (pip install mongomock)")
+        db = mongomock.MongoClient()[DB_BENCH]
+    else:
+        from pymongo import MongoClient
+        db = MongoClient(args.uri, serverSelectionTimeoutMS=5000)[DB_BENCH]
+
+    collection, log_collection = db["tornei"], db["log"]
+    torneo = torneo_sintetico(args.squadre, args.turni)
+    collection.insert_one(torneo)
+    try:
+        nome = torneo["nome_torneo"]
+        risultati = {
+            "precedente": misura(lambda: apertura_precedente(collection, log_collection, nome), args.ripetizioni),
+            "sola lettura": misura(lambda: apertura_sola_lettura(collection, nome), args.ripetizioni),
+        }
+        scritture_log = log_collection.count_documents({})
+    finally:
+        db.client.drop_database(DB_BENCH)
+
+    print(f"[BENCH APERTURA] {args.squadre} squadre, {args.turni} turni, "
+          f"{len(torneo['df_torneo'])} partite, {args.ripetizioni} aperture per percorso")
+    for nome_percorso, tempi in risultati.items():
+        print(f"  {nome_percorso:<13} media {tempi.mean():7.2f} ms   p50 {np.percentile(tempi, 50):7.2f} ms   "
+              f"p95 {np.percentile(tempi, 95):7.2f} ms")
+    print(f"  speed-up medio x{risultati['precedente'].mean() / risultati['sola lettura'].mean():.1f}; "
+          f"scritture del percorso precedente: {args.ripetizioni + 1} documenti + {scritture_log} log")
+
+
+if __name__ == "__main__":
+    main()
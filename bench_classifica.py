@@ -0,0 +1,416 @@
+"""
+bench_classifica.py — Parità e benchmark del kernel di classifica (common.classifica).
+
+Riproduce qui, come riferimento, le implementazioni con iterrows che il kernel ha
+sostituito (aggiorna_classifica dell'Italiana, dello Svizzero e di torneoSubbuteoSuperbaMongo,
+classifica_complessiva e standings_from_matches delle Fasi Finali) e le confronta con il kernel, chiamato con
+gli stessi parametri e le stesse rinomine delle app, su calendari casuali: gironi con
+partite non validate, svizzeri con riposi (RIPOSA, validati 0-0) e molti pari merito.
+Per la variante Mongo il campo Valida mescola bool, 0/1, None e stringhe ("true", "si"):
+conta solo Valida == True, come prima del kernel.
+Misura poi la latenza (p50/p95) dei due percorsi su un torneo grande.
+
+Uso:
+    python bench_classifica.py [--calendari 200] [--gironi 8] [--squadre 16]
+                               [--svizzero 32] [--turni 9] [--ripetizioni 20] [--seed 0]
+
+Termina con codice 1 se una classifica non coincide.
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from common.accoppiamenti_svizzero import classifica_svizzera
+from common.classifica import calcola_classifica, to_bool_series
+
+
+# ------------------------------------------------------------------
+# Calendari sintetici
+# ------------------------------------------------------------------
+def genera_gironi(rnd: random.Random, n_gironi: int, n_squadre: int) -> pd.DataFrame:
+    """Gironi all'italiana (sola andata), gol 0-3 per avere molti pari merito, ~80% validate."""
+    partite = []
+    for g in range(1, n_gironi + 1):
+        squadre = [f"G{g} Squadra {i:02d}" for i in range(n_squadre)]
+        for i, casa in enumerate(squadre):
+            for ospite in squadre[i + 1:]:
+                c, o = (casa, ospite) if rnd.random() < 0.5 else (ospite, casa)
+                partite.append({"Girone": f"Girone {g}", "Casa": c, "Ospite": o,
+                                "GolCasa": rnd.randint(0, 3), "GolOspite": rnd.randint(0, 3),
+                                "Valida": rnd.random() < 0.8})
+    rnd.shuffle(partite)
+    return pd.DataFrame(partite)
+
+
+def genera_gironi_mongo(rnd: random.Random, n_gironi: int, n_squadre: int) -> pd.DataFrame:
+    """Come genera_gironi, con Valida in formati misti e gol vuoti (None) nelle partite da giocare."""
+    df = genera_gironi(rnd, n_gironi, n_squadre)
+    valori = [True, True, True, "true", "si", 1, False, False, "false", 0, None]
+    df['Valida'] = pd.Series([rnd.choice(valori) if v else rnd.choice([False, None, 0]) for v in df['Valida']],
+                             dtype=object)
+    da_giocare = (df['Valida'] != True).to_numpy() & (np.array([rnd.random() < 0.5 for _ in range(len(df))]))
+    df['GolCasa'] = df['GolCasa'].astype(object)
+    df['GolOspite'] = df['GolOspite'].astype(object)
+    df.loc[da_giocare, ['GolCasa', 'GolOspite']] = None
+    return df
+
+
+def genera_svizzero(rnd: random.Random, n_squadre: int, n_turni: int) -> pd.DataFrame:
+    """Turni svizzeri casuali; con squadre dispari una riposa (RIPOSA, 0-0 validata come nell'app)."""
+    squadre = [f"Squadra {i:02d}" for i in range(n_squadre)]
+    partite = []
+    for turno in range(1, n_turni + 1):
+        ordine = rnd.sample(squadre, len(squadre))
+        if len(ordine) % 2:
+            partite.append({"Casa": ordine.pop(), "Ospite": "RIPOSA", "GolCasa": 0, "GolOspite": 0,
+                            "Validata": True, "Turno": turno})
+        for casa, ospite in zip(ordine[::2], ordine[1::2]):
+            partite.append({"Casa": casa, "Ospite": ospite, "GolCasa": rnd.randint(0, 3),
+                            "GolOspite": rnd.randint(0, 3),
+                            "Validata": turno < n_turni or rnd.random() < 0.5, "Turno": turno})
+    return pd.DataFrame(partite)
+
+
+# ------------------------------------------------------------------
+# Implementazioni precedenti (riferimento)
+# ------------------------------------------------------------------
+def italiana_precedente(df):
+    """aggiorna_classifica dell'app Italiana prima del kernel (senza la colonna Ritirato)."""
+    if 'Girone' not in df.columns:
+        return pd.DataFrame()
+    gironi = df['Girone'].dropna().unique()
+    classifiche = []
+    for girone in gironi:
+        partite = df[(df['Girone'] == girone) & (df['Valida'] == True)]
+        if partite.empty:
+            continue
+        squadre = pd.unique(partite[['Casa', 'Ospite']].values.ravel())
+        stats = {s: {'Punti': 0, 'G': 0, 'V': 0, 'P': 0, 'S': 0, 'GF': 0, 'GS': 0, 'DR': 0} for s in squadre}
+        for _, r in partite.iterrows():
+            gc, go = int(r['GolCasa'] or 0), int(r['GolOspite'] or 0)
+            casa, ospite = r['Casa'], r['Ospite']
+            stats[casa]['G'] += 1
+            stats[ospite]['G'] += 1
+            stats[casa]['GF'] += gc; stats[casa]['GS'] += go
+            stats[ospite]['GF'] += go; stats[ospite]['GS'] += gc
+            if gc > go:
+                stats[casa]['Punti'] += 2; stats[casa]['V'] += 1; stats[ospite]['S'] += 1
+            elif gc < go:
+                stats[ospite]['Punti'] += 2; stats[ospite]['V'] += 1; stats[casa]['S'] += 1
+            else:
+                stats[casa]['Punti'] += 1; stats[ospite]['Punti'] += 1; stats[casa]['P'] += 1; stats[ospite]['P'] += 1
+        for s in squadre:
+            stats[s]['DR'] = stats[s]['GF'] - stats[s]['GS']
+        df_stat = pd.DataFrame.from_dict(stats, orient='index').reset_index().rename(columns={'index': 'Squadra'})
+        df_stat['Girone'] = girone
+        classifiche.append(df_stat)
+    if not classifiche:
+        return pd.DataFrame()
+    df_classifica = pd.concat(classifiche, ignore_index=True)
+    return df_classifica.sort_values(by=['Girone', 'Punti', 'DR'], ascending=[True, False, False])
+
+
+def mongo_precedente(df):
+    """aggiorna_classifica di torneoSubbuteoSuperbaMongo prima del kernel."""
+    if 'Girone' not in df.columns:
+        return pd.DataFrame()
+    gironi = df['Girone'].dropna().unique()
+    classifiche = []
+    for girone in gironi:
+        partite = df[(df['Girone'] == girone) & (df['Valida'] == True)]
+        if partite.empty:
+            continue
+        squadre = pd.unique(partite[['Casa', 'Ospite']].values.ravel())
+        stats = {s: {'Punti': 0, 'V': 0, 'P': 0, 'S': 0, 'GF': 0, 'GS': 0, 'DR': 0} for s in squadre}
+        for _, r in partite.iterrows():
+            try:
+                gc, go = int(r['GolCasa']), int(r['GolOspite'])
+            except (TypeError, ValueError):
+                gc, go = 0, 0
+            casa, ospite = r['Casa'], r['Ospite']
+            stats[casa]['GF'] += gc; stats[casa]['GS'] += go
+            stats[ospite]['GF'] += go; stats[ospite]['GS'] += gc
+            if gc > go:
+                stats[casa]['Punti'] += 2; stats[casa]['V'] += 1; stats[ospite]['S'] += 1
+            elif gc < go:
+                stats[ospite]['Punti'] += 2; stats[ospite]['V'] += 1; stats[casa]['S'] += 1
+            else:
+                stats[casa]['Punti'] += 1; stats[ospite]['Punti'] += 1; stats[casa]['P'] += 1; stats[ospite]['P'] += 1
+        for s in squadre:
+            stats[s]['DR'] = stats[s]['GF'] - stats[s]['GS']
+        df_stat = pd.DataFrame.from_dict(stats, orient='index').reset_index().rename(columns={'index': 'Squadra'})
+        df_stat['Girone'] = girone
+        classifiche.append(df_stat)
+    if not classifiche:
+        return None
+    df_classifica = pd.concat(classifiche, ignore_index=True)
+    return df_classifica.sort_values(by=['Girone', 'Punti', 'DR'], ascending=[True, False, False])
+
+
+def _punti_scontro_diretto(squadra1, squadra2, df):
+    scontri = df[((df['Casa'] == squadra1) & (df['Ospite'] == squadra2)) |
+                 ((df['Casa'] == squadra2) & (df['Ospite'] == squadra1))]
+    punti1 = punti2 = 0
+    for _, r in scontri.iterrows():
+        if not bool(r.get('Validata', False)):
+            continue
+        if r['Casa'] == squadra1:
+            gc, go = int(r['GolCasa']), int(r['GolOspite'])
+        else:
+            go, gc = int(r['GolCasa']), int(r['GolOspite'])
+        if gc > go:
+            punti1 += 2
+        elif go > gc:
+            punti2 += 2
+        else:
+            punti1 += 1
+            punti2 += 1
+    return punti1, punti2
+
+
+def svizzero_precedente(df):
+    """aggiorna_classifica dell'app Svizzero prima del kernel (senza il merge del Potenziale)."""
+    stats = {}
+    for squadra in set(df['Casa'].unique()).union(set(df['Ospite'].unique())):
+        stats[squadra] = {'Punti': 0, 'GF': 0, 'GS': 0, 'DR': 0, 'G': 0, 'V': 0, 'N': 0, 'P': 0}
+    for _, r in df.iterrows():
+        if not bool(r.get('Validata', False)):
+            continue
+        casa, osp = r['Casa'], r['Ospite']
+        gc, go = int(r['GolCasa']), int(r['GolOspite'])
+        stats[casa]['G'] += 1; stats[osp]['G'] += 1
+        stats[casa]['GF'] += gc; stats[casa]['GS'] += go
+        stats[osp]['GF'] += go; stats[osp]['GS'] += gc
+        if gc > go:
+            stats[casa]['Punti'] += 2; stats[casa]['V'] += 1; stats[osp]['P'] += 1
+        elif gc < go:
+            stats[osp]['Punti'] += 2; stats[osp]['V'] += 1; stats[casa]['P'] += 1
+        else:
+            stats[casa]['Punti'] += 1; stats[osp]['Punti'] += 1
+            stats[casa]['N'] += 1; stats[osp]['N'] += 1
+    for squadra in stats:
+        stats[squadra]['DR'] = stats[squadra]['GF'] - stats[squadra]['GS']
+    df_classifica = pd.DataFrame([(k, v['Punti'], v['G'], v['V'], v['N'], v['P'], v['GF'], v['GS'], v['DR'])
+                                  for k, v in stats.items()],
+                                 columns=['Squadra', 'Punti', 'G', 'V', 'N', 'P', 'GF', 'GS', 'DR'])
+
+    # Correzione del riposo: -1 punto, -1 giocata, -1 pareggio per ogni RIPOSA
+    riposi_count = {}
+    for _, r in df[(df['Ospite'] == 'RIPOSA') | (df['Casa'] == 'RIPOSA')].iterrows():
+        squadra_vera = r['Casa'] if r['Ospite'] == 'RIPOSA' else r['Ospite']
+        riposi_count[squadra_vera] = riposi_count.get(squadra_vera, 0) + 1
+    for idx in df_classifica.index:
+        num_riposi = riposi_count.get(df_classifica.loc[idx, 'Squadra'], 0)
+        if num_riposi > 0:
+            df_classifica.loc[idx, 'Punti'] -= num_riposi
+            df_classifica.loc[idx, 'G'] -= num_riposi
+            df_classifica.loc[idx, 'N'] -= num_riposi
+    df_classifica = df_classifica[df_classifica['Squadra'] != 'RIPOSA'].reset_index(drop=True)
+
+    def sort_key(row):
+        stesse_punti = df_classifica[df_classifica['Punti'] == row['Punti']]['Squadra'].tolist()
+        punti_scontri = 0
+        if len(stesse_punti) > 1 and row['Squadra'] in stesse_punti:
+            punteggi_scontri = {s: 0 for s in stesse_punti}
+            for i, s1 in enumerate(stesse_punti):
+                for s2 in stesse_punti[i + 1:]:
+                    p1, p2 = _punti_scontro_diretto(s1, s2, df)
+                    punteggi_scontri[s1] += p1
+                    punteggi_scontri[s2] += p2
+            punti_scontri = -punteggi_scontri.get(row['Squadra'], 0)
+        return (-row['Punti'], punti_scontri, -row['DR'], -row['GF'], row['Squadra'].lower())
+
+    indici_ordinati = sorted(df_classifica.index, key=lambda x: sort_key(df_classifica.loc[x]))
+    return df_classifica.loc[indici_ordinati].reset_index(drop=True)
+
+
+def ff_gironi_precedente(df, key_group):
+    """standings_from_matches delle Fasi Finali prima del kernel."""
+    partite = df[to_bool_series(df['Valida'])].copy()
+    if partite.empty:
+        return pd.DataFrame()
+    partite['GolCasa'] = pd.to_numeric(partite['GolCasa'], errors='coerce').fillna(0).astype(int)
+    partite['GolOspite'] = pd.to_numeric(partite['GolOspite'], errors='coerce').fillna(0).astype(int)
+    out = []
+    for gruppo, blocco in partite.groupby(key_group):
+        squadre = pd.unique(blocco[['Casa', 'Ospite']].values.ravel())
+        stats = {s: {'Punti': 0, 'G': 0, 'V': 0, 'P': 0, 'S': 0, 'GF': 0, 'GS': 0, 'DR': 0} for s in squadre}
+        for _, r in blocco.iterrows():
+            c, o = r['Casa'], r['Ospite']
+            gc, go = int(r['GolCasa']), int(r['GolOspite'])
+            stats[c]['G'] += 1; stats[o]['G'] += 1
+            stats[c]['GF'] += gc; stats[c]['GS'] += go
+            stats[o]['GF'] += go; stats[o]['GS'] += gc
+            if gc > go:
+                stats[c]['Punti'] += 2; stats[c]['V'] += 1; stats[o]['S'] += 1
+            elif gc < go:
+                stats[o]['Punti'] += 2; stats[o]['V'] += 1; stats[c]['S'] += 1
+            else:
+                stats[c]['Punti'] += 1; stats[o]['Punti'] += 1
+            stats[c]['P'] += 1; stats[o]['P'] += 1
+        for s, d in stats.items():
+            d['DR'] = d['GF'] - d['GS']
+            out.append({'Gruppo': gruppo, 'Squadra': s, **d})
+    dfc = pd.DataFrame(out)
+    dfc = dfc.sort_values(by=['Gruppo', 'Punti', 'DR', 'GF', 'V', 'Squadra'],
+                          ascending=[True, False, False, False, False, True])
+    return dfc.reset_index(drop=True)
+
+
+def ff_complessiva_precedente(df):
+    """classifica_complessiva delle Fasi Finali prima del kernel."""
+    partite = df[to_bool_series(df['Valida'])].copy()
+    partite['GolCasa'] = pd.to_numeric(partite['GolCasa'], errors='coerce').fillna(0).astype(int)
+    partite['GolOspite'] = pd.to_numeric(partite['GolOspite'], errors='coerce').fillna(0).astype(int)
+    squadre = set(partite['Casa'].unique()).union(set(partite['Ospite'].unique()))
+    stats = {s: {'Punti': 0, 'G': 0, 'V': 0, 'P': 0, 'S': 0, 'GF': 0, 'GS': 0, 'DR': 0} for s in squadre}
+    for _, r in partite.iterrows():
+        casa, osp = r['Casa'], r['Ospite']
+        gc, go = int(r['GolCasa']), int(r['GolOspite'])
+        stats[casa]['G'] += 1; stats[osp]['G'] += 1
+        stats[casa]['GF'] += gc; stats[casa]['GS'] += go
+        stats[osp]['GF'] += go; stats[osp]['GS'] += gc
+        if gc > go:
+            stats[casa]['Punti'] += 2; stats[casa]['V'] += 1; stats[osp]['S'] += 1
+        elif gc < go:
+            stats[osp]['Punti'] += 2; stats[osp]['V'] += 1; stats[casa]['S'] += 1
+        else:
+            stats[casa]['Punti'] += 1; stats[osp]['Punti'] += 1
+        stats[casa]['P'] += 1; stats[osp]['P'] += 1
+    rows = []
+    for s, d in stats.items():
+        d['DR'] = d['GF'] - d['GS']
+        rows.append({'Squadra': s, **d})
+    dfc = pd.DataFrame(rows)
+    if dfc.empty:
+        return pd.DataFrame(columns=['Pos', 'Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR'])
+    dfc = dfc.sort_values(by=['Punti', 'DR', 'GF', 'V', 'Squadra'],
+                          ascending=[False, False, False, False, True]).reset_index(drop=True)
+    dfc.insert(0, 'Pos', dfc.index + 1)
+    return dfc
+
+
+# ------------------------------------------------------------------
+# Kernel, con i parametri e le rinomine delle app
+# ------------------------------------------------------------------
+def italiana_kernel(df):
+    dfc = calcola_classifica(df, gruppo='Girone', col_valida='Valida', spareggi=('Punti', 'DR'))
+    return dfc.rename(columns={'N': 'P'})[['Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR', 'Girone']]
+
+
+def mongo_kernel(df):
+    dfc = calcola_classifica(df.assign(Valida=df['Valida'] == True), gruppo='Girone',
+                             col_valida='Valida', spareggi=('Punti', 'DR'))
+    if dfc.empty:
+        return None
+    return dfc.rename(columns={'N': 'P'})[['Squadra', 'Punti', 'V', 'P', 'S', 'GF', 'GS', 'DR', 'Girone']]
+
+
+def svizzero_kernel(df):
+    colonne = ["Squadra", "Punti", "G", "V", "N", "P", "GF", "GS", "DR"]
+    return classifica_svizzera(df).rename(columns={'S': 'P'})[colonne]
+
+
+def ff_gironi_kernel(df, key_group):
+    dfc = calcola_classifica(df, gruppo=key_group, col_valida='Valida',
+                             spareggi=('Punti', 'DR', 'GF', 'V', 'Squadra'))
+    dfc['P'] = dfc['G']
+    dfc = dfc.rename(columns={key_group: 'Gruppo'})
+    return dfc[['Gruppo', 'Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR']]
+
+
+def ff_complessiva_kernel(df):
+    columns = ['Pos', 'Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR']
+    dfc = calcola_classifica(df, col_valida='Valida', spareggi=('Punti', 'DR', 'GF', 'V', 'Squadra'))
+    dfc['P'] = dfc['G']
+    dfc.insert(0, 'Pos', range(1, len(dfc) + 1))
+    return dfc[columns]
+
+
+# Variante -> (riferimento, kernel, colonne che determinano l'ordine)
+VARIANTI = {
+    "italiana": (italiana_precedente, italiana_kernel, ['Girone', 'Punti', 'DR']),
+    "mongo": (mongo_precedente, mongo_kernel, ['Girone', 'Punti', 'DR']),
+    "svizzero": (svizzero_precedente, svizzero_kernel, None),
+    "ff gironi": (lambda df: ff_gironi_precedente(df, 'Girone'), lambda df: ff_gironi_kernel(df, 'Girone'), None),
+    "ff complessiva": (ff_complessiva_precedente, ff_complessiva_kernel, None),
+}
+
+
+def confronta(attesa: pd.DataFrame, ottenuta: pd.DataFrame, chiavi_ordine: list):
+    """
+    Stesse righe e stesso ordine. Con chiavi_ordine l'ordine è confrontato solo su quelle
+    colonne (il riferimento non definisce l'ordine tra squadre a pari merito).
+    """
+    if attesa is None or ottenuta is None:
+        assert attesa is None and ottenuta is None, "classifica vuota solo in uno dei due percorsi"
+        return
+    attesa = attesa[list(ottenuta.columns)].reset_index(drop=True)
+    ottenuta = ottenuta.reset_index(drop=True)
+    if chiavi_ordine:
+        assert_frame_equal(ottenuta[chiavi_ordine], attesa[chiavi_ordine], check_dtype=False)
+        tutte = list(ottenuta.columns)
+        attesa = attesa.sort_values(tutte).reset_index(drop=True)
+        ottenuta = ottenuta.sort_values(tutte).reset_index(drop=True)
+    assert_frame_equal(ottenuta, attesa, check_dtype=False)
+
+
+def calendario(variante: str, rnd: random.Random, gironi: int, squadre: int, turni: int) -> pd.DataFrame:
+    if variante == "svizzero":
+        return genera_svizzero(rnd, squadre, turni)
+    if variante == "mongo":
+        return genera_gironi_mongo(rnd, gironi, squadre)
+    return genera_gironi(rnd, gironi, squadre)
+
+
+def misura(funzione, ripetizioni: int) -> np.ndarray:
+    funzione()  # riscaldamento
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return np.array(tempi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parità e benchmark del kernel di classifica.")
+    parser.add_argument("--calendari", type=int, default=200, help="Calendari casuali per variante (parità)")
+    parser.add_argument("--gironi", type=int, default=8, help="Gironi del torneo grande (benchmark)")
+    parser.add_argument("--squadre", type=int, default=16, help="Squadre per girone (benchmark)")
+    parser.add_argument("--svizzero", type=int, default=32, help="Squadre dello svizzero (benchmark)")
+    parser.add_argument("--turni", type=int, default=9, help="Turni dello svizzero (benchmark)")
+    parser.add_argument("--ripetizioni", type=int, default=20, help="Misure per percorso")
+    parser.add_argument("--seed", type=int, default=0, help="Seme dei calendari casuali")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    for variante, (riferimento, kernel, chiavi) in VARIANTI.items():
+        for i in range(args.calendari):
+            df = calendario(variante, rnd, rnd.randint(1, 4), rnd.randint(3, 11), rnd.randint(1, 7))
+            try:
+                confronta(riferimento(df), kernel(df), chiavi)
+            except AssertionError as e:
+                print(f"❌ [PARITA {variante}] calendario {i} (seed {args.seed}) diverso dal riferimento:\n{e}")
+                sys.exit(1)
+        print(f"[PARITA] {variante}: {args.calendari} calendari identici al riferimento")
+
+    print(f"[BENCH CLASSIFICA] gironi {args.gironi} x {args.squadre} squadre, svizzero "
+          f"{args.svizzero} squadre x {args.turni} turni, {args.ripetizioni} misure")
+    for variante, (riferimento, kernel, _) in VARIANTI.items():
+        squadre = args.svizzero if variante == "svizzero" else args.squadre
+        df = calendario(variante, random.Random(args.seed), args.gironi, squadre, args.turni)
+        t_prima = misura(lambda: riferimento(df), args.ripetizioni)
+        t_kernel = misura(lambda: kernel(df), args.ripetizioni)
+        print(f"  {variante:<15} {len(df):5d} partite   precedente p50 {np.percentile(t_prima, 50):8.2f} ms "
+              f"p95 {np.percentile(t_prima, 95):8.2f} ms   kernel p50 {np.percentile(t_kernel, 50):7.2f} ms "
+              f"p95 {np.percentile(t_kernel, 95):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+bench_classifica_aggregata.py — Parità e benchmark della classifica calcolata con l'aggregation pipeline.
+
+Genera un campionato all'italiana (andata e ritorno, risultati casuali, una parte delle
+partite non ancora validata), lo salva in entrambi i layout del calendario e confronta
+la classifica di common.classifica_aggregata con quella del kernel pandas usato da
+aggiorna_classifica() dell'app Italiana (calcola_classifica per girone, spareggi Punti e DR).
+Misura poi latenza (p50/p95) e byte trasferiti dei due percorsi.
+
+Uso:
+    python bench_classifica_aggregata.py [--uri mongodb://localhost:27017] [--mongomock]
+                                         [--gironi 8] [--squadre 12] [--ripetizioni 30]
+
+Termina con codice 1 se le classifiche non coincidono.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+
+import bson
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from common.classifica import calcola_classifica
+from common.classifica_aggregata import COLONNE_CLASSIFICA, classifica_aggregata, pipeline_classifica
+from common.partite_torneo import collection_partite, migra_torneo
+
+DB_BENCH = "BenchClassifica"
+
+
+def genera_campionato(n_gironi: int, n_squadre: int, seed: int = 0) -> list:
+    """Calendario andata e ritorno (metodo del cerchio) con il 90% delle partite validate."""
+    rnd = random.Random(seed)
+    partite = []
+    for g in range(1, n_gironi + 1):
+        squadre = [f"G{g}-Squadra {i:02d}" for i in range(n_squadre + n_squadre % 2)]
+        n_giornate = len(squadre) - 1
+        for giornata in range(1, n_giornate + 1):
+            for i in range(len(squadre) // 2):
+                casa, ospite = squadre[i], squadre[-(i + 1)]
+                if casa.endswith(f"{n_squadre:02d}") or ospite.endswith(f"{n_squadre:02d}"):
+                    continue  # riposo con numero di squadre dispari
+                for ritorno, (c, o) in enumerate(((casa, ospite), (ospite, casa))):
+                    partite.append({"Girone": f"Girone {g}", "Giornata": giornata + ritorno * n_giornate,
+                                    "Casa": c, "Ospite": o, "GolCasa": rnd.randint(0, 5),
+                                    "GolOspite": rnd.randint(0, 5), "Valida": rnd.random() < 0.9})
+            squadre = [squadre[0]] + [squadre[-1]] + squadre[1:-1]
+    return sorted(partite, key=lambda p: (p["Girone"], p["Giornata"]))
+
+
+def classifica_pandas(collection, torneo_id) -> tuple:
+    """Percorso attuale: calendario completo dal DB e kernel pandas. Ritorna (classifica, byte)."""
+    documento = collection.find_one({"_id": torneo_id}, {"calendario": 1})
+    df = pd.DataFrame(documento["calendario"])
+    df['Valida'] = df['Valida'].astype(bool)
+    classifica = calcola_classifica(df, gruppo='Girone', col_valida='Valida', spareggi=('Punti', 'DR'))
+    return classifica, len(bson.encode(documento))
+
+
+def classifica_server(collection, torneo_id, layout_partite: bool) -> tuple:
+    """Percorso aggregato. Ritorna (classifica, byte dei documenti ricevuti)."""
+    sorgente = collection_partite(collection) if layout_partite else collection
+    righe = list(sorgente.aggregate(pipeline_classifica(torneo_id, layout_partite)))
+    classifica = classifica_aggregata(collection, torneo_id, layout_partite)
+    return classifica, sum(len(bson.encode(r)) for r in righe)
+
+
+def misura(funzione, ripetizioni: int) -> np.ndarray:
+    funzione()  # riscaldamento
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return np.array(tempi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parità e benchmark della classifica aggregata.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB locale da usare")
+    parser.add_argument("--mongomock", action="store_true", help="Usa un DB in memoria (mongomock)")
+    parser.add_argument("--gironi", type=int, default=8, help="Gironi del campionato")
+    parser.add_argument("--squadre", type=int, default=12, help="Squadre per girone")
+    parser.add_argument("--ripetizioni", type=int, default=30, help="Misure per percorso")
+    parser.add_argument("--seed", type=int, default=0, help="Seme dei risultati casuali")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ --mongomock richiede il pacchetto mongomock (pip install mongomock)")
+        db = mongomock.MongoClient()[DB_BENCH]
+    else:
+        from pymongo import MongoClient
+        db = MongoClient(args.uri, serverSelectionTimeoutMS=5000)[DB_BENCH]
+
+    collection = db["tornei"]
+    calendario = genera_campionato(args.gironi, args.squadre, args.seed)
+    incorporato = collection.insert_one({"nome_torneo": "bench", "calendario": calendario,
+                                         "data_modifica": datetime.now()}).inserted_id
+    migrato = collection.insert_one({"nome_torneo": "bench_partite", "calendario": calendario,
+                                     "data_modifica": datetime.now()}).inserted_id
+    try:
+        migra_torneo(collection, migrato)
+
+        # Parità con il kernel pandas, per entrambi i layout
+        attesa, byte_pandas = classifica_pandas(collection, incorporato)
+        attesa = attesa[COLONNE_CLASSIFICA].astype({c: 'int64' for c in COLONNE_CLASSIFICA[2:]})
+        esiti = {}
+        for nome, torneo_id, layout in (("incorporato", incorporato, False), ("partite", migrato, True)):
+            ottenuta, byte_server = classifica_server(collection, torneo_id, layout)
+            try:
+                assert_frame_equal(ottenuta.reset_index(drop=True), attesa.reset_index(drop=True))
+            except AssertionError as e:
+                print(f"❌ [PARITA {nome}] classifica diversa dal kernel pandas:\n{e}")
+                sys.exit(1)
+            esiti[nome] = byte_server
+        print(f"[PARITA] Classifiche identiche ({len(attesa)} squadre, {len(calendario)} partite, entrambi i layout)")
+
+        tempi = {
+            "pandas": misura(lambda: classifica_pandas(collection, incorporato), args.ripetizioni),
+            "pipeline": misura(lambda: classifica_aggregata(collection, incorporato, False), args.ripetizioni),
+            "pipeline partite": misura(lambda: classifica_aggregata(collection, migrato, True), args.ripetizioni),
+        }
+    finally:
+        db.client.drop_database(DB_BENCH)
+
+    byte = {"pandas": byte_pandas, "pipeline": esiti["incorporato"], "pipeline partite": esiti["partite"]}
+    print(f"[BENCH CLASSIFICA] {args.gironi} gironi x {args.squadre} squadre, {args.ripetizioni} misure per percorso")
+    if args.mongomock:
+        print("  (mongomock esegue le pipeline in Python: latenze non rappresentative, byte sì)")
+    for nome, t in tempi.items():
+        print(f"  {nome:<17} p50 {np.percentile(t, 50):8.2f} ms   p95 {np.percentile(t, 95):8.2f} ms   "
+              f"trasferiti {byte[nome] / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+bench_risultati.py — Parità e benchmark dell'aggiornamento dei risultati sul calendario.
+
+Confronta i percorsi precedenti di salva_risultati_giornata() e gestisci_abbandoni()
+(copia del calendario + ciclo iterrows con assegnazioni df.loc riga per riga e controllo
+"sottostringa" dei ritirati) con common.risultati.aggiorna_risultati() e applica_abbandoni(),
+su campionati generati di dimensione crescente e con un numero crescente di ritiri.
+I valori dei widget sono simulati con un dizionario al posto di st.session_state.
+
+Uso:
+    python bench_risultati.py [--gironi 4] [--squadre 8 16 32] [--ritirati 1 4 8]
+                              [--ripetizioni 20] [--seed 0]
+
+Termina con codice 1 se i calendari ottenuti non coincidono.
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from common.risultati import aggiorna_risultati, applica_abbandoni
+
+
+def genera_calendario(n_gironi: int, n_squadre: int, seed: int = 0) -> pd.DataFrame:
+    """Calendario di sola andata (metodo del cerchio), nomi 'Squadra-Giocatore' come nell'app."""
+    rnd = random.Random(seed)
+    partite = []
+    for g in range(1, n_gironi + 1):
+        squadre = [f"Squadra{g}_{i:02d}-Giocatore{g}_{i:02d}" for i in range(n_squadre + n_squadre % 2)]
+        for giornata in range(1, len(squadre)):
+            for i in range(len(squadre) // 2):
+                partite.append({"Girone": f"Girone {g}", "Giornata": giornata,
+                                "Casa": squadre[i], "Ospite": squadre[-(i + 1)],
+                                "GolCasa": 0, "GolOspite": 0, "Valida": rnd.random() < 0.5})
+            squadre = [squadre[0]] + [squadre[-1]] + squadre[1:-1]
+    return pd.DataFrame(partite)
+
+
+def valori_widget(df: pd.DataFrame, girone: str, giornata: int, seed: int) -> dict:
+    """Simula st.session_state con i valori inseriti per la giornata."""
+    rnd = random.Random(seed)
+    stato = {}
+    giornata_df = df[(df['Girone'] == girone) & (df['Giornata'] == giornata)]
+    for casa, ospite in zip(giornata_df['Casa'], giornata_df['Ospite']):
+        k = f"{girone}_{giornata}_{casa}_{ospite}"
+        stato[f"golcasa_{k}"] = rnd.randint(0, 5)
+        stato[f"golospite_{k}"] = rnd.randint(0, 5)
+        stato[f"valida_{k}"] = rnd.random() < 0.8
+    return stato
+
+
+def risultati_precedente(df_torneo: pd.DataFrame, stato: dict, girone_sel: str, giornata_sel: int) -> pd.DataFrame:
+    """Percorso precedente di salva_risultati_giornata(): copia + iterrows + df.loc per riga."""
+    df = df_torneo.copy()
+    mask = (df['Girone'] == girone_sel) & (df['Giornata'] == giornata_sel)
+    df_giornata = df[mask].copy()
+    for idx, row in df_giornata.iterrows():
+        key_golcasa = f"golcasa_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
+        key_golospite = f"golospite_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
+        key_valida = f"valida_{girone_sel}_{giornata_sel}_{row['Casa']}_{row['Ospite']}"
+        df.loc[idx, 'GolCasa'] = int(stato.get(key_golcasa, 0) or 0)
+        df.loc[idx, 'GolOspite'] = int(stato.get(key_golospite, 0) or 0)
+        df.loc[idx, 'Valida'] = bool(stato.get(key_valida, False))
+    return df
+
+
+def risultati_vettoriale(df: pd.DataFrame, stato: dict, girone_sel: str, giornata_sel: int) -> pd.DataFrame:
+    """Percorso attuale di salva_risultati_giornata(): aggiornamento in blocco, in-place."""
+    mask = (df['Girone'] == girone_sel) & (df['Giornata'] == giornata_sel)
+    indici = df.index[mask]
+    prefissi = [
+        f"{girone_sel}_{giornata_sel}_{casa}_{ospite}"
+        for casa, ospite in zip(df.loc[indici, 'Casa'], df.loc[indici, 'Ospite'])
+    ]
+    aggiorna_risultati(
+        df,
+        indici,
+        [stato.get(f"golcasa_{k}", 0) or 0 for k in prefissi],
+        [stato.get(f"golospite_{k}", 0) or 0 for k in prefissi],
+        [bool(stato.get(f"valida_{k}", False)) for k in prefissi],
+    )
+    return df
+
+
+def abbandoni_precedente(df_torneo: pd.DataFrame, squadre_da_ritirare: list) -> tuple:
+    """Percorso precedente di gestisci_abbandoni(): copia + iterrows + any() per riga."""
+    df = df_torneo.copy()
+    matches_to_update = 0
+    for idx, row in df.iterrows():
+        casa_ritirato = any(ritirato in row['Casa'] for ritirato in squadre_da_ritirare)
+        ospite_ritirato = any(ritirato in row['Ospite'] for ritirato in squadre_da_ritirare)
+        if casa_ritirato and not ospite_ritirato:
+            df.loc[idx, 'GolCasa'] = 0
+            df.loc[idx, 'GolOspite'] = 3
+            df.loc[idx, 'Valida'] = True
+            matches_to_update += 1
+        elif ospite_ritirato and not casa_ritirato:
+            df.loc[idx, 'GolCasa'] = 3
+            df.loc[idx, 'GolOspite'] = 0
+            df.loc[idx, 'Valida'] = True
+            matches_to_update += 1
+        elif casa_ritirato and ospite_ritirato:
+            df.loc[idx, 'GolCasa'] = 0
+            df.loc[idx, 'GolOspite'] = 0
+            df.loc[idx, 'Valida'] = True
+            matches_to_update += 1
+    return df, matches_to_update
+
+
+def normalizza(df: pd.DataFrame) -> pd.DataFrame:
+    """Stessi tipi della conversione esplicita fatta dall'app prima del salvataggio."""
+    return df.astype({'GolCasa': 'int64', 'GolOspite': 'int64', 'Valida': bool})
+
+
+def misura(funzione, ripetizioni: int) -> np.ndarray:
+    funzione()  # riscaldamento
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return np.array(tempi)
+
+
+def riga(etichetta: str, precedente: np.ndarray, attuale: np.ndarray) -> str:
+    p50_prec, p50_att = np.percentile(precedente, 50), np.percentile(attuale, 50)
+    return (f"  {etichetta:<28} precedente p50 {p50_prec:8.2f} ms  p95 {np.percentile(precedente, 95):8.2f} ms   "
+            f"attuale p50 {p50_att:7.2f} ms  p95 {np.percentile(attuale, 95):7.2f} ms   x{p50_prec / p50_att:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parità e benchmark dell'aggiornamento dei risultati.")
+    parser.add_argument("--gironi", type=int, default=4, help="Gironi del campionato")
+    parser.add_argument("--squadre", type=int, nargs="+", default=[8, 16, 32], help="Squadre per girone (una misura per valore)")
+    parser.add_argument("--ritirati", type=int, nargs="+", default=[1, 4, 8], help="Giocatori ritirati (una misura per valore)")
+    parser.add_argument("--ripetizioni", type=int, default=20, help="Misure per percorso")
+    parser.add_argument("--seed", type=int, default=0, help="Seme dei risultati casuali")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    righe_risultati, righe_abbandoni = [], []
+    for n_squadre in args.squadre:
+        calendario = genera_calendario(args.gironi, n_squadre, args.seed)
+        girone, giornata = "Girone 1", 1
+        stato = valori_widget(calendario, girone, giornata, args.seed)
+
+        # Salvataggio dei risultati di una giornata
+        atteso = normalizza(risultati_precedente(calendario, stato, girone, giornata))
+        ottenuto = normalizza(risultati_vettoriale(calendario.copy(), stato, girone, giornata))
+        try:
+            assert_frame_equal(ottenuto, atteso)
+        except AssertionError as e:
+            print(f"❌ [PARITA risultati] {n_squadre} squadre per girone:\n{e}")
+            sys.exit(1)
+        precedente = misura(lambda: risultati_precedente(calendario, stato, girone, giornata), args.ripetizioni)
+        # Il percorso attuale lavora in-place: la copia per ogni misura è preparata fuori dal tempo
+        copie = [calendario.copy() for _ in range(args.ripetizioni + 1)]
+        attuale = misura(lambda: risultati_vettoriale(copie.pop(), stato, girone, giornata), args.ripetizioni)
+        righe_risultati.append(riga(f"{len(calendario)} partite", precedente, attuale))
+
+        # Ritiri: nomi 'Squadra-Giocatore' come in st.session_state['giocatori_ritirati']
+        squadre = sorted(set(calendario['Casa']) | set(calendario['Ospite']))
+        for n_ritirati in args.ritirati:
+            ritirati = rnd.sample(squadre, min(n_ritirati, len(squadre)))
+            atteso, n_atteso = abbandoni_precedente(calendario, ritirati)
+            ottenuto = calendario.copy()
+            n_ottenuto = applica_abbandoni(ottenuto, ritirati)
+            try:
+                assert n_ottenuto == n_atteso, f"incontri aggiornati {n_ottenuto} != {n_atteso}"
+                assert_frame_equal(normalizza(ottenuto), normalizza(atteso))
+            except AssertionError as e:
+                print(f"❌ [PARITA abbandoni] {len(calendario)} partite, {len(ritirati)} ritirati:\n{e}")
+                sys.exit(1)
+            precedente = misura(lambda: abbandoni_precedente(calendario, ritirati), args.ripetizioni)
+            copie = [calendario.copy() for _ in range(args.ripetizioni + 1)]
+            attuale = misura(lambda: applica_abbandoni(copie.pop(), ritirati), args.ripetizioni)
+            righe_abbandoni.append(riga(f"{len(calendario)} partite, {len(ritirati)} ritirati", precedente, attuale))
+
+    print(f"[PARITA] Calendari identici ({len(args.squadre)} dimensioni, ritirati {args.ritirati})")
+    print(f"[BENCH RISULTATI] salvataggio di una giornata, {args.gironi} gironi, {args.ripetizioni} misure per percorso")
+    print("\n".join(righe_risultati))
+    print(f"[BENCH ABBANDONI] risultati a tavolino, {args.ripetizioni} misure per percorso")
+    print("\n".join(righe_abbandoni))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,2 @@
 # common package - Moduli condivisi per Tournament Manager Subbuteo
-# Contiene: styles, audio, db_utils, ui_components
+# Contiene: styles, audio, db_utils, ui_components, risultati, tabellone, classifica, eliminazione_tornei, rating, qualificazione, accoppiamenti_svizzero, coda_offline, concorrenza, osservatore_tornei, vista_pubblica, torneo_svizzero, partite_torneo, classifica_aggregata
@@ -0,0 +1,138 @@
+"""
+accoppiamenti_svizzero.py — Logica pura (senza Streamlit) degli accoppiamenti del torneo svizzero.
+
+Fornisce:
+  - fase_turno(): fase di ordinamento del turno (potenziale, mix, classifica)
+  - ordina_squadre(): ordine delle squadre secondo la fase
+  - scegli_riposo(): squadra che riposa quando le squadre sono dispari
+  - accoppia(): backtracking "stretto" sull'ordine e fallback "permissivo" su ordine casuale
+  - classifica_svizzera(): classifica con le regole di spareggio dello Svizzero
+
+Usata da genera_accoppiamenti() dell'app e dal simulatore headless simula_svizzero.py,
+così che entrambi applichino esattamente le stesse regole.
+"""
+import random
+
+import pandas as pd
+
+from common.classifica import calcola_classifica
+
+BYE = "RIPOSA"
+# Ultimo turno della fase "potenziale" e ultimo della fase "mix"; poi solo classifica
+SOGLIE_FASI = (2, 4)
+SPAREGGI_SVIZZERO = ('Punti', 'scontri_diretti', 'DR', 'GF', 'Squadra_ci')
+
+
+def fase_turno(turno: int, soglie: tuple = SOGLIE_FASI) -> str:
+    """Ritorna 'potenziale', 'mix' o 'classifica' per il turno indicato."""
+    fine_potenziale, fine_mix = soglie
+    if turno <= fine_potenziale:
+        return "potenziale"
+    if turno <= fine_mix:
+        return "mix"
+    return "classifica"
+
+
+def classifica_svizzera(df: pd.DataFrame) -> pd.DataFrame:
+    """Classifica del torneo svizzero (nomi canonici di calcola_classifica, senza RIPOSA)."""
+    return calcola_classifica(
+        df,
+        col_valida='Validata',
+        spareggi=SPAREGGI_SVIZZERO,
+        bye=BYE,
+        includi_non_giocate=True,
+    )
+
+
+def ordina_squadre(fase: str, classifica: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordina le squadre secondo la fase del turno.
+
+    Args:
+        fase: 'potenziale', 'mix' o 'classifica'.
+        classifica: Squadre con colonna Potenziale numerica; per 'mix' e 'classifica'
+            devono essere già nell'ordine di classifica.
+
+    Returns:
+        DataFrame riordinato (indice ripristinato).
+    """
+    if fase == "potenziale":
+        return classifica.sort_values(by="Potenziale", ascending=False).reset_index(drop=True)
+    if fase == "mix":
+        # Punteggio misto: 50% posizione per potenziale, 50% posizione in classifica
+        classifica = classifica.copy()
+        classifica["PosClassifica"] = range(1, len(classifica) + 1)
+        classifica["RankPotenziale"] = classifica["Potenziale"].rank(ascending=False, method="min")
+        classifica["MixScore"] = (
+            classifica["RankPotenziale"] * 0.5 +
+            classifica["PosClassifica"] * 0.5
+        )
+        return classifica.sort_values(by="MixScore", ascending=True).reset_index(drop=True)
+    return classifica
+
+
+def scegli_riposo(classifica: pd.DataFrame, fase: str, gia_riposo: set):
+    """
+    Sceglie la squadra che riposa (squadre dispari).
+
+    - Fase potenziale: la squadra con potenziale più basso tra chi non ha ancora riposato
+    - Fase mix/classifica: l'ultima nell'ordine tra chi non ha ancora riposato
+    - Se tutte hanno già riposato il ciclo dei riposi ricomincia
+
+    Returns:
+        Tupla (squadra che riposa, True se il ciclo dei riposi è stato azzerato).
+    """
+    squadre = classifica["Squadra"].tolist()
+    candidati = [s for s in squadre if s not in gia_riposo]
+    ciclo_azzerato = not candidati
+    if ciclo_azzerato:
+        candidati = list(squadre)
+
+    df_candidati = classifica[classifica["Squadra"].isin(candidati)]
+    if fase == "potenziale":
+        return df_candidati.sort_values(by="Potenziale", ascending=True).iloc[0]["Squadra"], ciclo_azzerato
+    return df_candidati.iloc[-1]["Squadra"], ciclo_azzerato
+
+
+def _backtrack(da_accoppiare: list, accoppiamenti: list, precedenti: set):
+    """
+    Prende la prima squadra della lista e prova ad accoppiarla con la più vicina disponibile
+    (quella subito dopo nella lista ordinata); se la coppia è già stata giocata prova la
+    successiva, e se nessun accoppiamento funziona per il resto del gruppo torna indietro.
+    """
+    if not da_accoppiare:
+        return accoppiamenti
+    s1 = da_accoppiare[0]
+    for i, s2 in enumerate(da_accoppiare[1:], 1):
+        if (s1, s2) in precedenti or (s2, s1) in precedenti:
+            continue
+        nuove_rimanenti = [x for j, x in enumerate(da_accoppiare) if j not in (0, i)]
+        risultato = _backtrack(nuove_rimanenti, accoppiamenti + [(s1, s2)], precedenti)
+        if risultato is not None:
+            return risultato
+    return None
+
+
+def accoppia(squadre: list, precedenti: set, rng: random.Random = None):
+    """
+    Forma le coppie del turno evitando le rivincite.
+
+    1. Backtracking "stretto" sull'ordine ricevuto (classifica/potenziale)
+    2. Fallback "permissivo": backtracking su un ordine casuale
+
+    Args:
+        squadre: Squadre da accoppiare, già ordinate (senza chi riposa).
+        precedenti: Coppie già giocate, come tuple (a, b) in qualsiasi ordine.
+        rng: Generatore casuale per il fallback (default: modulo random).
+
+    Returns:
+        Tupla (lista di coppie oppure None se gli incroci sono esauriti,
+        True se è stato necessario il fallback permissivo).
+    """
+    accoppiamenti = _backtrack(list(squadre), [], precedenti)
+    if accoppiamenti is not None:
+        return accoppiamenti, False
+
+    squadre_permissive = list(squadre)
+    (rng or random).shuffle(squadre_permissive)
+    return _backtrack(squadre_permissive, [], precedenti), True
@@ -3,14 +3,29 @@ audio.py — Gestione audio di sottofondo per le app Subbuteo.
 
 Funzionalità:
   - autoplay_background_audio(): Audio persistente con loop (per sottofondo)
-  - autoplay_audio(): Audio one-shot (per eventi come vittoria)
+  - autoplay_audio(): Audio one-shot (per eventi come vittoria) dai bytes, inline in base64
+  - percorso_asset(): copia locale di un file di static/ (scaricata una volta e rivalidata con ETag)
+  - url_asset(): URL di un file servito da static/
+  - riproduci_audio(): audio one-shot per URL, senza bytes nel websocket
+  - riproduci_celebrazione(): musica di fine torneo dal file locale, via endpoint media di Streamlit
   - toggle_audio_callback(): Callback per checkbox mute/unmute
   - setup_audio_sidebar(): Widget sidebar per gestire audio on/off
 """
 import streamlit as st
 import base64
+import os
 import requests
 
+# Servito da Streamlit (server.enableStaticServing) all'indirizzo /app/static/<file>.
+# Il gestore statico invia con il MIME reale solo immagini, font, .pdf, .xml e .json:
+# gli altri file (es. .mp3) arrivano come text/plain con nosniff e Firefox non li riproduce.
+CARTELLA_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+URL_STATIC = "/app/static"
+AUDIO_CELEBRAZIONE = "wearethechamp.mp3"
+URL_REMOTO_CELEBRAZIONE = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/docs/wearethechamp.mp3"
+# Intervallo minimo tra due rivalidazioni di una copia scaricata
+TTL_ASSET_REMOTI = 24 * 3600
+
 
 def autoplay_background_audio(audio_url: str) -> bool:
     """
@@ -87,6 +102,96 @@ def autoplay_audio(audio_data: bytes):
     st.markdown(md, unsafe_allow_html=True)
 
 
+def _scarica_con_etag(url: str, percorso: str, timeout: int = 10) -> bool:
+    """
+    Scarica `url` in `percorso` con una GET condizionata sull'ETag salvato accanto al file.
+
+    Returns:
+        True se dopo la chiamata esiste una copia locale (nuova o ancora valida).
+    """
+    file_etag = percorso + ".etag"
+    headers = {}
+    if os.path.exists(percorso) and os.path.exists(file_etag):
+        with open(file_etag, encoding="utf-8") as f:
+            headers["If-None-Match"] = f.read().strip()
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return True
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"[AUDIO] Download di {url} non riuscito: {e}")
+        return os.path.exists(percorso)
+    temporaneo = percorso + ".tmp"
+    with open(temporaneo, "wb") as f:
+        f.write(response.content)
+    os.replace(temporaneo, percorso)
+    with open(file_etag, "w", encoding="utf-8") as f:
+        f.write(response.headers.get("ETag", ""))
+    return True
+
+
+@st.cache_resource(ttl=TTL_ASSET_REMOTI, show_spinner=False)
+def percorso_asset(nome: str, url_remoto: str = None):
+    """
+    Percorso locale di un asset di static/, o None se non è disponibile.
+
+    I file inclusi nel repository sono usati così come sono, senza traffico in uscita.
+    Se il file manca e c'è `url_remoto`, viene scaricato una volta in static/ (con il suo
+    ETag, rivalidato al massimo ogni TTL_ASSET_REMOTI secondi).
+
+    Args:
+        nome: Nome del file in static/.
+        url_remoto: Origine remota dell'asset (opzionale).
+    """
+    percorso = os.path.join(CARTELLA_STATIC, nome)
+    scaricato = os.path.exists(percorso + ".etag")
+    if url_remoto and (scaricato or not os.path.exists(percorso)):
+        if not _scarica_con_etag(url_remoto, percorso):
+            return None
+    return percorso if os.path.exists(percorso) else None
+
+
+def url_asset(nome: str, url_remoto: str = None) -> str:
+    """
+    URL da cui il browser scarica un asset di static/ (o `url_remoto` se manca la copia locale).
+
+    Adatto ai tipi serviti con il MIME corretto dal gestore statico (immagini, font, .pdf,
+    .xml, .json); per l'audio usare riproduci_celebrazione().
+    """
+    if percorso_asset(nome, url_remoto) is None and url_remoto:
+        return url_remoto
+    return f"{URL_STATIC}/{nome}"
+
+
+def riproduci_audio(audio_url: str):
+    """
+    Riproduce un audio una sola volta, scaricato dal browser (nessun dato nel websocket).
+
+    Args:
+        audio_url: URL dell'mp3 (es. da url_asset()).
+    """
+    st.markdown(f"""
+        <audio autoplay="true">
+        <source src="{audio_url}" type="audio/mpeg">
+        </audio>
+        """, unsafe_allow_html=True)
+
+
+def riproduci_celebrazione():
+    """
+    Musica di fine torneo (We are the champions) dal file locale dell'app.
+
+    st.audio lo pubblica sull'endpoint media di Streamlit con Content-Type audio/mpeg:
+    il browser lo scarica via HTTP (non nel websocket) e lo riproduce anche su Firefox.
+    """
+    percorso = percorso_asset(AUDIO_CELEBRAZIONE, URL_REMOTO_CELEBRAZIONE)
+    if percorso is None:
+        riproduci_audio(URL_REMOTO_CELEBRAZIONE)
+        return
+    st.audio(percorso, format="audio/mpeg", autoplay=True)
+
+
 def toggle_audio_callback():
     """
     Callback per la checkbox dell'audio.
@@ -0,0 +1,145 @@
+"""
+classifica.py — Kernel unico per il calcolo delle classifiche (Italiana, Svizzero, Fasi Finali).
+
+Fornisce:
+  - calcola_classifica(): classifica vettoriale per gruppo con regole punti, catena di
+    spareggi e gestione del riposo configurabili
+  - to_bool_series(): conversione robusta della colonna di validazione
+
+Le statistiche prodotte hanno nomi canonici:
+    Squadra, Punti, G (giocate), V (vinte), N (pareggiate), S (perse), GF, GS, DR
+Ogni app rinomina/seleziona le colonne secondo la propria convenzione di visualizzazione.
+
+Criteri di spareggio disponibili (in ordine nella tupla `spareggi`):
+  - 'Punti', 'DR', 'GF', 'V', 'G'  -> decrescente
+  - 'scontri_diretti'              -> punti negli scontri tra squadre a pari punti (decrescente)
+  - 'Squadra'                      -> nome crescente
+  - 'Squadra_ci'                   -> nome crescente, senza distinzione maiuscole/minuscole
+"""
+import numpy as np
+import pandas as pd
+
+# Regola punti standard Subbuteo: vittoria, pareggio, sconfitta
+PUNTI_SUBBUTEO = (2, 1, 0)
+
+COLONNE_STATISTICHE = ['Squadra', 'Punti', 'G', 'V', 'N', 'S', 'GF', 'GS', 'DR']
+
+_CRITERI_CRESCENTI = {'Squadra', 'Squadra_ci'}
+
+
+def to_bool_series(s: pd.Series) -> pd.Series:
+    """Converte una serie in booleana in modo robusto (bool, 0/1, 'true', 'sì', ...)."""
+    if s.dtype == bool:
+        return s
+    return s.astype(str).str.strip().str.lower().isin(["true", "1", "s", "si", "sì", "y", "yes"])
+
+
+def _intreccia(a, b):
+    """Ritorna [a0, b0, a1, b1, ...] (stesso ordine di pd.unique su df[['Casa','Ospite']].values.ravel())."""
+    out = np.empty(len(a) * 2, dtype=np.result_type(a, b) if a.dtype != object and b.dtype != object else object)
+    out[0::2] = a
+    out[1::2] = b
+    return out
+
+
+def calcola_classifica(
+    df: pd.DataFrame,
+    gruppo: str = None,
+    col_valida: str = 'Valida',
+    punti: tuple = PUNTI_SUBBUTEO,
+    spareggi: tuple = ('Punti', 'DR'),
+    bye: str = None,
+    includi_non_giocate: bool = False,
+) -> pd.DataFrame:
+    """
+    Calcola la classifica a partire dagli incontri, senza cicli per riga.
+
+    Args:
+        df: Incontri con colonne Casa, Ospite, GolCasa, GolOspite, col_valida (e gruppo se indicato).
+        gruppo: Colonna per cui calcolare classifiche separate (es. 'Girone'); None = classifica unica.
+        col_valida: Nome della colonna di validazione ('Valida' o 'Validata').
+        punti: Tupla (vittoria, pareggio, sconfitta).
+        spareggi: Catena dei criteri di ordinamento dopo il gruppo.
+        bye: Nome della squadra fittizia di riposo (es. 'RIPOSA'): i suoi incontri non
+            producono statistiche e la squadra non compare in classifica.
+        includi_non_giocate: Se True compaiono anche le squadre senza incontri validati.
+
+    Returns:
+        DataFrame con [gruppo] + COLONNE_STATISTICHE, ordinato secondo gruppo e spareggi.
+        A parità di tutti i criteri l'ordine è quello di prima apparizione nel calendario.
+    """
+    colonne_out = ([gruppo] if gruppo else []) + COLONNE_STATISTICHE
+    richieste = {'Casa', 'Ospite', 'GolCasa', 'GolOspite', col_valida} | ({gruppo} if gruppo else set())
+    if df is None or df.empty or not richieste.issubset(df.columns):
+        return pd.DataFrame(columns=colonne_out)
+
+    valida = to_bool_series(df[col_valida]).to_numpy(dtype=bool)
+    casa = df['Casa'].to_numpy(dtype=object)
+    ospite = df['Ospite'].to_numpy(dtype=object)
+    gol_casa = pd.to_numeric(df['GolCasa'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    gol_ospite = pd.to_numeric(df['GolOspite'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    gruppi = df[gruppo].to_numpy(dtype=object) if gruppo else np.zeros(len(df), dtype=object)
+
+    riposo = ((casa == bye) | (ospite == bye)) if bye is not None else np.zeros(len(df), dtype=bool)
+    giocata = valida & ~riposo
+
+    # Formato "lungo": una riga per squadra per incontro, intrecciate casa/ospite
+    righe = pd.DataFrame({
+        '_gruppo': np.repeat(gruppi, 2),
+        'Squadra': _intreccia(casa, ospite),
+        '_avversario': _intreccia(ospite, casa),
+        'GF': _intreccia(gol_casa, gol_ospite),
+        'GS': _intreccia(gol_ospite, gol_casa),
+        '_giocata': np.repeat(giocata, 2),
+        '_presente': np.repeat(valida if not includi_non_giocate else np.ones(len(df), dtype=bool), 2),
+    })
+    righe = righe[righe['_presente'] & righe['_gruppo'].notna()]
+    if bye is not None:
+        righe = righe[righe['Squadra'] != bye]
+    if righe.empty:
+        return pd.DataFrame(columns=colonne_out)
+
+    g = righe['_giocata'].to_numpy()
+    gf = righe['GF'].to_numpy()
+    gs = righe['GS'].to_numpy()
+    righe = righe.assign(
+        G=g.astype(np.int64),
+        V=(g & (gf > gs)).astype(np.int64),
+        N=(g & (gf == gs)).astype(np.int64),
+        S=(g & (gf < gs)).astype(np.int64),
+        GF=np.where(g, gf, 0),
+        GS=np.where(g, gs, 0),
+    )
+    pv, pn, ps = punti
+    righe['_punti'] = righe['V'] * pv + righe['N'] * pn + righe['S'] * ps
+
+    tab = righe.groupby(['_gruppo', 'Squadra'], sort=False)[['_punti', 'G', 'V', 'N', 'S', 'GF', 'GS']].sum()
+    tab = tab.rename(columns={'_punti': 'Punti'})
+    tab['DR'] = tab['GF'] - tab['GS']
+
+    if 'scontri_diretti' in spareggi:
+        # Punti ottenuti solo negli incontri contro squadre dello stesso gruppo a pari punti
+        giocate = righe[righe['_giocata']]
+        chiave_propria = pd.MultiIndex.from_arrays([giocate['_gruppo'], giocate['Squadra']])
+        chiave_avv = pd.MultiIndex.from_arrays([giocate['_gruppo'], giocate['_avversario']])
+        punti_propri = tab['Punti'].reindex(chiave_propria).to_numpy()
+        punti_avv = tab['Punti'].reindex(chiave_avv).to_numpy()
+        pari = punti_propri == punti_avv
+        sd = pd.Series(np.where(pari, giocate['_punti'].to_numpy(), 0), index=chiave_propria)
+        tab['scontri_diretti'] = sd.groupby(level=[0, 1], sort=False).sum().reindex(tab.index).fillna(0).astype(np.int64)
+
+    tab = tab.reset_index()
+
+    by, ascending = [], []
+    if gruppo:
+        by.append('_gruppo'); ascending.append(True)
+    for criterio in spareggi:
+        if criterio == 'Squadra_ci':
+            tab['Squadra_ci'] = tab['Squadra'].astype(str).str.lower()
+        by.append(criterio)
+        ascending.append(criterio in _CRITERI_CRESCENTI)
+    if by:
+        tab = tab.sort_values(by=by, ascending=ascending, kind='mergesort')
+
+    tab = tab.rename(columns={'_gruppo': gruppo}) if gruppo else tab
+    return tab[colonne_out].reset_index(drop=True)
@@ -0,0 +1,146 @@
+"""
+classifica_aggregata.py — Classifica dei gironi all'italiana calcolata da MongoDB (aggregation pipeline).
+
+Fornisce:
+  - pipeline_classifica(): pipeline che produce direttamente la tabella della classifica
+  - classifica_aggregata(): esegue la pipeline e ritorna lo stesso DataFrame di
+    calcola_classifica(df, gruppo='Girone', col_valida='Valida')
+
+Pensata per chi legge soltanto (riepiloghi, tabellone, report): invece di scaricare
+l'intero calendario e ricostruirlo in pandas, il server esegue $unwind del calendario,
+$match delle partite validate, $facet casa/ospite e $group per (Girone, Squadra) e
+trasferisce una riga per squadra. Funziona con entrambi i layout del calendario
+(incorporato o collection delle partite, vedi common.partite_torneo).
+
+Differenze rispetto al kernel pandas: niente spareggio 'scontri_diretti' e gol non
+numerici (stringhe) non ammessi; i calendari salvati dalle app usano interi o null.
+"""
+import pandas as pd
+
+from common.classifica import PUNTI_SUBBUTEO, COLONNE_STATISTICHE
+from common.partite_torneo import CAMPO_LAYOUT, CAMPO_TORNEO, collection_partite, usa_collection_partite
+
+# Valori di 'Valida' considerati veri (come to_bool_series)
+VALORI_VALIDA = [True, 1, "true", "True", "TRUE", "1", "s", "si", "sì", "y", "yes"]
+SPAREGGI_SUPPORTATI = {'Punti', 'DR', 'GF', 'V', 'G', 'Squadra'}
+COLONNE_CLASSIFICA = ['Girone'] + COLONNE_STATISTICHE
+
+
+def _intero(campo: str) -> dict:
+    return {"$toLong": {"$ifNull": [campo, 0]}}
+
+
+def _lato(squadra: str, gol_fatti: str, gol_subiti: str, lato: int) -> list:
+    """Statistiche per (Girone, Squadra) di un lato (casa o ospite) delle partite."""
+    gf, gs = f"${gol_fatti}", f"${gol_subiti}"
+    vinta = {"$cond": [{"$gt": [gf, gs]}, 1, 0]}
+    pari = {"$cond": [{"$eq": [gf, gs]}, 1, 0]}
+    persa = {"$cond": [{"$lt": [gf, gs]}, 1, 0]}
+    return [
+        {"$match": {squadra: {"$ne": None}}},
+        {"$group": {
+            "_id": {"Girone": "$Girone", "Squadra": f"${squadra}"},
+            "G": {"$sum": 1}, "V": {"$sum": vinta}, "N": {"$sum": pari}, "S": {"$sum": persa},
+            "GF": {"$sum": gf}, "GS": {"$sum": gs},
+            # Prima apparizione nel calendario (casa e ospite intrecciati), per gli spareggi a pari merito
+            "Primo": {"$min": {"$add": [{"$multiply": ["$Ordine", 2]}, lato]}},
+        }},
+    ]
+
+
+def pipeline_classifica(torneo_id, layout_partite: bool = False, punti: tuple = PUNTI_SUBBUTEO,
+                        spareggi: tuple = ('Punti', 'DR'), escludi_gironi: tuple = ()) -> list:
+    """
+    Pipeline di aggregazione della classifica per girone.
+
+    Args:
+        torneo_id: _id del torneo (ObjectId).
+        layout_partite: True se il calendario è nella collection delle partite
+            (la pipeline va eseguita su collection_partite()).
+        punti: Tupla (vittoria, pareggio, sconfitta).
+        spareggi: Criteri di ordinamento dopo il girone (tra SPAREGGI_SUPPORTATI).
+        escludi_gironi: Gironi da ignorare (es. "Eliminazione Diretta").
+
+    Returns:
+        Lista di stage; ogni documento prodotto è una riga di COLONNE_CLASSIFICA più `Primo`.
+    """
+    non_supportati = set(spareggi) - SPAREGGI_SUPPORTATI
+    if non_supportati:
+        raise ValueError(f"Spareggi non supportati dalla pipeline: {sorted(non_supportati)}")
+
+    prefisso = "" if layout_partite else "calendario."
+    filtro_partite = {
+        f"{prefisso}Valida": {"$in": VALORI_VALIDA},
+        f"{prefisso}Girone": {"$ne": None, "$nin": list(escludi_gironi)},
+    }
+    if layout_partite:
+        stadi = [{"$match": {CAMPO_TORNEO: torneo_id, **filtro_partite}}]
+    else:
+        stadi = [
+            {"$match": {"_id": torneo_id}},
+            {"$project": {"calendario": 1}},
+            {"$unwind": {"path": "$calendario", "includeArrayIndex": "Ordine"}},
+            {"$match": filtro_partite},
+        ]
+    stadi.append({"$project": {
+        "_id": 0,
+        "Girone": f"${prefisso}Girone",
+        "Casa": f"${prefisso}Casa",
+        "Ospite": f"${prefisso}Ospite",
+        "GolCasa": _intero(f"${prefisso}GolCasa"),
+        "GolOspite": _intero(f"${prefisso}GolOspite"),
+        "Ordine": 1,
+    }})
+
+    pv, pn, ps = punti
+    ordinamento = {"Girone": 1}
+    for criterio in spareggi:
+        ordinamento[criterio] = 1 if criterio == 'Squadra' else -1
+    ordinamento["Primo"] = 1
+    return stadi + [
+        {"$facet": {
+            "casa": _lato("Casa", "GolCasa", "GolOspite", 0),
+            "ospite": _lato("Ospite", "GolOspite", "GolCasa", 1),
+        }},
+        {"$project": {"righe": {"$concatArrays": ["$casa", "$ospite"]}}},
+        {"$unwind": "$righe"},
+        {"$group": {
+            "_id": "$righe._id",
+            **{c: {"$sum": f"$righe.{c}"} for c in ("G", "V", "N", "S", "GF", "GS")},
+            "Primo": {"$min": "$righe.Primo"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "Girone": "$_id.Girone",
+            "Squadra": "$_id.Squadra",
+            "Punti": {"$add": [{"$multiply": ["$V", pv]}, {"$multiply": ["$N", pn]}, {"$multiply": ["$S", ps]}]},
+            "G": 1, "V": 1, "N": 1, "S": 1, "GF": 1, "GS": 1,
+            "DR": {"$subtract": ["$GF", "$GS"]},
+            "Primo": 1,
+        }},
+        {"$sort": ordinamento},
+    ]
+
+
+def classifica_aggregata(collection, torneo_id, layout_partite: bool = None, **kwargs) -> pd.DataFrame:
+    """
+    Classifica per girone calcolata sul server.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        torneo_id: _id del torneo (ObjectId).
+        layout_partite: Layout del calendario; None = letto dal documento torneo.
+        **kwargs: punti, spareggi, escludi_gironi (vedi pipeline_classifica).
+
+    Returns:
+        DataFrame con COLONNE_CLASSIFICA, ordinato per girone e spareggi.
+    """
+    if layout_partite is None:
+        layout_partite = usa_collection_partite(collection.find_one({"_id": torneo_id}, {CAMPO_LAYOUT: 1}))
+    sorgente = collection_partite(collection) if layout_partite else collection
+    righe = list(sorgente.aggregate(pipeline_classifica(torneo_id, layout_partite, **kwargs)))
+    if not righe:
+        return pd.DataFrame(columns=COLONNE_CLASSIFICA)
+    df = pd.DataFrame(righe, columns=COLONNE_CLASSIFICA)
+    df[COLONNE_STATISTICHE[1:]] = df[COLONNE_STATISTICHE[1:]].astype('int64')
+    return df
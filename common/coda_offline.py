@@ -0,0 +1,343 @@
+"""
+coda_offline.py — Coda di scrittura durevole (journal SQLite) per i salvataggi dei risultati.
+
+Fornisce:
+  - CodaOffline: journal locale write-ahead delle operazioni di salvataggio su MongoDB
+  - percorso_coda(): file del journal di un'app e della sua collection
+  - ReplayerCoda: thread in background che riapplica le operazioni in attesa alla riconnessione
+  - errore_di_connessione(): riconosce gli errori di rete di pymongo
+
+Ogni salvataggio viene prima scritto nel journal e poi applicato a MongoDB; se la rete
+non è disponibile l'operazione resta "in_attesa" e l'interfaccia prosegue subito.
+Le righe applicate subito vengono rimosse dal journal; quelle applicate dal replayer
+restano consultabili per CONSERVAZIONE_APPLICATE e poi vengono compattate (compatta()).
+Ogni app e club ha il proprio journal (percorso_coda()): il replayer lo riapplica con il
+client della sua app e i conteggi della sidebar riguardano solo quella collection.
+Il replay è idempotente (l'id operazione viene registrato nel documento, campo
+CAMPO_OPERAZIONI) e rileva i conflitti su `data_modifica`: un'operazione in attesa viene
+applicata solo se il documento non è stato modificato da altri dopo la versione da cui
+la sessione era partita. Un conflitto blocca anche le operazioni successive della stessa
+sessione che partivano dalla versione in conflitto; restano tutte consultabili nel journal.
+Ogni operazione applicata incrementa anche la revisione `rev` del documento, così che i
+salvataggi versionati (common.concorrenza) delle altre sessioni se ne accorgano.
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from bson import json_util
+from pymongo.errors import ConnectionFailure
+
+from common.concorrenza import CAMPO_REV
+
+STATO_IN_ATTESA = "in_attesa"
+STATO_APPLICATA = "applicata"
+STATO_CONFLITTO = "conflitto"
+
+CAMPO_OPERAZIONI = "operazioni_offline"
+MAX_OPERAZIONI_REGISTRATE = 200
+INTERVALLO_REPLAY = 15.0
+CONSERVAZIONE_APPLICATE = timedelta(days=7)
+
+CARTELLA_DEFAULT = os.getenv("SUBBUTEO_CODA_OFFLINE") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".coda_offline"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operazioni (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op_id TEXT UNIQUE NOT NULL,
+    creata TEXT NOT NULL,
+    database TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    filtro TEXT NOT NULL,
+    campi TEXT NOT NULL,
+    base_modifica TEXT,
+    upsert INTEGER NOT NULL DEFAULT 0,
+    stato TEXT NOT NULL DEFAULT 'in_attesa',
+    tentativi INTEGER NOT NULL DEFAULT 0,
+    errore TEXT
+)
+"""
+
+
+def percorso_coda(app: str, collection: str) -> str:
+    """
+    File del journal di un'app per una collection (es. "italiana", "Superba").
+
+    Le operazioni di app diverse vanno riapplicate con client diversi (MONGO_URI_TOURNEMENTS
+    per l'Italiana, MONGO_URI per lo Svizzero): ognuna ha quindi il proprio journal.
+    """
+    return os.path.join(CARTELLA_DEFAULT, f"{app}_{collection}.sqlite")
+
+
+def errore_di_connessione(e: Exception) -> bool:
+    """True se l'eccezione indica che MongoDB non è raggiungibile (rete assente, timeout)."""
+    return isinstance(e, ConnectionFailure)
+
+
+class CodaOffline:
+    """Journal SQLite delle operazioni di salvataggio, condivisibile tra thread e processi."""
+
+    def __init__(self, percorso: str):
+        """
+        Args:
+            percorso: File SQLite del journal (di norma da percorso_coda()).
+        """
+        self.percorso = percorso
+        os.makedirs(os.path.dirname(self.percorso) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Serializza l'applicazione diretta di salva() e il replay: la stessa operazione
+        # non viene mai scritta su MongoDB da due thread contemporaneamente
+        self._lock_applicazione = threading.Lock()
+        self._conn = sqlite3.connect(self.percorso, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+    def accoda(self, database: str, collection: str, filtro: dict, campi: dict,
+               base_modifica: datetime = None, upsert: bool = False) -> str:
+        """
+        Registra un'operazione `$set` nel journal (prima di qualsiasi scrittura remota).
+
+        Args:
+            database: Nome del database MongoDB.
+            collection: Nome della collection.
+            filtro: Filtro del documento (es. {"_id": ObjectId(...)}).
+            campi: Campi da impostare con $set (di norma include data_modifica).
+            base_modifica: `data_modifica` del documento da cui la sessione è partita;
+                None = nessun controllo dei conflitti.
+            upsert: Crea il documento se non esiste (es. torneo creato offline).
+
+        Returns:
+            Identificativo dell'operazione.
+        """
+        op_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO operazioni (op_id, creata, database, collection, filtro, campi, base_modifica, upsert) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (op_id, datetime.now().isoformat(), database, collection,
+                 json_util.dumps(filtro), json_util.dumps(campi),
+                 json_util.dumps(base_modifica) if base_modifica is not None else None, int(upsert)),
+            )
+        return op_id
+
+    def _segna(self, op_id: str, stato: str, errore: str = None, tentativo: bool = False):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE operazioni SET stato = ?, errore = ?, tentativi = tentativi + ? WHERE op_id = ?",
+                (stato, errore, int(tentativo), op_id),
+            )
+
+    def _rimuovi(self, op_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM operazioni WHERE op_id = ?", (op_id,))
+
+    def compatta(self, conservazione: timedelta = CONSERVAZIONE_APPLICATE) -> int:
+        """
+        Elimina le operazioni applicate registrate da più di `conservazione`.
+
+        Le operazioni in attesa o in conflitto non vengono mai eliminate.
+
+        Returns:
+            Numero di righe eliminate.
+        """
+        limite = (datetime.now() - conservazione).isoformat()
+        with self._lock:
+            cursore = self._conn.execute(
+                "DELETE FROM operazioni WHERE stato = ? AND creata < ?", (STATO_APPLICATA, limite)
+            )
+        return cursore.rowcount
+
+    def segna_applicate(self, op_ids: list, nota: str = None):
+        """
+        Chiude operazioni in attesa il cui contenuto è già stato scritto da un salvataggio
+        successivo della stessa sessione (es. salvataggio versionato tornato online).
+        """
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE operazioni SET stato = ?, errore = ? WHERE op_id = ? AND stato = ?",
+                [(STATO_APPLICATA, nota, op_id, STATO_IN_ATTESA) for op_id in op_ids],
+            )
+
+    def _stato(self, op_id: str) -> str:
+        with self._lock:
+            riga = self._conn.execute("SELECT stato FROM operazioni WHERE op_id = ?", (op_id,)).fetchone()
+        return riga[0] if riga else None
+
+    def operazioni(self, stato: str = STATO_IN_ATTESA) -> list:
+        """Operazioni nello stato indicato, in ordine di registrazione, con i campi decodificati."""
+        with self._lock:
+            righe = self._conn.execute("SELECT * FROM operazioni WHERE stato = ? ORDER BY id", (stato,)).fetchall()
+        operazioni = []
+        for riga in righe:
+            op = dict(riga)
+            op["filtro"] = json_util.loads(op["filtro"])
+            op["campi"] = json_util.loads(op["campi"])
+            op["base_modifica"] = json_util.loads(op["base_modifica"]) if op["base_modifica"] else None
+            op["upsert"] = bool(op["upsert"])
+            operazioni.append(op)
+        return operazioni
+
+    def conteggi(self) -> dict:
+        """Numero di operazioni per stato, es. {"in_attesa": 2, "conflitto": 0, ...}."""
+        with self._lock:
+            righe = self._conn.execute("SELECT stato, COUNT(*) FROM operazioni GROUP BY stato").fetchall()
+        conteggi = {STATO_IN_ATTESA: 0, STATO_APPLICATA: 0, STATO_CONFLITTO: 0}
+        conteggi.update({stato: n for stato, n in righe})
+        return conteggi
+
+    # ------------------------------------------------------------------
+    # Applicazione su MongoDB
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _applica(client, op: dict, verifica_conflitti: bool = True) -> str:
+        """Applica un'operazione in modo idempotente. Solleva ConnectionFailure se offline."""
+        col = client[op["database"]][op["collection"]]
+        op_id = op["op_id"]
+        if col.find_one({**op["filtro"], CAMPO_OPERAZIONI: op_id}, {"_id": 1}):
+            return STATO_APPLICATA  # già applicata (es. interruzione prima di aggiornare il journal)
+
+        filtro = dict(op["filtro"])
+        if not op["upsert"]:
+            filtro[CAMPO_OPERAZIONI] = {"$ne": op_id}
+            if verifica_conflitti and op["base_modifica"] is not None:
+                filtro["$or"] = [
+                    {"data_modifica": {"$lte": op["base_modifica"]}},
+                    {"data_modifica": {"$exists": False}},
+                ]
+        aggiornamento = {
+            "$set": op["campi"],
+            "$push": {CAMPO_OPERAZIONI: {"$each": [op_id], "$slice": -MAX_OPERAZIONI_REGISTRATE}},
+            "$inc": {CAMPO_REV: 1},
+        }
+        risultato = col.update_one(filtro, aggiornamento, upsert=op["upsert"])
+        if risultato.matched_count or risultato.upserted_id is not None:
+            return STATO_APPLICATA
+        # Nessun match: conflitto, a meno che l'operazione sia stata applicata nel frattempo
+        if col.find_one({**op["filtro"], CAMPO_OPERAZIONI: op_id}, {"_id": 1}):
+            return STATO_APPLICATA
+        return STATO_CONFLITTO
+
+    def salva(self, database: str, collection: str, filtro: dict, campi: dict,
+              base_modifica: datetime = None, upsert: bool = False, client=None) -> str:
+        """
+        Salvataggio write-ahead: registra l'operazione e prova subito ad applicarla.
+
+        L'applicazione immediata mantiene la semantica del salvataggio online (nessun
+        controllo dei conflitti); se MongoDB non è raggiungibile l'operazione resta in
+        attesa e verrà riapplicata dal replayer con il controllo su `base_modifica`.
+        Un'operazione applicata subito viene rimossa dal journal (il documento completo
+        del torneo non si accumula nel file ad ogni salvataggio online).
+
+        Args:
+            client: MongoClient da usare subito; None = solo accodamento (modalità offline).
+
+        Returns:
+            STATO_APPLICATA, STATO_IN_ATTESA oppure STATO_CONFLITTO (documento non trovato,
+            es. torneo eliminato da un'altra sessione).
+        """
+        if client is None:
+            self.accoda(database, collection, filtro, campi, base_modifica, upsert)
+            return STATO_IN_ATTESA
+        with self._lock_applicazione:
+            op_id = self.accoda(database, collection, filtro, campi, base_modifica, upsert)
+            op = {"op_id": op_id, "database": database, "collection": collection, "filtro": filtro,
+                  "campi": campi, "base_modifica": base_modifica, "upsert": upsert}
+            try:
+                stato = self._applica(client, op, verifica_conflitti=False)
+            except ConnectionFailure as e:
+                self._segna(op_id, STATO_IN_ATTESA, str(e), tentativo=True)
+                return STATO_IN_ATTESA
+            if stato == STATO_APPLICATA:
+                self._rimuovi(op_id)
+            else:
+                self._segna(op_id, stato, "Documento non trovato al salvataggio")
+            return stato
+
+    def riproduci(self, client) -> dict:
+        """
+        Riapplica in ordine le operazioni in attesa.
+
+        Si interrompe al primo errore di rete (le operazioni restanti restano in attesa).
+
+        Returns:
+            Riepilogo {"applicate": n, "conflitti": n, "in_attesa": n}.
+        """
+        def versione(op, campo_data):
+            return (op["database"], op["collection"], json_util.dumps(op["filtro"]), json_util.dumps(campo_data))
+
+        # Versioni scritte da operazioni in conflitto: chi parte da lì è a sua volta in conflitto
+        versioni_in_conflitto = {
+            versione(op, op["campi"].get("data_modifica")) for op in self.operazioni(STATO_CONFLITTO)
+        }
+        riepilogo = {"applicate": 0, "conflitti": 0, "in_attesa": 0}
+        in_attesa = self.operazioni(STATO_IN_ATTESA)
+        for i, op in enumerate(in_attesa):
+            if op["base_modifica"] is not None and versione(op, op["base_modifica"]) in versioni_in_conflitto:
+                versioni_in_conflitto.add(versione(op, op["campi"].get("data_modifica")))
+                self._segna(op["op_id"], STATO_CONFLITTO, "Parte da un salvataggio offline in conflitto")
+                riepilogo["conflitti"] += 1
+                continue
+            with self._lock_applicazione:
+                if self._stato(op["op_id"]) != STATO_IN_ATTESA:
+                    continue  # già chiusa da salva() o da segna_applicate() dopo la lettura
+                try:
+                    stato = self._applica(client, op)
+                except ConnectionFailure as e:
+                    self._segna(op["op_id"], STATO_IN_ATTESA, str(e), tentativo=True)
+                    riepilogo["in_attesa"] = len(in_attesa) - i
+                    break
+            if stato == STATO_CONFLITTO:
+                versioni_in_conflitto.add(versione(op, op["campi"].get("data_modifica")))
+                self._segna(op["op_id"], stato, "Documento modificato da un'altra sessione dopo la versione di partenza")
+                riepilogo["conflitti"] += 1
+            else:
+                self._segna(op["op_id"], stato)
+                riepilogo["applicate"] += 1
+        return riepilogo
+
+
+class ReplayerCoda(threading.Thread):
+    """Thread daemon (uno per processo) che svuota la coda quando MongoDB torna raggiungibile."""
+
+    def __init__(self, coda: CodaOffline, crea_client, intervallo: float = INTERVALLO_REPLAY):
+        """
+        Args:
+            coda: Journal da riprodurre.
+            crea_client: Funzione senza argomenti che ritorna un MongoClient.
+            intervallo: Secondi tra due tentativi quando ci sono operazioni in attesa.
+        """
+        super().__init__(name="subbuteo-replayer-coda", daemon=True)
+        self.coda = coda
+        self.crea_client = crea_client
+        self.intervallo = intervallo
+        self._client = None
+        self._sveglia = threading.Event()
+
+    def sveglia(self):
+        """Anticipa il prossimo tentativo (es. subito dopo un accodamento)."""
+        self._sveglia.set()
+
+    def run(self):
+        self.coda.compatta()
+        while True:
+            if self.coda.conteggi()[STATO_IN_ATTESA]:
+                try:
+                    if self._client is None:
+                        self._client = self.crea_client()
+                    self._client.admin.command("ping")
+                    riepilogo = self.coda.riproduci(self._client)
+                    print(f"[CODA OFFLINE] Replay: {riepilogo}")
+                    self.coda.compatta()
+                except Exception as e:
+                    print(f"[CODA OFFLINE] Replay rinviato: {e}")
+            self._sveglia.wait(self.intervallo)
+            self._sveglia.clear()
@@ -0,0 +1,132 @@
+"""
+concorrenza.py — Salvataggio versionato (controllo ottimistico) del calendario di un torneo.
+
+Fornisce:
+  - CAMPO_REV: contatore di revisione del documento torneo
+  - chiave_partita(): identificativo di una partita del calendario
+  - modifiche_sessione(): partite modificate dalla sessione rispetto alla copia letta
+  - unisci_modifiche(): applica le modifiche della sessione al calendario più recente
+  - salva_calendario_versionato(): update condizionato su `rev` con rilettura, merge e backoff
+
+Più arbitri possono inserire risultati nello stesso torneo da dispositivi diversi: ogni
+sessione scrive solo se il documento è ancora alla revisione che ha letto; in caso
+contrario rilegge il calendario, vi riapplica le proprie modifiche (partita per partita)
+e riprova, così che nessun risultato inserito da altri venga sovrascritto. Tra un tentativo
+e il successivo attende un intervallo casuale che raddoppia ad ogni conflitto (backoff
+esponenziale con jitter), così che le sessioni in contesa non si rincorrano all'infinito.
+"""
+import random
+import time
+
+CAMPO_REV = "rev"
+COLONNE_CHIAVE = ("Girone", "Giornata", "Casa", "Ospite")
+MAX_TENTATIVI = 10
+ATTESA_BASE = 0.01   # secondi, primo intervallo di backoff
+ATTESA_MAX = 1.0     # secondi, tetto del singolo intervallo
+
+
+def chiave_partita(partita: dict) -> tuple:
+    """Identificativo di una partita: (Girone, Giornata, Casa, Ospite)."""
+    return tuple(partita.get(c) for c in COLONNE_CHIAVE)
+
+
+def modifiche_sessione(base: list, calendario: list) -> dict:
+    """
+    Partite che la sessione ha modificato (o aggiunto) rispetto alla copia letta dal DB.
+
+    Args:
+        base: Calendario come letto dal DB (lista di record).
+        calendario: Calendario attuale della sessione.
+
+    Returns:
+        Dizionario chiave_partita -> record modificato.
+    """
+    originali = {chiave_partita(p): p for p in base}
+    return {
+        chiave_partita(p): p
+        for p in calendario
+        if originali.get(chiave_partita(p)) != p
+    }
+
+
+def unisci_modifiche(remoto: list, modifiche: dict) -> list:
+    """
+    Calendario remoto con le modifiche della sessione applicate sopra.
+
+    Le partite non toccate dalla sessione restano quelle del DB (risultati inseriti da
+    altri arbitri); le partite nuove della sessione vengono aggiunte in coda.
+    """
+    unito = []
+    viste = set()
+    for partita in remoto:
+        chiave = chiave_partita(partita)
+        viste.add(chiave)
+        unito.append(modifiche.get(chiave, partita))
+    unito.extend(p for chiave, p in modifiche.items() if chiave not in viste)
+    return unito
+
+
+def attesa_backoff(tentativo: int) -> float:
+    """Intervallo casuale in [0, min(ATTESA_MAX, ATTESA_BASE * 2^tentativo)] ("full jitter")."""
+    return random.uniform(0, min(ATTESA_MAX, ATTESA_BASE * 2 ** tentativo))
+
+
+def _condizione_revisione(filtro: dict, rev: int) -> dict:
+    if rev:
+        return {**filtro, CAMPO_REV: rev}
+    # Documenti creati prima dell'introduzione di `rev`
+    return {**filtro, "$or": [{CAMPO_REV: 0}, {CAMPO_REV: {"$exists": False}}]}
+
+
+def salva_calendario_versionato(collection, filtro: dict, base: list, calendario: list, rev: int,
+                                campi: dict = None, max_tentativi: int = MAX_TENTATIVI):
+    """
+    Salva il calendario solo se il documento è ancora alla revisione `rev`.
+
+    Ad ogni conflitto attende un intervallo di backoff (attesa_backoff()), rilegge
+    calendario e revisione (find_one con proiezione), riapplica le partite modificate
+    dalla sessione e ritenta. Se un'altra sessione ha modificato
+    la stessa partita, vince la sessione corrente e la partita è segnalata in `sovrascritte`.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        filtro: Filtro del documento (es. {"_id": ObjectId(...)}).
+        base: Calendario letto dal DB all'ultima sincronizzazione della sessione.
+        calendario: Calendario attuale della sessione.
+        rev: Revisione del documento all'ultima sincronizzazione (0 se assente).
+        campi: Altri campi da impostare con $set (es. data_modifica).
+        max_tentativi: Numero massimo di tentativi prima di rinunciare.
+
+    Returns:
+        Dizionario {"rev", "calendario", "conflitti", "sovrascritte"} con la nuova
+        revisione e il calendario effettivamente scritto; None se il documento non esiste
+        più o i tentativi sono esauriti.
+    """
+    modifiche = modifiche_sessione(base, calendario)
+    originali = {chiave_partita(p): p for p in base}
+    sovrascritte = set()
+    for tentativo in range(max_tentativi):
+        risultato = collection.update_one(
+            _condizione_revisione(filtro, rev),
+            {"$set": {"calendario": calendario, **(campi or {})}, "$inc": {CAMPO_REV: 1}},
+        )
+        if risultato.matched_count:
+            return {"rev": rev + 1, "calendario": calendario,
+                    "conflitti": tentativo, "sovrascritte": sorted(sovrascritte, key=str)}
+        if tentativo == max_tentativi - 1:
+            break
+
+        time.sleep(attesa_backoff(tentativo))
+        remoto = collection.find_one(filtro, {"calendario": 1, CAMPO_REV: 1})
+        if remoto is None:
+            return None
+        rev = remoto.get(CAMPO_REV, 0)
+        partite_remote = remoto.get("calendario", [])
+        sovrascritte.update(
+            chiave_partita(p) for p in partite_remote
+            if chiave_partita(p) in modifiche
+            and p != originali.get(chiave_partita(p))
+            and p != modifiche[chiave_partita(p)]
+        )
+        calendario = unisci_modifiche(partite_remote, modifiche)
+    return None
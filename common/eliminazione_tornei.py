@@ -0,0 +1,99 @@
+"""
+eliminazione_tornei.py — Cancellazione lato server dei tornei salvati su MongoDB.
+
+Fornisce:
+  - filtro_campionati(): filtro MongoDB sui tornei "Campionato" (o sul complemento)
+  - elimina_tornei(): cancellazione dei tornei di un filtro e delle loro partite migrate
+  - elimina_tornei_per_nome(): cancellazione di un elenco di tornei con un solo delete_many
+  - elimina_tornei_non_campionato(): cancellazione di tutti i tornei esclusi i campionati
+
+Le funzioni leggono solo nome_torneo e layout_calendario (proiezione) e ritornano un
+riepilogo compatto (nomi e conteggi) adatto a essere scritto direttamente nel log delle
+azioni. Per i tornei migrati in "una partita per documento" (migra_partite.py) vengono
+eliminate anche le partite in <collection>Partite, che altrimenti resterebbero orfane.
+"""
+import re
+
+from common.partite_torneo import CAMPO_LAYOUT, CAMPO_TORNEO, collection_partite, usa_collection_partite
+
+CAMPO_NOME = "nome_torneo"
+_REGEX_CAMPIONATO = re.compile("campionato", re.IGNORECASE)
+
+
+def filtro_campionati(escludi: bool = False) -> dict:
+    """
+    Filtro sui tornei il cui nome contiene "campionato" (senza distinzione maiuscole/minuscole).
+
+    Args:
+        escludi: Se True seleziona i tornei che NON sono campionati.
+    """
+    if escludi:
+        return {CAMPO_NOME: {"$not": _REGEX_CAMPIONATO}}
+    return {CAMPO_NOME: _REGEX_CAMPIONATO}
+
+
+def elimina_tornei(collection, filtro: dict) -> dict:
+    """
+    Elimina i tornei che soddisfano `filtro` e le partite dei tornei migrati.
+
+    Round-trip: _id, nome e layout dei tornei (proiezione), delete_many per _id e, se
+    qualche torneo era migrato, un delete_many sulla collection delle partite.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        filtro: Filtro dei tornei da eliminare.
+
+    Returns:
+        Riepilogo {"tornei": [...nomi], "tornei_eliminati": n, "partite_eliminate": n}.
+    """
+    documenti = list(collection.find(filtro, {CAMPO_NOME: 1, CAMPO_LAYOUT: 1}))
+    if not documenti:
+        return {"tornei": [], "tornei_eliminati": 0, "partite_eliminate": 0}
+    eliminati = collection.delete_many({"_id": {"$in": [d["_id"] for d in documenti]}}).deleted_count
+    migrati = [d["_id"] for d in documenti if usa_collection_partite(d)]
+    partite = 0
+    if migrati:
+        partite = collection_partite(collection).delete_many({CAMPO_TORNEO: {"$in": migrati}}).deleted_count
+    return {
+        "tornei": [d.get(CAMPO_NOME) for d in documenti],
+        "tornei_eliminati": eliminati,
+        "partite_eliminate": partite,
+    }
+
+
+def elimina_tornei_per_nome(collection, nomi) -> dict:
+    """
+    Elimina i tornei indicati con un'unica operazione lato server.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        nomi: Iterable dei nomi dei tornei da eliminare.
+
+    Returns:
+        Riepilogo {"tornei": [...], "tornei_eliminati": n, "partite_eliminate": n}.
+    """
+    nomi = list(dict.fromkeys(nomi))
+    if not nomi:
+        return {"tornei": [], "tornei_eliminati": 0, "partite_eliminate": 0}
+    riepilogo = elimina_tornei(collection, {CAMPO_NOME: {"$in": nomi}})
+    return {**riepilogo, "tornei": nomi}
+
+
+def elimina_tornei_non_campionato(collection) -> dict:
+    """
+    Elimina tutti i tornei tranne i campionati, senza scaricare i documenti completi.
+
+    Round-trip: tornei da eliminare (proiezione), delete_many (anche delle partite dei
+    tornei migrati), nomi dei campionati rimasti.
+
+    Returns:
+        Riepilogo {"tornei": [...eliminati], "tornei_eliminati": n, "partite_eliminate": n,
+                   "tornei_rimasti": n, "tornei_esclusi": [...nomi campionati]}.
+    """
+    riepilogo = elimina_tornei(collection, filtro_campionati(escludi=True))
+    esclusi = [d.get(CAMPO_NOME) for d in collection.find(filtro_campionati(), {CAMPO_NOME: 1, "_id": 0})]
+    return {
+        **riepilogo,
+        "tornei_rimasti": len(esclusi),
+        "tornei_esclusi": esclusi,
+    }
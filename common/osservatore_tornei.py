@@ -0,0 +1,170 @@
+"""
+osservatore_tornei.py — Propagazione in tempo reale delle modifiche di un torneo a tutte le sessioni.
+
+Fornisce:
+  - OsservatoreTorneo: thread (uno per torneo e per processo) che segue il documento del
+    torneo e ne tiene una copia condivisa aggiornata
+  - osservatore_torneo(): registro di processo degli osservatori (crea o riusa),
+    uno per torneo e insieme di campi seguiti
+
+L'osservatore usa i change stream di MongoDB (solo i campi modificati del documento);
+se non sono disponibili (es. server standalone) passa a un polling leggero con
+`find_one` condizionato su `data_modifica`, che non trasferisce nulla finché il torneo
+non cambia. Le sessioni confrontano solo il numero di versione della copia condivisa:
+centinaia di spettatori costano una sola sottoscrizione al DB.
+"""
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+INTERVALLO_POLLING = 3.0
+# Secondi senza letture dopo i quali l'osservatore si ferma
+INATTIVITA_MAX = 600
+CAMPI_DEFAULT = ("calendario", "rev", "data_modifica")
+
+_osservatori = {}
+_lock_registro = threading.Lock()
+
+
+class OsservatoreTorneo(threading.Thread):
+    """Segue un documento torneo e pubblica l'ultima versione dei campi richiesti."""
+
+    def __init__(self, collection, documento_id, campi: tuple = CAMPI_DEFAULT,
+                 intervallo: float = INTERVALLO_POLLING):
+        """
+        Args:
+            collection: Collection MongoDB dei tornei.
+            documento_id: _id del torneo.
+            campi: Campi del documento da tenere aggiornati.
+            intervallo: Secondi tra due letture in modalità polling.
+        """
+        super().__init__(name=f"subbuteo-osservatore-{documento_id}", daemon=True)
+        self.collection = collection
+        self.documento_id = documento_id
+        self.campi = tuple(campi)
+        self.intervallo = intervallo
+        self.modalita = None
+        self._lock = threading.Lock()
+        self._documento = None
+        self._versione = 0
+        self._ultimo_accesso = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Lettura (sessioni)
+    # ------------------------------------------------------------------
+    def istantanea(self):
+        """
+        Ultima versione nota del torneo.
+
+        Returns:
+            Tupla (versione, documento). Il documento è condiviso tra le sessioni e non
+            va modificato; None finché la prima lettura non è completata.
+        """
+        self._ultimo_accesso = time.monotonic()
+        with self._lock:
+            return self._versione, self._documento
+
+    def _inattivo(self) -> bool:
+        return time.monotonic() - self._ultimo_accesso > INATTIVITA_MAX
+
+    # ------------------------------------------------------------------
+    # Aggiornamento (thread)
+    # ------------------------------------------------------------------
+    def _pubblica(self, documento):
+        with self._lock:
+            self._documento = documento
+            self._versione += 1
+
+    def _rileggi(self):
+        proiezione = {campo: 1 for campo in self.campi}
+        self._pubblica(self.collection.find_one({"_id": self.documento_id}, proiezione))
+
+    def _applica_delta(self, aggiornati: dict):
+        """Applica i campi modificati di un evento `update` alla copia condivisa."""
+        rilevanti = {k: v for k, v in aggiornati.items() if k.split(".")[0] in self.campi}
+        if not rilevanti:
+            return
+        if self._documento is None or any("." in k for k in rilevanti):
+            # Aggiornamenti posizionali (es. "calendario.3.GolCasa"): si rilegge il documento
+            self._rileggi()
+            return
+        self._pubblica({**self._documento, **rilevanti})
+
+    def _segui_change_stream(self):
+        pipeline = [{"$match": {"documentKey._id": self.documento_id}}]
+        with self.collection.watch(pipeline, max_await_time_ms=1000) as stream:
+            self.modalita = "change_stream"
+            self._rileggi()
+            while stream.alive and not self._inattivo():
+                evento = stream.try_next()
+                if evento is None:
+                    continue
+                tipo = evento["operationType"]
+                if tipo == "update":
+                    self._applica_delta(evento["updateDescription"]["updatedFields"])
+                elif tipo == "replace":
+                    documento = evento["fullDocument"]
+                    self._pubblica({campo: documento.get(campo) for campo in self.campi})
+                elif tipo == "delete":
+                    self._pubblica(None)
+
+    def _polling(self):
+        self.modalita = "polling"
+        proiezione = {campo: 1 for campo in self.campi}
+        self._rileggi()
+        while not self._inattivo():
+            time.sleep(self.intervallo)
+            ultima = (self._documento or {}).get("data_modifica")
+            filtro = {"_id": self.documento_id}
+            if ultima is not None:
+                filtro["data_modifica"] = {"$gt": ultima}
+            documento = self.collection.find_one(filtro, proiezione)
+            if documento is not None:
+                self._pubblica(documento)
+
+    def run(self):
+        change_stream = True
+        while not self._inattivo():
+            try:
+                if change_stream:
+                    try:
+                        self._segui_change_stream()
+                    except (OperationFailure, NotImplementedError) as e:
+                        # Change stream non supportati (server standalone, DB di test)
+                        print(f"[OSSERVATORE] Change stream non disponibili, uso il polling: {e}")
+                        change_stream = False
+                        continue
+                else:
+                    self._polling()
+            except PyMongoError as e:
+                print(f"[OSSERVATORE] Errore, nuovo tentativo tra {self.intervallo} s: {e}")
+                time.sleep(self.intervallo)
+        with _lock_registro:
+            if _osservatori.get(self._chiave()) is self:
+                del _osservatori[self._chiave()]
+
+    def _chiave(self) -> tuple:
+        return (self.collection.database.name, self.collection.name, str(self.documento_id), self.campi)
+
+
+def osservatore_torneo(collection, documento_id, campi: tuple = CAMPI_DEFAULT) -> OsservatoreTorneo:
+    """
+    Osservatore del torneo condiviso da tutte le sessioni del processo (creato al primo uso).
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        documento_id: _id del torneo (ObjectId).
+        campi: Campi del documento da tenere aggiornati.
+
+    Returns:
+        OsservatoreTorneo già avviato.
+    """
+    chiave = (collection.database.name, collection.name, str(documento_id), tuple(campi))
+    with _lock_registro:
+        osservatore = _osservatori.get(chiave)
+        if osservatore is None or not osservatore.is_alive():
+            osservatore = OsservatoreTorneo(collection, documento_id, campi)
+            _osservatori[chiave] = osservatore
+            osservatore.start()
+    return osservatore
@@ -0,0 +1,193 @@
+"""
+partite_torneo.py — Layout opzionale "una partita per documento" per i tornei all'italiana.
+
+Fornisce:
+  - CAMPO_LAYOUT / LAYOUT_PARTITE: marcatore del documento torneo migrato
+  - collection_partite(): collection delle partite associata a quella dei tornei
+  - crea_indici(): indici (torneo_id, Girone, Giornata) e chiave univoca della partita
+  - usa_collection_partite(): True se il calendario del torneo è nella collection delle partite
+  - leggi_partite(): partite di un torneo (eventualmente di un solo girone/giornata) con proiezione
+  - completa_calendario(): doppia lettura, riempie documento["calendario"] per entrambi i layout
+  - salva_partite_modificate(): scrive solo le partite cambiate dalla sessione
+  - partite_modificate(): partite cambiate dalla sessione con i filtri dei relativi documenti
+  - migra_torneo() / ripristina_torneo(): passaggio tra calendario incorporato e collection
+
+Di default il calendario resta incorporato nel documento torneo (campo `calendario`).
+I tornei molto grandi (campionati con andata e ritorno e molti gironi) possono essere
+migrati con migra_partite.py: il documento torneo perde il calendario e riceve
+`layout_calendario: "partite"`, mentre ogni partita diventa un documento di
+`<collection>Partite`. Chi legge usa completa_calendario() e funziona con entrambi i layout.
+"""
+from pymongo import ASCENDING, ReturnDocument, UpdateOne, DeleteOne
+
+from common.concorrenza import CAMPO_REV, COLONNE_CHIAVE, chiave_partita, modifiche_sessione
+
+CAMPO_LAYOUT = "layout_calendario"
+LAYOUT_PARTITE = "partite"
+SUFFISSO_COLLECTION = "Partite"
+CAMPO_TORNEO = "torneo_id"
+CAMPO_ORDINE = "Ordine"
+# Campi tecnici dei documenti partita, esclusi dai record del calendario
+CAMPI_TECNICI = ("_id", CAMPO_TORNEO, CAMPO_ORDINE, CAMPO_REV, "data_modifica", "operazioni_offline")
+
+
+def collection_partite(collection):
+    """Collection delle partite accanto a quella dei tornei (es. Superba -> SuperbaPartite)."""
+    return collection.database[collection.name + SUFFISSO_COLLECTION]
+
+
+def crea_indici(collection_p) -> None:
+    """Indici della collection delle partite (idempotente)."""
+    collection_p.create_index([(CAMPO_TORNEO, ASCENDING), ("Girone", ASCENDING), ("Giornata", ASCENDING)])
+    collection_p.create_index([(CAMPO_TORNEO, ASCENDING), *((c, ASCENDING) for c in COLONNE_CHIAVE)], unique=True)
+
+
+def usa_collection_partite(documento) -> bool:
+    """True se il torneo è stato migrato nella collection delle partite."""
+    return bool(documento) and documento.get(CAMPO_LAYOUT) == LAYOUT_PARTITE
+
+
+def _filtro_partita(torneo_id, partita: dict) -> dict:
+    return {CAMPO_TORNEO: torneo_id, **dict(zip(COLONNE_CHIAVE, chiave_partita(partita)))}
+
+
+def _record(documento: dict) -> dict:
+    return {k: v for k, v in documento.items() if k not in CAMPI_TECNICI}
+
+
+def leggi_partite(collection, torneo_id, girone=None, giornata=None, campi: tuple = None) -> list:
+    """
+    Partite di un torneo migrato, nell'ordine del calendario originale.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        torneo_id: _id del torneo (ObjectId).
+        girone: Se indicato, solo le partite di questo girone.
+        giornata: Se indicata, solo le partite di questa giornata.
+        campi: Colonne da leggere (proiezione); None = tutte.
+
+    Returns:
+        Lista di record come nel campo `calendario` incorporato.
+    """
+    filtro = {CAMPO_TORNEO: torneo_id}
+    if girone is not None:
+        filtro["Girone"] = girone
+    if giornata is not None:
+        filtro["Giornata"] = giornata
+    proiezione = {**{c: 1 for c in campi}, "_id": 0} if campi else {c: 0 for c in CAMPI_TECNICI}
+    cursore = collection_partite(collection).find(filtro, proiezione).sort(CAMPO_ORDINE, ASCENDING)
+    return [_record(p) for p in cursore]
+
+
+def completa_calendario(collection, documento):
+    """
+    Doppia lettura: per i tornei migrati legge le partite e le mette in documento["calendario"].
+
+    I documenti con il calendario incorporato sono restituiti invariati.
+    """
+    if usa_collection_partite(documento):
+        documento["calendario"] = leggi_partite(collection, documento["_id"])
+    return documento
+
+
+def partite_modificate(torneo_id, base: list, calendario: list) -> tuple:
+    """
+    Partite aggiunte o modificate e partite rimosse dalla sessione rispetto a `base`.
+
+    Returns:
+        Tupla (modificate, rimosse): `modificate` è una lista di (filtro, record, ordine),
+        `rimosse` una lista di filtri.
+    """
+    ordine = {chiave_partita(p): i for i, p in enumerate(calendario)}
+    modificate = [(_filtro_partita(torneo_id, p), p, ordine[chiave])
+                  for chiave, p in modifiche_sessione(base, calendario).items()]
+    rimosse = [_filtro_partita(torneo_id, p) for p in base if chiave_partita(p) not in ordine]
+    return modificate, rimosse
+
+
+def salva_partite_modificate(collection, torneo_id, base: list, calendario: list, campi: dict = None):
+    """
+    Scrive solo le partite che la sessione ha cambiato, con un solo bulk_write.
+
+    Ogni partita è un documento a sé: due arbitri che salvano partite diverse non vanno
+    mai in conflitto e non serve riscrivere il calendario intero. Il documento torneo
+    riceve `campi` (es. data_modifica) e l'incremento di `rev`, che segnala la modifica
+    agli osservatori e alle altre sessioni.
+
+    Args:
+        collection: Collection MongoDB dei tornei.
+        torneo_id: _id del torneo (ObjectId).
+        base: Calendario letto dal DB all'ultima sincronizzazione della sessione.
+        calendario: Calendario attuale della sessione.
+        campi: Campi da impostare sul documento torneo e sulle partite scritte.
+
+    Returns:
+        Dizionario {"rev", "modificate", "rimosse"}; None se il torneo non esiste più.
+    """
+    campi = campi or {}
+    modificate, rimosse = partite_modificate(torneo_id, base, calendario)
+    operazioni = [
+        UpdateOne(filtro, {"$set": {**partita, **campi}, "$setOnInsert": {CAMPO_ORDINE: ordine}}, upsert=True)
+        for filtro, partita, ordine in modificate
+    ]
+    operazioni.extend(DeleteOne(filtro) for filtro in rimosse)
+    if operazioni:
+        collection_partite(collection).bulk_write(operazioni, ordered=False)
+    torneo = collection.find_one_and_update(
+        {"_id": torneo_id}, {"$set": campi, "$inc": {CAMPO_REV: 1}},
+        projection={CAMPO_REV: 1}, return_document=ReturnDocument.AFTER,
+    )
+    if torneo is None:
+        return None
+    return {"rev": torneo[CAMPO_REV], "modificate": len(modificate), "rimosse": len(rimosse)}
+
+
+def migra_torneo(collection, torneo_id) -> int:
+    """
+    Sposta il calendario incorporato nella collection delle partite.
+
+    Le partite vengono scritte (upsert, ripetibile) prima di togliere il calendario dal
+    documento torneo; se la migrazione si interrompe il torneo resta leggibile nel
+    layout originale. Il calendario viene tolto solo se il torneo non è stato salvato
+    nel frattempo (stessa data_modifica letta all'inizio).
+
+    Returns:
+        Numero di partite migrate; -1 se il torneo non esiste, è già migrato o è stato
+        modificato durante la migrazione (da ripetere).
+    """
+    documento = collection.find_one({"_id": torneo_id}, {"calendario": 1, CAMPO_LAYOUT: 1, "data_modifica": 1})
+    if documento is None or usa_collection_partite(documento):
+        return -1
+    calendario = documento.get("calendario") or []
+    collection_p = collection_partite(collection)
+    crea_indici(collection_p)
+    extra = {"data_modifica": documento["data_modifica"]} if documento.get("data_modifica") else {}
+    if calendario:
+        collection_p.bulk_write([
+            UpdateOne(_filtro_partita(torneo_id, p), {"$set": {**p, **extra, CAMPO_ORDINE: i}}, upsert=True)
+            for i, p in enumerate(calendario)
+        ], ordered=False)
+    risultato = collection.update_one(
+        {"_id": torneo_id, "data_modifica": documento.get("data_modifica")},
+        {"$set": {CAMPO_LAYOUT: LAYOUT_PARTITE}, "$unset": {"calendario": ""}, "$inc": {CAMPO_REV: 1}},
+    )
+    return len(calendario) if risultato.matched_count else -1
+
+
+def ripristina_torneo(collection, torneo_id) -> int:
+    """
+    Riporta il calendario di un torneo migrato nel documento torneo (rollback).
+
+    Returns:
+        Numero di partite ripristinate; -1 se il torneo non esiste o non è migrato.
+    """
+    documento = collection.find_one({"_id": torneo_id}, {CAMPO_LAYOUT: 1})
+    if not usa_collection_partite(documento):
+        return -1
+    calendario = leggi_partite(collection, torneo_id)
+    collection.update_one(
+        {"_id": torneo_id},
+        {"$set": {"calendario": calendario}, "$unset": {CAMPO_LAYOUT: ""}, "$inc": {CAMPO_REV: 1}},
+    )
+    collection_partite(collection).delete_many({CAMPO_TORNEO: torneo_id})
+    return len(calendario)
@@ -0,0 +1,177 @@
+"""
+qualificazione.py — Probabilità di piazzamento nei gironi con simulazione Monte Carlo vettoriale.
+
+Fornisce:
+  - distribuzione_gol(): distribuzione empirica dei gol segnati negli incontri validati
+  - simula_girone(): probabilità di ogni posizione finale per le squadre di un girone
+  - probabilita_qualificazione(): tabella per tutti i gironi con la probabilità di chiudere
+    entro i primi `posti` classificati
+
+Le partite ancora da validare vengono simulate in matrici NumPy (simulazioni × partite)
+a blocchi di BLOCCO_SIMULAZIONI, sommando le posizioni di ogni blocco: la memoria resta
+limitata anche per gironi grandi con andata e ritorno; la classifica di partenza e l'ordine a parità di punteggio
+sono quelli di calcola_classifica(), così che la simulazione di un girone già concluso
+restituisca esattamente la classifica mostrata (Punti, DR, ordine di calendario).
+"""
+import numpy as np
+import pandas as pd
+
+from common.classifica import PUNTI_SUBBUTEO, calcola_classifica, to_bool_series
+
+N_SIMULAZIONI = 100_000
+BLOCCO_SIMULAZIONI = 10_000
+MAX_GOL = 9
+# Media gol a squadra usata come distribuzione a priori (Poisson) quando lo storico è scarso
+MEDIA_GOL_PRIORI = 1.3
+PESO_PRIORI = 20
+
+
+def distribuzione_gol(df: pd.DataFrame, col_valida: str = 'Valida') -> np.ndarray:
+    """
+    Probabilità di segnare 0..MAX_GOL gol in un incontro, stimata dagli incontri validati.
+
+    Lo storico è combinato con una Poisson(MEDIA_GOL_PRIORI) del peso di PESO_PRIORI
+    osservazioni, così che anche i primi turni abbiano una distribuzione ragionevole.
+    """
+    gol = np.arange(MAX_GOL + 1)
+    priori = np.exp(-MEDIA_GOL_PRIORI) * MEDIA_GOL_PRIORI ** gol / np.cumprod(np.r_[1, gol[1:]])
+    priori = priori / priori.sum()
+
+    conteggi = np.zeros(MAX_GOL + 1)
+    if df is not None and not df.empty and {'GolCasa', 'GolOspite', col_valida}.issubset(df.columns):
+        validate = df[to_bool_series(df[col_valida])]
+        valori = pd.to_numeric(pd.concat([validate['GolCasa'], validate['GolOspite']]), errors='coerce').dropna()
+        valori = valori.clip(0, MAX_GOL).astype(np.int64).to_numpy()
+        conteggi = np.bincount(valori, minlength=MAX_GOL + 1).astype(float)
+
+    prob = conteggi + PESO_PRIORI * priori
+    return prob / prob.sum()
+
+
+def _estrai_gol(rng: np.random.Generator, cdf: np.ndarray, forma: tuple) -> np.ndarray:
+    """
+    Gol estratti dalla distribuzione cumulata `cdf` (inversione), direttamente in int8.
+
+    Equivale a np.searchsorted(cdf, u, side='right') ma conta le soglie superate una alla
+    volta in un accumulatore int8, senza l'intermedio int64 di searchsorted.
+    """
+    u = rng.random(forma)
+    gol = np.zeros(forma, dtype=np.int8)
+    for soglia in cdf[:-1]:
+        gol += u >= soglia
+    return gol
+
+
+def _conta_posizioni(punti_tot: np.ndarray, dr_tot: np.ndarray, priorita: np.ndarray, scala_dr: int) -> np.ndarray:
+    """Matrice squadre × posizioni con il numero di simulazioni (righe) che chiudono in ogni posizione."""
+    n_squadre = len(priorita)
+    # Chiave unica di ordinamento: Punti, poi DR, poi ordine di apparizione
+    chiave = (punti_tot.astype(np.int64) * scala_dr + dr_tot + scala_dr // 2) * (n_squadre + 1) + priorita
+    ordine = np.argsort(-chiave, axis=1, kind='stable')
+    posizioni = np.empty_like(ordine)
+    np.put_along_axis(posizioni, ordine, np.arange(n_squadre)[np.newaxis, :].repeat(len(ordine), axis=0), axis=1)
+    return np.bincount((np.arange(n_squadre) * n_squadre + posizioni).ravel(),
+                       minlength=n_squadre * n_squadre).reshape(n_squadre, n_squadre)
+
+
+def simula_girone(df_girone: pd.DataFrame, prob_gol: np.ndarray, n_sim: int = N_SIMULAZIONI,
+                  punti: tuple = PUNTI_SUBBUTEO, seed: int = None) -> pd.DataFrame:
+    """
+    Simula le partite non validate di un girone e conta le posizioni finali.
+
+    Args:
+        df_girone: Calendario del girone (Casa, Ospite, GolCasa, GolOspite, Valida).
+        prob_gol: Distribuzione dei gol per squadra e incontro (da distribuzione_gol()).
+        n_sim: Numero di simulazioni.
+        punti: Tupla (vittoria, pareggio, sconfitta).
+        seed: Seme del generatore (risultati riproducibili).
+
+    Returns:
+        DataFrame con Squadra e una colonna per posizione (1°, 2°, ...) con la probabilità
+        (0-1), nell'ordine della classifica attuale.
+    """
+    classifica = calcola_classifica(df_girone, col_valida='Valida', punti=punti,
+                                    spareggi=('Punti', 'DR'), includi_non_giocate=True)
+    if classifica.empty:
+        return pd.DataFrame()
+
+    squadre = classifica['Squadra'].to_numpy(dtype=object)
+    n_squadre = len(squadre)
+    indice = {s: i for i, s in enumerate(squadre)}
+    # Ordine di prima apparizione nel calendario: ultimo criterio di calcola_classifica
+    apparizione = pd.unique(df_girone[['Casa', 'Ospite']].to_numpy(dtype=object).ravel())
+    priorita = np.array([n_squadre - list(apparizione).index(s) for s in squadre], dtype=np.int64)
+
+    rimanenti = df_girone[~to_bool_series(df_girone['Valida'])]
+    rimanenti = rimanenti[rimanenti['Casa'].isin(indice) & rimanenti['Ospite'].isin(indice)]
+    n_partite = len(rimanenti)
+
+    punti_base = classifica['Punti'].to_numpy(dtype=np.int64)
+    dr_base = classifica['DR'].to_numpy(dtype=np.int64)
+    scala_dr = 2 * (MAX_GOL * max(n_partite, 1) + int(np.abs(dr_base).max()) + 1)
+    if not n_partite:
+        conteggi = _conta_posizioni(punti_base[np.newaxis, :], dr_base[np.newaxis, :], priorita, scala_dr)
+        totale = 1
+    else:
+        rng = np.random.default_rng(seed)
+        cdf = np.cumsum(prob_gol)
+        cdf[-1] = 1.0
+        pv, pn, ps = punti
+
+        # Matrici di incidenza partite -> squadre: somme per squadra con un prodotto matriciale
+        # (float32 usa BLAS; le somme di punti e gol sono interi piccoli, quindi esatte)
+        casa = np.zeros((n_partite, n_squadre), dtype=np.float32)
+        ospite = np.zeros((n_partite, n_squadre), dtype=np.float32)
+        casa[np.arange(n_partite), rimanenti['Casa'].map(indice).to_numpy()] = 1
+        ospite[np.arange(n_partite), rimanenti['Ospite'].map(indice).to_numpy()] = 1
+
+        conteggi = np.zeros((n_squadre, n_squadre), dtype=np.int64)
+        for inizio in range(0, n_sim, BLOCCO_SIMULAZIONI):
+            n_blocco = min(BLOCCO_SIMULAZIONI, n_sim - inizio)
+            gol_casa = _estrai_gol(rng, cdf, (n_blocco, n_partite))
+            gol_ospite = _estrai_gol(rng, cdf, (n_blocco, n_partite))
+
+            punti_casa = np.where(gol_casa > gol_ospite, pv, np.where(gol_casa == gol_ospite, pn, ps)).astype(np.float32)
+            punti_ospite = np.where(gol_ospite > gol_casa, pv, np.where(gol_casa == gol_ospite, pn, ps)).astype(np.float32)
+            diff = (gol_casa - gol_ospite).astype(np.float32)
+            punti_tot = punti_base + (punti_casa @ casa + punti_ospite @ ospite).astype(np.int64)
+            dr_tot = dr_base + (diff @ casa - diff @ ospite).astype(np.int64)
+            conteggi += _conta_posizioni(punti_tot, dr_tot, priorita, scala_dr)
+        totale = n_sim
+
+    risultato = pd.DataFrame(conteggi / totale, columns=[f"{p}°" for p in range(1, n_squadre + 1)])
+    risultato.insert(0, 'Squadra', squadre)
+    return risultato
+
+
+def probabilita_qualificazione(df: pd.DataFrame, posti: int = 2, n_sim: int = N_SIMULAZIONI,
+                               seed: int = None, gironi: list = None) -> pd.DataFrame:
+    """
+    Probabilità di piazzamento per tutti i gironi del calendario.
+
+    Args:
+        df: Calendario completo (Girone, Casa, Ospite, GolCasa, GolOspite, Valida).
+        posti: Numero di posizioni che valgono la qualificazione.
+        n_sim: Numero di simulazioni per girone.
+        seed: Seme del generatore.
+        gironi: Gironi da simulare (default tutti); la distribuzione dei gol usa
+            comunque l'intero calendario.
+
+    Returns:
+        DataFrame con Girone, Squadra, Qualificazione (0-1) e le probabilità per posizione.
+    """
+    if df is None or df.empty or 'Girone' not in df.columns:
+        return pd.DataFrame()
+    prob_gol = distribuzione_gol(df)
+    tabelle = []
+    for girone, df_girone in df.groupby('Girone', sort=False):
+        if gironi is not None and girone not in gironi:
+            continue
+        tabella = simula_girone(df_girone, prob_gol, n_sim=n_sim, seed=seed)
+        if tabella.empty:
+            continue
+        colonne_posti = list(tabella.columns[1:1 + posti])
+        tabella.insert(1, 'Qualificazione', tabella[colonne_posti].sum(axis=1))
+        tabella.insert(0, 'Girone', girone)
+        tabelle.append(tabella)
+    return pd.concat(tabelle, ignore_index=True) if tabelle else pd.DataFrame()
@@ -0,0 +1,363 @@
+"""
+rating.py — Rating Elo dei giocatori calcolato sullo storico completo degli incontri.
+
+Fornisce:
+  - partite_da_documenti(): incontri validati di documenti Italiana/Fasi Finali e Svizzero
+    in un unico DataFrame ordinato cronologicamente (un incontro per torneo, vedi chiave_torneo())
+  - risultati_modificati(): rileva correzioni di incontri già applicati
+  - calcola_rating(): aggiornamento Elo vettoriale (NumPy) giornata per giornata, incrementale
+  - aggiorna_rating_da_db(): legge dal DB solo i documenti modificati dall'ultimo aggiornamento
+  - potenziale_a_rating() / rating_a_potenziale(): conversione tra scala Elo e Potenziale 0-10
+  - ordina_per_rating(): ordina squadre/giocatori per rating (es. per serpentino_seed)
+
+Lo stato è un dizionario riutilizzabile tra le chiamate (da tenere in st.cache_resource):
+
+    {"rating": {giocatore: elo}, "partite": {giocatore: n},
+     "risultati": {chiave incontro: (gol A, gol B)}, "ultimo_aggiornamento": datetime | None}
+
+Gli incontri della stessa giornata sono indipendenti tra loro e vengono applicati in
+blocco (attesi calcolati sui rating di inizio giornata); le giornate si susseguono in
+ordine cronologico di torneo. Gli incontri già applicati non vengono riapplicati.
+
+La chiave di un incontro usa il nome base del torneo (senza "completato_"/"finito_"),
+non l'_id: la copia "completato_<nome>" salvata a fine campionato non ripete gli incontri
+dell'originale. Se un torneo riletto ha un risultato corretto o una partita non più
+validata, il rating viene ricalcolato da zero (l'Elo dipende dall'ordine degli incontri).
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from common.classifica import to_bool_series
+from common.partite_torneo import CAMPO_LAYOUT, completa_calendario
+
+ELO_BASE = 1500.0
+ELO_K = 32.0
+# Punti Elo corrispondenti a un punto di Potenziale (scala 0-10, 5 = rating base)
+ELO_PER_PUNTO_POTENZIALE = 50.0
+
+GIRONE_KO = "Eliminazione Diretta"
+BYE = "RIPOSA"
+
+COLONNE_PARTITE = ['Ordine', 'Torneo', 'Fase', 'Giornata', 'Chiave', 'GiocatoreA', 'GiocatoreB', 'GolA', 'GolB']
+
+PROIEZIONE_ITALIANA = {"nome_torneo": 1, "calendario": 1, "data_modifica": 1, CAMPO_LAYOUT: 1}
+PROIEZIONE_SVIZZERO = {"nome_torneo": 1, "df_torneo": 1, "df_squadre": 1, "data_modifica": 1}
+
+# Prefissi/suffissi di stato del nome torneo (come palmares_utils.normalize_tournament_name)
+PREFISSI_STATO = ("completato_", "finito_")
+SUFFISSI_STATO = ("_completed", "_incomplete")
+
+
+def stato_vuoto() -> dict:
+    """Stato iniziale del motore di rating."""
+    return {"rating": {}, "partite": {}, "risultati": {}, "ultimo_aggiornamento": None}
+
+
+def potenziale_a_rating(potenziale) -> float:
+    """Potenziale 0-10 -> rating Elo equivalente (5 = ELO_BASE)."""
+    try:
+        p = float(potenziale)
+    except (TypeError, ValueError):
+        return ELO_BASE
+    if np.isnan(p):
+        return ELO_BASE
+    return ELO_BASE + (p - 5) * ELO_PER_PUNTO_POTENZIALE
+
+
+def rating_a_potenziale(rating: float) -> float:
+    """Rating Elo -> Potenziale sulla scala 0-10 (una cifra decimale)."""
+    return round(float(np.clip((rating - ELO_BASE) / ELO_PER_PUNTO_POTENZIALE + 5, 0, 10)), 1)
+
+
+def nome_giocatore(valore) -> str:
+    """'Squadra-Giocatore' -> 'Giocatore' (stessa regola di parse_team_player)."""
+    if not isinstance(valore, str):
+        return "" if valore is None else str(valore)
+    if "-" in valore:
+        return valore.split("-", 1)[1].strip() or valore.strip()
+    return valore.strip()
+
+
+def _ordine_documento(doc: dict):
+    """Istante di creazione del documento (dall'ObjectId), per l'ordinamento cronologico."""
+    _id = doc.get("_id")
+    if hasattr(_id, "generation_time"):
+        return _id.generation_time.replace(tzinfo=None)
+    return doc.get("data_modifica") or datetime.min
+
+
+def chiave_torneo(doc: dict, tipo: str) -> str:
+    """
+    Identità del torneo negli incontri: tipo e nome base (minuscolo, senza prefissi di stato).
+
+    Args:
+        doc: Documento torneo (nome_torneo; in assenza si usa l'_id).
+        tipo: "italiana" (Italiana/Fasi Finali) o "svizzero".
+    """
+    nome = doc.get("nome_torneo")
+    if not nome:
+        return f"{tipo}:{doc.get('_id')}"
+    for prefisso in PREFISSI_STATO:
+        nome = nome.replace(prefisso, "")
+    for suffisso in SUFFISSI_STATO:
+        nome = nome.replace(suffisso, "")
+    return f"{tipo}:{nome.strip().lower()}"
+
+
+def _colonna(df: pd.DataFrame, nome: str, default=None) -> pd.Series:
+    return df[nome] if nome in df.columns else pd.Series(default, index=df.index, dtype=object)
+
+
+def _partite_italiana(doc: dict) -> pd.DataFrame:
+    df = pd.DataFrame(doc.get("calendario") or [])
+    if df.empty or not {'Casa', 'Ospite', 'GolCasa', 'GolOspite', 'Valida'}.issubset(df.columns):
+        return pd.DataFrame(columns=COLONNE_PARTITE)
+    df = df[to_bool_series(df['Valida'])]
+    if df.empty:
+        return pd.DataFrame(columns=COLONNE_PARTITE)
+
+    girone = _colonna(df, 'Girone', "").fillna("").astype(str)
+    # Il nome del giocatore esplicito (righe KO) ha la precedenza sul formato "Squadra-Giocatore"
+    gioc_a = _colonna(df, 'GiocatoreCasa').where(lambda s: s.notna() & (s.astype(str).str.strip() != ""), df['Casa'])
+    gioc_b = _colonna(df, 'GiocatoreOspite').where(lambda s: s.notna() & (s.astype(str).str.strip() != ""), df['Ospite'])
+    giornata = pd.to_numeric(_colonna(df, 'Giornata', 0), errors='coerce').fillna(0)
+    torneo = chiave_torneo(doc, "italiana")
+    return pd.DataFrame({
+        'Torneo': torneo,
+        'Fase': (girone == GIRONE_KO).astype(int).to_numpy(),
+        'Giornata': giornata.to_numpy(),
+        'Chiave': (f"{torneo}|" + girone + "|" + giornata.astype(str) + "|"
+                   + df['Casa'].astype(str) + "|" + df['Ospite'].astype(str)).to_numpy(),
+        'GiocatoreA': gioc_a.map(nome_giocatore).to_numpy(),
+        'GiocatoreB': gioc_b.map(nome_giocatore).to_numpy(),
+        'GolA': pd.to_numeric(df['GolCasa'], errors='coerce').to_numpy(),
+        'GolB': pd.to_numeric(df['GolOspite'], errors='coerce').to_numpy(),
+    })
+
+
+def _partite_svizzero(doc: dict) -> pd.DataFrame:
+    df = pd.DataFrame(doc.get("df_torneo") or [])
+    if df.empty or not {'Casa', 'Ospite', 'GolCasa', 'GolOspite', 'Validata'}.issubset(df.columns):
+        return pd.DataFrame(columns=COLONNE_PARTITE)
+    df = df[to_bool_series(df['Validata']) & (df['Casa'] != BYE) & (df['Ospite'] != BYE)]
+    if df.empty:
+        return pd.DataFrame(columns=COLONNE_PARTITE)
+
+    squadre = pd.DataFrame(doc.get("df_squadre") or [])
+    if {'Squadra', 'Giocatore'}.issubset(squadre.columns):
+        giocatori = squadre.drop_duplicates('Squadra').set_index('Squadra')['Giocatore']
+        gioc_a = df['Casa'].map(giocatori).fillna(df['Casa'].map(nome_giocatore))
+        gioc_b = df['Ospite'].map(giocatori).fillna(df['Ospite'].map(nome_giocatore))
+    else:
+        gioc_a = df['Casa'].map(nome_giocatore)
+        gioc_b = df['Ospite'].map(nome_giocatore)
+    turno = pd.to_numeric(_colonna(df, 'Turno', 0), errors='coerce').fillna(0)
+    torneo = chiave_torneo(doc, "svizzero")
+    return pd.DataFrame({
+        'Torneo': torneo,
+        'Fase': 0,
+        'Giornata': turno.to_numpy(),
+        'Chiave': (f"{torneo}|" + turno.astype(str) + "|"
+                   + df['Casa'].astype(str) + "|" + df['Ospite'].astype(str)).to_numpy(),
+        'GiocatoreA': gioc_a.astype(str).to_numpy(),
+        'GiocatoreB': gioc_b.astype(str).to_numpy(),
+        'GolA': pd.to_numeric(df['GolCasa'], errors='coerce').to_numpy(),
+        'GolB': pd.to_numeric(df['GolOspite'], errors='coerce').to_numpy(),
+    })
+
+
+def partite_da_documenti(docs_italiana=(), docs_svizzero=()) -> pd.DataFrame:
+    """
+    Estrae gli incontri validati dai documenti torneo e li ordina cronologicamente.
+
+    Args:
+        docs_italiana: Documenti Italiana/Fasi Finali (campo `calendario`, colonna Valida).
+        docs_svizzero: Documenti Svizzero (campi `df_torneo` con Validata e `df_squadre`).
+
+    Returns:
+        DataFrame con COLONNE_PARTITE, ordinato per torneo (data di creazione), fase
+        (gironi prima dell'eliminazione diretta) e giornata. Se più documenti hanno lo
+        stesso torneo (es. originale e "completato_") si usa quello modificato più di
+        recente, nella posizione cronologica del più vecchio.
+    """
+    # Per ogni torneo: documento più recente e data di creazione del più vecchio
+    scelti, ordine = {}, {}
+    for estrai, docs, tipo in ((_partite_italiana, docs_italiana, "italiana"),
+                               (_partite_svizzero, docs_svizzero, "svizzero")):
+        for doc in docs:
+            torneo = chiave_torneo(doc, tipo)
+            modifica = doc.get("data_modifica") or datetime.min
+            if torneo not in scelti or modifica >= scelti[torneo][0]:
+                scelti[torneo] = (modifica, estrai, doc)
+            ordine[torneo] = min(ordine.get(torneo, datetime.max), _ordine_documento(doc))
+
+    blocchi = []
+    for torneo, (_, estrai, doc) in scelti.items():
+        partite = estrai(doc)
+        if not partite.empty:
+            partite.insert(0, 'Ordine', ordine[torneo])
+            blocchi.append(partite)
+    if not blocchi:
+        return pd.DataFrame(columns=COLONNE_PARTITE)
+
+    partite = pd.concat(blocchi, ignore_index=True)
+    partite = partite.dropna(subset=['GolA', 'GolB'])
+    partite = partite[(partite['GiocatoreA'] != "") & (partite['GiocatoreB'] != "")
+                      & (partite['GiocatoreA'] != partite['GiocatoreB'])]
+    partite = partite.sort_values(['Ordine', 'Torneo', 'Fase', 'Giornata'], kind='mergesort')
+    return partite[COLONNE_PARTITE].reset_index(drop=True)
+
+
+def risultati_modificati(partite: pd.DataFrame, stato: dict, tornei_letti=()) -> bool:
+    """
+    True se un incontro già applicato allo stato è cambiato.
+
+    Args:
+        partite: Incontri riletti (formato di partite_da_documenti()).
+        stato: Stato del motore.
+        tornei_letti: Chiavi dei tornei riletti (chiave_torneo()): i loro incontri già
+            applicati che non compaiono più in `partite` non sono più validati.
+    """
+    risultati = stato.get("risultati") or {}
+    if not risultati:
+        return False
+    nuovi = dict(zip(partite['Chiave'], zip(partite['GolA'].astype(float), partite['GolB'].astype(float))))
+    if any(chiave in risultati and risultati[chiave] != gol for chiave, gol in nuovi.items()):
+        return True
+    tornei = set(tornei_letti)
+    return any(chiave.split("|", 1)[0] in tornei and chiave not in nuovi for chiave in risultati)
+
+
+def calcola_rating(partite: pd.DataFrame, stato: dict = None, k: float = ELO_K,
+                   rating_iniziale: dict = None) -> dict:
+    """
+    Applica gli incontri non ancora applicati allo stato dei rating.
+
+    Le giornate vengono elaborate in sequenza; all'interno di una giornata gli attesi
+    sono calcolati in un'unica operazione vettoriale e le variazioni sommate con np.add.at
+    (un giocatore con più incontri nella stessa giornata li cumula).
+
+    Args:
+        partite: Incontri nel formato di partite_da_documenti(), già ordinati.
+        stato: Stato da aggiornare (modificato in-place); None = nuovo stato.
+        k: Fattore K dell'Elo.
+        rating_iniziale: {giocatore: elo} di partenza per i giocatori senza storico
+            (es. da potenziale_a_rating); gli altri partono da ELO_BASE.
+
+    Returns:
+        Lo stato aggiornato.
+    """
+    stato = stato if stato is not None else stato_vuoto()
+    if partite is None or partite.empty:
+        return stato
+
+    nuove = partite[~partite['Chiave'].isin(list(stato["risultati"]))].drop_duplicates('Chiave')
+    if nuove.empty:
+        return stato
+
+    nomi, indici = np.unique(np.concatenate([nuove['GiocatoreA'].to_numpy(dtype=object),
+                                             nuove['GiocatoreB'].to_numpy(dtype=object)]).astype(str),
+                             return_inverse=True)
+    n = len(nuove)
+    ia, ib = indici[:n], indici[n:]
+    iniziale = rating_iniziale or {}
+    rating = np.array([stato["rating"].get(nome, iniziale.get(nome, ELO_BASE)) for nome in nomi], dtype=float)
+    giocate = np.array([stato["partite"].get(nome, 0) for nome in nomi], dtype=np.int64)
+
+    gol_a = nuove['GolA'].to_numpy(dtype=float)
+    gol_b = nuove['GolB'].to_numpy(dtype=float)
+    risultato = np.where(gol_a > gol_b, 1.0, np.where(gol_a < gol_b, 0.0, 0.5))
+
+    # Confini delle giornate: cambia torneo/fase/giornata rispetto alla riga precedente
+    chiave_giornata = pd.MultiIndex.from_arrays([nuove['Torneo'].to_numpy(dtype=object), nuove['Fase'].to_numpy(), nuove['Giornata'].to_numpy()])
+    codici = pd.factorize(chiave_giornata)[0]
+    inizi = np.flatnonzero(np.r_[True, codici[1:] != codici[:-1]])
+    fini = np.r_[inizi[1:], n]
+
+    for inizio, fine in zip(inizi, fini):
+        a, b = ia[inizio:fine], ib[inizio:fine]
+        atteso = 1.0 / (1.0 + 10.0 ** ((rating[b] - rating[a]) / 400.0))
+        delta = k * (risultato[inizio:fine] - atteso)
+        np.add.at(rating, a, delta)
+        np.add.at(rating, b, -delta)
+
+    np.add.at(giocate, ia, 1)
+    np.add.at(giocate, ib, 1)
+    stato["rating"].update(zip(nomi.tolist(), rating.tolist()))
+    stato["partite"].update(zip(nomi.tolist(), giocate.tolist()))
+    stato["risultati"].update(zip(nuove['Chiave'].tolist(), zip(gol_a.tolist(), gol_b.tolist())))
+    return stato
+
+
+def aggiorna_rating_da_db(stato: dict, collections_italiana=(), collections_svizzero=()) -> dict:
+    """
+    Aggiorna lo stato leggendo solo i documenti modificati dopo l'ultimo aggiornamento.
+
+    Al primo utilizzo (stato vuoto) vengono letti tutti i documenti; in seguito solo
+    quelli con `data_modifica` successiva, con query proiettate sui soli campi necessari.
+    Se tra questi un incontro già applicato è stato corretto o non è più validato, lo
+    stato viene azzerato e ricostruito da tutti i documenti.
+
+    Args:
+        stato: Stato del motore (modificato in-place).
+        collections_italiana: Collection con documenti Italiana/Fasi Finali.
+        collections_svizzero: Collection con documenti Svizzero.
+
+    Returns:
+        Lo stato aggiornato.
+    """
+    ultimo = stato.get("ultimo_aggiornamento")
+    filtro = {"data_modifica": {"$gt": ultimo}} if ultimo else {}
+
+    docs_italiana, docs_svizzero, date, tornei_letti = [], [], [], set()
+    for collections, proiezione, docs, tipo in ((collections_italiana, PROIEZIONE_ITALIANA, docs_italiana, "italiana"),
+                                                (collections_svizzero, PROIEZIONE_SVIZZERO, docs_svizzero, "svizzero")):
+        for collection in collections:
+            if collection is None:
+                continue
+            for doc in collection.find(filtro, proiezione):
+                if docs is docs_italiana:
+                    completa_calendario(collection, doc)
+                docs.append(doc)
+                tornei_letti.add(chiave_torneo(doc, tipo))
+                if doc.get("data_modifica"):
+                    date.append(doc["data_modifica"])
+
+    partite = partite_da_documenti(docs_italiana, docs_svizzero)
+    if ultimo and risultati_modificati(partite, stato, tornei_letti):
+        # Correzione di un risultato già applicato: ricalcolo completo (stato modificato in-place)
+        stato.clear()
+        stato.update(stato_vuoto())
+        return aggiorna_rating_da_db(stato, collections_italiana, collections_svizzero)
+
+    calcola_rating(partite, stato)
+    if date:
+        stato["ultimo_aggiornamento"] = max([ultimo] + date if ultimo else date)
+    return stato
+
+
+def ordina_per_rating(squadre: list, rating: dict, giocatori: dict = None, potenziali: dict = None) -> list:
+    """
+    Ordina le squadre per rating del giocatore decrescente (ordine stabile a parità).
+
+    Args:
+        squadre: Nomi delle squadre, nell'ordine di partenza (es. classifica).
+        rating: {giocatore: elo}.
+        giocatori: {squadra: giocatore}; se assente il giocatore è ricavato da "Squadra-Giocatore".
+        potenziali: {squadra: Potenziale} usato per chi non ha storico (default ELO_BASE).
+
+    Returns:
+        Lista ordinata, ad esempio da passare a serpentino_seed().
+    """
+    giocatori = giocatori or {}
+    potenziali = potenziali or {}
+
+    def elo(squadra):
+        giocatore = giocatori.get(squadra) or nome_giocatore(squadra)
+        if giocatore in rating:
+            return rating[giocatore]
+        return potenziale_a_rating(potenziali.get(squadra)) if squadra in potenziali else ELO_BASE
+
+    return sorted(squadre, key=elo, reverse=True)
@@ -0,0 +1,148 @@
+"""
+risultati.py — Aggiornamento vettoriale dei risultati sul calendario dei tornei.
+
+Fornisce:
+  - aggiorna_risultati(): applica in blocco punteggi e validazione a un vettore di incontri
+  - maschera_ritirati(): maschera vettoriale degli incontri che coinvolgono giocatori ritirati
+  - applica_abbandoni(): assegna i risultati a tavolino (3-0 / 0-3 / 0-0) per i ritiri
+
+Le funzioni lavorano in-place sul DataFrame ricevuto (nessuna copia del calendario)
+e non dipendono da Streamlit, così da poter essere riusate anche fuori dalle app.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def aggiorna_risultati(df: pd.DataFrame, indici, gol_casa, gol_ospite, valida) -> int:
+    """
+    Applica i nuovi risultati a un insieme di incontri con assegnazioni vettoriali.
+
+    Args:
+        df: DataFrame del calendario (modificato in-place).
+        indici: Etichette di indice degli incontri da aggiornare.
+        gol_casa: Vettore dei gol della squadra di casa (stessa lunghezza di indici).
+        gol_ospite: Vettore dei gol della squadra ospite.
+        valida: Vettore dei flag di validazione.
+
+    Returns:
+        Numero di incontri aggiornati.
+    """
+    indici = pd.Index(indici)
+    if indici.empty:
+        return 0
+
+    gol_casa = pd.to_numeric(pd.Series(gol_casa), errors='coerce').fillna(0).to_numpy(dtype=int)
+    gol_ospite = pd.to_numeric(pd.Series(gol_ospite), errors='coerce').fillna(0).to_numpy(dtype=int)
+    valida = pd.Series(valida).fillna(False).to_numpy(dtype=bool)
+
+    df.loc[indici, 'GolCasa'] = gol_casa
+    df.loc[indici, 'GolOspite'] = gol_ospite
+    df.loc[indici, 'Valida'] = valida
+    return len(indici)
+
+
+def maschera_ritirati(colonna: pd.Series, ritirati) -> pd.Series:
+    """
+    Ritorna una maschera booleana delle righe in cui compare un giocatore ritirato.
+
+    Mantiene la semantica storica "sottostringa" (es. 'Mario' trova 'Juventus-Mario')
+    con una sola regex alternata al posto di un ciclo Python per riga.
+
+    Args:
+        colonna: Serie con i nomi (es. df['Casa']).
+        ritirati: Iterable di nomi/“Squadra-Giocatore” ritirati.
+
+    Returns:
+        Serie booleana allineata a colonna.
+    """
+    ritirati = [str(r) for r in ritirati if r]
+    if not ritirati:
+        return pd.Series(False, index=colonna.index)
+    pattern = "|".join(re.escape(r) for r in sorted(set(ritirati), key=len, reverse=True))
+    return colonna.astype(str).str.contains(pattern, regex=True, na=False)
+
+
+def applica_abbandoni(df: pd.DataFrame, ritirati) -> int:
+    """
+    Assegna i risultati a tavolino a tutti gli incontri dei giocatori ritirati.
+
+    Regole:
+      - ritirato in casa contro attivo  -> 0-3
+      - ritirato ospite contro attivo   -> 3-0
+      - entrambi ritirati               -> 0-0
+    Tutti gli incontri coinvolti vengono marcati come validi.
+
+    Args:
+        df: DataFrame del calendario (modificato in-place).
+        ritirati: Iterable di nomi/“Squadra-Giocatore” ritirati.
+
+    Returns:
+        Numero di incontri aggiornati.
+    """
+    if df.empty:
+        return 0
+    casa_rit = maschera_ritirati(df['Casa'], ritirati).to_numpy()
+    ospite_rit = maschera_ritirati(df['Ospite'], ritirati).to_numpy()
+    coinvolti = casa_rit | ospite_rit
+    if not coinvolti.any():
+        return 0
+
+    gol_casa = np.where(ospite_rit & ~casa_rit, 3, 0)
+    gol_ospite = np.where(casa_rit & ~ospite_rit, 3, 0)
+    return aggiorna_risultati(
+        df,
+        df.index[coinvolti],
+        gol_casa[coinvolti],
+        gol_ospite[coinvolti],
+        np.ones(int(coinvolti.sum()), dtype=bool),
+    )
+
+
+def upsert_incontri(df_base: pd.DataFrame, df_nuovi: pd.DataFrame, chiavi: list, colonne: list):
+    """
+    Upsert per chiave degli incontri di df_nuovi dentro df_base in un'unica operazione.
+
+    Le righe già presenti (stessa chiave) vengono aggiornate sulle colonne indicate,
+    quelle mancanti vengono accodate. Sostituisce il ciclo "maschera + concat per riga".
+
+    Args:
+        df_base: Calendario esistente (non modificato).
+        df_nuovi: Incontri da scrivere; devono contenere chiavi e colonne.
+        chiavi: Colonne che identificano un incontro (es. Girone, Giornata, Casa, Ospite).
+        colonne: Colonne da aggiornare/scrivere.
+
+    Returns:
+        Tupla (df_risultato, df_modificati, df_aggiunti):
+          - df_risultato: calendario aggiornato (ordine originale + nuove righe in coda)
+          - df_modificati: righe esistenti i cui valori sono effettivamente cambiati
+          - df_aggiunti: righe nuove accodate
+    """
+    nuovi = df_nuovi.drop_duplicates(subset=chiavi, keep='last')
+    if df_base is None or df_base.empty:
+        return nuovi.reset_index(drop=True), nuovi.iloc[0:0], nuovi.reset_index(drop=True)
+
+    base = df_base.reset_index(drop=True)
+    for col in colonne:
+        if col not in base.columns:
+            base[col] = None
+
+    unione = base[chiavi].reset_index().merge(
+        nuovi[chiavi + colonne], on=chiavi, how='inner'
+    )
+    pos = unione['index'].to_numpy()
+
+    prima = base.loc[pos, colonne].reset_index(drop=True).astype(object)
+    dopo = unione[colonne].reset_index(drop=True).astype(object)
+    diversi = ~((prima == dopo) | (prima.isna() & dopo.isna())).all(axis=1).to_numpy()
+
+    base.loc[pos, colonne] = dopo.to_numpy()
+
+    presenti = nuovi[chiavi].merge(base[chiavi].drop_duplicates(), on=chiavi, how='left', indicator=True)['_merge'].to_numpy() == 'both'
+    aggiunti = nuovi.loc[~presenti]
+    if not aggiunti.empty:
+        base = pd.concat([base, aggiunti], ignore_index=True)
+
+    modificati = base.loc[pos[diversi], chiavi + colonne]
+    return base, modificati, aggiunti.reset_index(drop=True)
@@ -0,0 +1,236 @@
+"""
+tabellone.py — Modello persistente del tabellone a eliminazione diretta (fasi finali KO).
+
+Il tabellone viene salvato accanto al calendario (campo `tabellone_ko` del documento
+torneo) e contiene, per ogni turno, gli slot degli incontri con il puntatore allo slot
+del turno successivo in cui avanza il vincitore:
+
+    {
+        "versione": 1,
+        "rounds": [
+            {"nome": "Quarti di finale (di 8)", "giornata": 1, "slots": [
+                {"Match": 1, "SquadraA": ..., "GiocatoreA": ..., "SquadraB": ..., "GiocatoreB": ...,
+                 "GolA": None, "GolB": None, "Valida": False, "Vincitore": None,
+                 "next": {"round": 1, "slot": 0, "lato": "A"}},
+                ...
+            ]},
+            ...
+        ]
+    }
+
+Fornisce:
+  - nome_round(): nome del turno in base al numero di incontri
+  - crea_tabellone(): struttura completa a partire dal primo turno
+  - aggiorna_round(): registra i risultati di un turno e fa avanzare i vincitori
+  - rounds_da_tabellone(): lista di DataFrame nel formato di st.session_state['rounds_ko']
+  - turni_tabellone(): turni (anche futuri, con slot vuoti) per il rendering del bracket
+  - tabellone_da_calendario(): ricostruzione una tantum per i tornei salvati prima del tabellone
+  - tabellone_da_rounds(): tabellone dai turni già presenti in sessione
+"""
+import numpy as np
+import pandas as pd
+
+VERSIONE_TABELLONE = 1
+
+NOMI_ROUND = {
+    16: "Sedicesimi di finale",
+    8: "Ottavi di finale",
+    4: "Quarti di finale",
+    2: "Semifinali",
+    1: "Finale",
+}
+
+COLONNE_ROUND = ['Round', 'Match', 'SquadraA', 'GiocatoreA', 'SquadraB', 'GiocatoreB', 'GolA', 'GolB', 'Valida', 'Vincitore']
+_CAMPI_SLOT = ['Match', 'SquadraA', 'GiocatoreA', 'SquadraB', 'GiocatoreB', 'GolA', 'GolB', 'Valida', 'Vincitore']
+
+
+def nome_round(n_partite: int, fallback: str = None) -> str:
+    """Ritorna il nome del turno dato il numero di incontri (es. 4 -> 'Quarti di finale')."""
+    return NOMI_ROUND.get(int(n_partite), fallback or f"Round {n_partite}")
+
+
+def _valore(v):
+    """Normalizza NaN/NA di pandas a None e i tipi numpy a tipi Python (serializzabili su Mongo)."""
+    if v is None:
+        return None
+    try:
+        if pd.isna(v):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+def _slot_vuoto(match: int) -> dict:
+    return {
+        "Match": match, "SquadraA": None, "GiocatoreA": None, "SquadraB": None, "GiocatoreB": None,
+        "GolA": None, "GolB": None, "Valida": False, "Vincitore": None, "next": None,
+    }
+
+
+def crea_tabellone(df_primo_round: pd.DataFrame) -> dict:
+    """
+    Crea il tabellone completo (tutti i turni fino alla finale) a partire dal primo turno.
+
+    Args:
+        df_primo_round: DataFrame del primo turno nel formato rounds_ko
+            (Round, Match, SquadraA, GiocatoreA, SquadraB, GiocatoreB, ...).
+
+    Returns:
+        Dizionario del tabellone, pronto per essere salvato su MongoDB.
+    """
+    n_partite = len(df_primo_round)
+    if n_partite == 0:
+        return {"versione": VERSIONE_TABELLONE, "rounds": []}
+
+    primo_nome = df_primo_round['Round'].iloc[0] if 'Round' in df_primo_round.columns else nome_round(n_partite)
+    rounds = []
+    partite_turno = n_partite
+    while True:
+        rounds.append({
+            "nome": primo_nome if not rounds else nome_round(partite_turno),
+            "giornata": len(rounds) + 1,
+            "slots": [_slot_vuoto(m + 1) for m in range(partite_turno)],
+        })
+        if partite_turno <= 1:
+            break
+        partite_turno //= 2
+
+    for r, turno in enumerate(rounds[:-1]):
+        for j, slot in enumerate(turno["slots"]):
+            slot["next"] = {"round": r + 1, "slot": j // 2, "lato": "A" if j % 2 == 0 else "B"}
+
+    for j, riga in enumerate(df_primo_round.to_dict('records')):
+        slot = rounds[0]["slots"][j]
+        for campo in _CAMPI_SLOT:
+            if campo in riga:
+                slot[campo] = _valore(riga[campo])
+        slot["Valida"] = bool(slot["Valida"]) if slot["Valida"] is not None else False
+
+    return {"versione": VERSIONE_TABELLONE, "rounds": rounds}
+
+
+def aggiorna_round(tabellone: dict, round_idx: int, df_round: pd.DataFrame) -> list:
+    """
+    Registra i risultati di un turno nel tabellone e fa avanzare i vincitori nello slot successivo.
+
+    Args:
+        tabellone: Tabellone da aggiornare (modificato in-place).
+        round_idx: Indice (0-based) del turno.
+        df_round: DataFrame del turno con GolA, GolB, Valida, Vincitore.
+
+    Returns:
+        Lista dei vincitori del turno, nell'ordine degli slot.
+    """
+    turno = tabellone["rounds"][round_idx]
+    vincitori = []
+    for slot, riga in zip(turno["slots"], df_round.to_dict('records')):
+        for campo in ('GolA', 'GolB', 'Valida', 'Vincitore'):
+            if campo in riga:
+                slot[campo] = _valore(riga[campo])
+        slot["Valida"] = bool(slot["Valida"]) if slot["Valida"] is not None else False
+
+        vincitore = slot.get("Vincitore")
+        if not vincitore:
+            continue
+        vincitori.append(vincitore)
+        puntatore = slot.get("next")
+        if puntatore:
+            lato = puntatore["lato"]
+            giocatore = slot["GiocatoreA"] if vincitore == slot["SquadraA"] else slot["GiocatoreB"]
+            dest = tabellone["rounds"][puntatore["round"]]["slots"][puntatore["slot"]]
+            dest[f"Squadra{lato}"] = vincitore
+            dest[f"Giocatore{lato}"] = giocatore
+    return vincitori
+
+
+def _turno_pronto(turno: dict) -> bool:
+    return all(s.get("SquadraA") and s.get("SquadraB") for s in turno["slots"])
+
+
+def rounds_da_tabellone(tabellone: dict) -> list:
+    """
+    Converte il tabellone nella lista di DataFrame usata dall'app (st.session_state['rounds_ko']).
+    Include solo i turni già generati, cioè con entrambe le squadre note in ogni slot.
+    """
+    rounds = []
+    for turno in tabellone.get("rounds", []):
+        if not _turno_pronto(turno):
+            break
+        df_round = pd.DataFrame([{campo: s.get(campo) for campo in _CAMPI_SLOT} for s in turno["slots"]])
+        df_round.insert(0, 'Round', turno["nome"])
+        rounds.append(df_round[COLONNE_ROUND])
+    return rounds
+
+
+def turni_tabellone(tabellone: dict) -> list:
+    """Ritorna [(nome_turno, [slot, ...]), ...] per tutti i turni, compresi quelli ancora da giocare."""
+    return [(turno["nome"], turno["slots"]) for turno in tabellone.get("rounds", [])]
+
+
+def tabellone_da_calendario(df_ko: pd.DataFrame) -> dict:
+    """
+    Ricostruisce il tabellone dalle righe KO del calendario piatto (tornei salvati prima
+    dell'introduzione di `tabellone_ko`). Da usare una sola volta: il risultato va poi salvato.
+
+    Args:
+        df_ko: Righe del calendario con Girone == 'Eliminazione Diretta'
+            (Giornata, Casa, Ospite, GolCasa, GolOspite, Valida, GiocatoreCasa, GiocatoreOspite).
+
+    Returns:
+        Tabellone, oppure None se non ci sono incontri KO.
+    """
+    if df_ko is None or df_ko.empty:
+        return None
+
+    df = df_ko.rename(columns={'Casa': 'SquadraA', 'Ospite': 'SquadraB', 'GolCasa': 'GolA', 'GolOspite': 'GolB',
+                               'GiocatoreCasa': 'GiocatoreA', 'GiocatoreOspite': 'GiocatoreB'})
+    for col in ('GiocatoreA', 'GiocatoreB'):
+        if col not in df.columns:
+            df[col] = None
+
+    # Chiave del turno: coppie ordinate (indipendenti da casa/ospite) per scartare i turni duplicati
+    coppie = np.sort(df[['SquadraA', 'SquadraB']].astype(str).to_numpy(), axis=1)
+    df['_coppia'] = [f"{a}|{b}" for a, b in coppie]
+
+    turni = []
+    visti = set()
+    for giornata, df_round in df.sort_values('Giornata', kind='stable').groupby('Giornata', sort=True):
+        chiave = tuple(sorted(df_round['_coppia']))
+        if chiave in visti:
+            continue
+        visti.add(chiave)
+        df_round = df_round.reset_index(drop=True)
+        gol_a = pd.to_numeric(df_round['GolA'], errors='coerce')
+        gol_b = pd.to_numeric(df_round['GolB'], errors='coerce')
+        df_round['GolA'] = gol_a
+        df_round['GolB'] = gol_b
+        df_round['Vincitore'] = np.where(gol_a > gol_b, df_round['SquadraA'],
+                                         np.where(gol_b > gol_a, df_round['SquadraB'], None))
+        df_round['Match'] = range(1, len(df_round) + 1)
+        nomi_salvati = df_round['Round'].dropna() if 'Round' in df_round.columns else pd.Series(dtype=object)
+        df_round['Round'] = nomi_salvati.iloc[0] if not nomi_salvati.empty else nome_round(len(df_round), f"Round {int(giornata)}")
+        turni.append(df_round)
+
+    return tabellone_da_rounds(turni)
+
+
+def tabellone_da_rounds(rounds_ko: list) -> dict:
+    """
+    Costruisce il tabellone dalla lista di turni già in sessione (formato rounds_ko),
+    ad esempio per una sessione aperta prima dell'introduzione di `tabellone_ko`.
+    """
+    if not rounds_ko:
+        return None
+    tabellone = crea_tabellone(rounds_ko[0])
+    for r, df_round in enumerate(rounds_ko):
+        if r >= len(tabellone["rounds"]):
+            break
+        if r > 0:
+            for slot, riga in zip(tabellone["rounds"][r]["slots"], df_round.to_dict('records')):
+                for campo in ('SquadraA', 'GiocatoreA', 'SquadraB', 'GiocatoreB'):
+                    slot[campo] = _valore(riga.get(campo))
+        aggiorna_round(tabellone, r, df_round)
+    return tabellone
@@ -0,0 +1,59 @@
+"""
+torneo_svizzero.py — Lettura del torneo svizzero dal DB, senza effetti collaterali.
+
+Fornisce:
+  - PROIEZIONE_TORNEO: campi del documento necessari per aprire un torneo
+  - leggi_torneo(): una sola find_one con proiezione (nessuna scrittura, nessun log)
+  - normalizza_partite(): DataFrame delle partite con i tipi usati dall'app
+  - risultati_temp_turno(): stato dei widget (gol e validazione) per il solo turno attivo
+
+Usato da carica_torneo_da_db() delle app svizzere e dal benchmark bench_apertura_svizzero.py.
+"""
+import pandas as pd
+
+PROIEZIONE_TORNEO = {
+    "nome_torneo": 1, "df_torneo": 1, "df_squadre": 1, "turno_attivo": 1, "torneo_iniziato": 1,
+    "torneo_finito": 1, "modalita_turni": 1, "max_turni": 1, "data_modifica": 1,
+}
+ORDINE_RECENTI = [("data_modifica", -1), ("data_salvataggio", -1), ("_id", -1)]
+
+
+def leggi_torneo(collection, nome_torneo: str):
+    """Documento più recente con il nome indicato (solo i campi di PROIEZIONE_TORNEO), None se assente."""
+    return collection.find_one({"nome_torneo": nome_torneo}, PROIEZIONE_TORNEO, sort=ORDINE_RECENTI)
+
+
+def normalizza_partite(righe: list) -> pd.DataFrame:
+    """
+    Partite del torneo con GolCasa/GolOspite interi e Validata booleana (colonne create se mancanti).
+
+    Args:
+        righe: Campo df_torneo del documento.
+    """
+    df = pd.DataFrame(righe)
+    for col in ('GolCasa', 'GolOspite'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int) if col in df.columns else 0
+    if 'Validata' in df.columns:
+        df['Validata'] = df['Validata'].where(df['Validata'].notna(), False).astype(bool)
+    else:
+        df['Validata'] = False
+    return df
+
+
+def risultati_temp_turno(df: pd.DataFrame, turno: int) -> dict:
+    """
+    Chiavi gc_/go_/val_ di st.session_state.risultati_temp per le partite del turno indicato.
+
+    Le partite dei turni precedenti non servono ai widget: vengono inizializzate solo
+    se visualizzate.
+    """
+    if df.empty or 'Turno' not in df.columns:
+        return {}
+    df_turno = df[df['Turno'] == turno]
+    risultati = {}
+    for casa, ospite, gc, go, val in zip(df_turno['Casa'], df_turno['Ospite'], df_turno['GolCasa'].tolist(),
+                                         df_turno['GolOspite'].tolist(), df_turno['Validata'].tolist()):
+        risultati[f"gc_{turno}_{casa}_{ospite}"] = gc
+        risultati[f"go_{turno}_{casa}_{ospite}"] = go
+        risultati[f"val_{turno}_{casa}_{ospite}"] = val
+    return risultati
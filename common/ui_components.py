@@ -6,6 +6,7 @@ Fornisce:
   - Barra laterale comune (sidebar standard)
   - Navigazione giornate/turni
   - Keep-alive script
+  - Celebrazione di fine torneo animata nel browser
 """
 import streamlit as st
 import streamlit.components.v1 as components
@@ -357,7 +358,56 @@ def add_keep_alive(interval_ms: int = 180000):
     Args:
         interval_ms: Intervallo in millisecondi fra gli heartbeat (default: 3 minuti).
     """
-    enable_session_keepalive(interval_ms)
-
-
+    enable_session_keepalive(interval_ms)
+
+
+# ==============================================================================
+# 🎉 CELEBRAZIONE FINE TORNEO
+# ==============================================================================
+
+def celebrazione_vittoria(ondate: int = 3, intervallo_ms: int = 1000):
+    """
+    Palloncini di fine torneo: st.balloons() subito e altre `ondate` animate dal browser.
+
+    Le ondate successive sono temporizzate in JavaScript nella pagina: lo script
+    Streamlit termina subito (nessun time.sleep), quindi la sessione resta reattiva e
+    il thread del server è libero durante l'animazione.
 
+    Args:
+        ondate: Ondate di palloncini dopo la prima.
+        intervallo_ms: Millisecondi tra due ondate.
+    """
+    st.balloons()
+    components.html(
+        f"""
+        <script>
+        (function() {{
+            var doc = window.parent.document;
+            if (!doc.getElementById('subbuteo-celebrazione-stile')) {{
+                var stile = doc.createElement('style');
+                stile.id = 'subbuteo-celebrazione-stile';
+                stile.textContent = '@keyframes subbuteo-sale {{' +
+                    'from {{ transform: translateY(0) rotate(0deg); opacity: 1; }}' +
+                    'to {{ transform: translateY(-120vh) rotate(25deg); opacity: .7; }} }}';
+                doc.head.appendChild(stile);
+            }}
+            var simboli = ['🎈', '🎈', '🎈', '🎉', '🏆'];
+            function ondata() {{
+                for (var i = 0; i < 30; i++) {{
+                    var el = doc.createElement('span');
+                    el.textContent = simboli[Math.floor(Math.random() * simboli.length)];
+                    el.style.cssText = 'position:fixed;bottom:-10vh;z-index:999999;pointer-events:none;' +
+                        'left:' + (Math.random() * 100) + 'vw;font-size:' + (28 + Math.random() * 28) + 'px;' +
+                        'animation:subbuteo-sale ' + (3 + Math.random() * 2) + 's ease-in ' + (Math.random() * 0.6) + 's forwards;';
+                    el.addEventListener('animationend', function() {{ this.remove(); }});
+                    doc.body.appendChild(el);
+                }}
+            }}
+            for (var n = 1; n <= {ondate}; n++) {{
+                setTimeout(ondata, n * {intervallo_ms});
+            }}
+        }})();
+        </script>
+        """,
+        height=0, width=0
+    )
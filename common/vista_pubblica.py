@@ -0,0 +1,141 @@
+"""
+vista_pubblica.py — Tabellone pubblico in sola lettura (?view=board) da snapshot HTML precalcolato.
+
+Fornisce:
+  - giornata_corrente(): prima giornata con incontri ancora da validare
+  - snapshot_html(): pagina completa (classifiche dei gironi, giornata in corso,
+    tabellone a eliminazione diretta) generata una sola volta per versione del torneo
+
+Lo snapshot è una stringa HTML senza dipendenze da Streamlit: l'app la mette in cache
+per (torneo, data_modifica) e ogni spettatore la riceve così com'è, senza ricalcoli.
+"""
+from html import escape
+
+import pandas as pd
+
+from common.classifica import calcola_classifica, to_bool_series
+from common.tabellone import tabellone_da_calendario, turni_tabellone
+
+GIRONE_KO = "Eliminazione Diretta"
+COLONNE_CLASSIFICA = ['Squadra', 'Punti', 'G', 'V', 'P', 'S', 'GF', 'GS', 'DR']
+
+_STILE = """
+<style>
+  .board { font-family: sans-serif; color: #1d3557; }
+  .board h2 { margin: 1.2rem 0 .4rem; font-size: 1.25rem; }
+  .board h3 { margin: .8rem 0 .3rem; font-size: 1.05rem; }
+  .board table { border-collapse: collapse; width: 100%; font-size: .9rem; }
+  .board th { background: #1d3557; color: white; padding: 4px 6px; text-align: center; }
+  .board td { border-bottom: 1px solid #e0e0e0; padding: 4px 6px; text-align: center; }
+  .board td:first-child, .board th:first-child { text-align: left; }
+  .board .gironi { display: flex; flex-wrap: wrap; gap: 1rem; }
+  .board .girone { flex: 1 1 320px; }
+  .board .partita { display: flex; justify-content: space-between; padding: 3px 0; border-bottom: 1px dashed #ccc; }
+  .board .risultato { font-weight: 700; min-width: 3.5rem; text-align: center; }
+  .board .da-giocare { color: #999; }
+  .board .bracket { display: flex; gap: 1rem; overflow-x: auto; }
+  .board .turno { display: flex; flex-direction: column; justify-content: space-around; min-width: 180px; }
+  .board .slot { border: 1px solid #457b9d; border-radius: 6px; margin: 4px 0; padding: 4px 6px; }
+  .board .slot div { display: flex; justify-content: space-between; }
+  .board .vincitore { font-weight: 700; }
+</style>
+"""
+
+
+def giornata_corrente(df_girone: pd.DataFrame):
+    """Prima giornata con incontri non validati; l'ultima se il girone è concluso."""
+    da_giocare = df_girone.loc[~df_girone['Valida'].astype(bool), 'Giornata']
+    return da_giocare.min() if not da_giocare.empty else df_girone['Giornata'].max()
+
+
+def _tabella_classifica(df_classifica: pd.DataFrame) -> str:
+    righe = "".join(
+        "<tr>" + "".join(f"<td>{escape(str(riga[c]))}</td>" for c in COLONNE_CLASSIFICA) + "</tr>"
+        for _, riga in df_classifica.iterrows()
+    )
+    intestazione = "".join(f"<th>{c}</th>" for c in COLONNE_CLASSIFICA)
+    return f"<table><tr>{intestazione}</tr>{righe}</table>"
+
+
+def _partite(df_giornata: pd.DataFrame) -> str:
+    html = []
+    for _, p in df_giornata.iterrows():
+        if p['Valida']:
+            risultato = f"<span class='risultato'>{int(p['GolCasa'])} - {int(p['GolOspite'])}</span>"
+        else:
+            risultato = "<span class='risultato da-giocare'>-</span>"
+        html.append(f"<div class='partita'><span>{escape(str(p['Casa']))}</span>{risultato}"
+                    f"<span>{escape(str(p['Ospite']))}</span></div>")
+    return "".join(html)
+
+
+def _sezione_gironi(df: pd.DataFrame) -> str:
+    if df.empty:
+        return ""
+    classifica = calcola_classifica(df, gruppo='Girone', col_valida='Valida', spareggi=('Punti', 'DR'),
+                                    includi_non_giocate=True)
+    if classifica.empty:
+        return ""
+    classifica = classifica.rename(columns={'N': 'P'})
+    blocchi = []
+    for girone, df_girone in df.groupby('Girone', sort=True):
+        giornata = giornata_corrente(df_girone)
+        df_giornata = df_girone[df_girone['Giornata'] == giornata]
+        blocchi.append(
+            f"<div class='girone'><h3>{escape(str(girone))}</h3>"
+            f"{_tabella_classifica(classifica[classifica['Girone'] == girone])}"
+            f"<h3>Giornata {escape(str(giornata))}</h3>{_partite(df_giornata)}</div>"
+        )
+    return "<h2>🏆 Classifiche</h2><div class='gironi'>" + "".join(blocchi) + "</div>"
+
+
+def _sezione_ko(tabellone: dict) -> str:
+    colonne = []
+    for nome, slots in turni_tabellone(tabellone):
+        html_slots = []
+        for s in slots:
+            righe = []
+            for lato in ("A", "B"):
+                squadra = s.get(f"Squadra{lato}")
+                gol = s.get(f"Gol{lato}")
+                classe = " class='vincitore'" if squadra and squadra == s.get("Vincitore") else ""
+                gol_txt = "" if gol is None or not s.get("Valida") else str(int(gol))
+                righe.append(f"<div{classe}><span>{escape(str(squadra or '—'))}</span><span>{gol_txt}</span></div>")
+            html_slots.append(f"<div class='slot'>{''.join(righe)}</div>")
+        colonne.append(f"<div class='turno'><h3>{escape(str(nome))}</h3>{''.join(html_slots)}</div>")
+    return "<h2>⚔️ Eliminazione diretta</h2><div class='bracket'>" + "".join(colonne) + "</div>"
+
+
+def snapshot_html(documento: dict) -> str:
+    """
+    Pagina del tabellone pubblico per un documento torneo.
+
+    Args:
+        documento: Documento torneo con nome_torneo, calendario, data_modifica ed
+            eventualmente tabellone_ko.
+
+    Returns:
+        HTML completo (stile incluso), da mostrare con st.markdown(..., unsafe_allow_html=True).
+    """
+    nome = escape(str(documento.get("nome_torneo", "Torneo")))
+    aggiornato = documento.get("data_modifica")
+    sottotitolo = f"<p>Aggiornato alle {aggiornato:%H:%M:%S}</p>" if aggiornato else ""
+    sezioni = []
+
+    df = pd.DataFrame(documento.get("calendario") or [])
+    if not df.empty and {'Girone', 'Giornata', 'Casa', 'Ospite', 'Valida'}.issubset(df.columns):
+        df['GolCasa'] = pd.to_numeric(df['GolCasa'], errors='coerce').fillna(0)
+        df['GolOspite'] = pd.to_numeric(df['GolOspite'], errors='coerce').fillna(0)
+        df['Valida'] = to_bool_series(df['Valida'])
+        df_ko = df[df['Girone'].astype(str) == GIRONE_KO]
+        sezioni.append(_sezione_gironi(df[df['Girone'].astype(str) != GIRONE_KO]))
+    else:
+        df_ko = pd.DataFrame()
+
+    tabellone = documento.get("tabellone_ko") or tabellone_da_calendario(df_ko)
+    if tabellone and tabellone.get("rounds"):
+        sezioni.append(_sezione_ko(tabellone))
+
+    if not any(sezioni):
+        sezioni.append("<p>Nessun incontro disponibile.</p>")
+    return f"{_STILE}<div class='board'><h1>⚽ {nome}</h1>{sottotitolo}{''.join(sezioni)}</div>"
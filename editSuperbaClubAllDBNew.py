@@ -10,13 +10,16 @@ st.set_page_config(
 )
 
 import pandas as pd
-from pymongo import MongoClient, UpdateOne, InsertOne, DeleteOne
+from pymongo import MongoClient, UpdateOne, InsertOne, DeleteMany
 from pymongo.server_api import ServerApi
 import certifi
 from fpdf import FPDF
 from datetime import datetime
 import os
 import io
+import json
+import hashlib
+import numpy as np
 import streamlit.components.v1 as components
 
 # Import custom utilities
@@ -31,6 +34,7 @@ from common.audio import (
     start_background_audio, setup_audio_sidebar
 )
 from common.ui_components import setup_common_sidebar, enable_session_keepalive
+from common.eliminazione_tornei import elimina_tornei_per_nome, elimina_tornei_non_campionato
 
 def render_sidebar_collapse_workaround():
     components.html("""
@@ -255,10 +259,47 @@ def carica_dati_da_mongo():
             # Creiamo una versione stringa solo per la visualizzazione tabellare se necessario, 
             # ma il DF nel session state deve mantenere le liste per la logica di update.
         if "Giocatore" in df.columns:
-            return df.sort_values(by="Giocatore").reset_index(drop=True)
+            df = df.sort_values(by="Giocatore").reset_index(drop=True)
+            # Fotografia dello stato sul DB: base per il salvataggio incrementale
+            st.session_state['_giocatori_sincronizzati'] = df.copy()
+            return df
+    st.session_state.pop('_giocatori_sincronizzati', None)
     return pd.DataFrame(columns=["Giocatore", "Squadra", "Potenziale"] + list(CAMPI_TROFEI.keys()))
 
+def _valore_confronto(v):
+    """Normalizza un valore per il confronto tra righe (NaN/None, numpy, float interi)."""
+    if isinstance(v, np.generic):
+        v = v.item()
+    if isinstance(v, float):
+        if v != v:
+            return None
+        if v.is_integer():
+            return int(v)
+    return v
+
+def hash_righe_giocatori(df, colonne):
+    """Ritorna {Giocatore: hash} calcolato sulle colonne indicate (per rilevare le righe modificate)."""
+    if df is None or df.empty or "Giocatore" not in df.columns:
+        return {}
+    colonne = [c for c in colonne if c != "Giocatore"]
+    righe = df.reindex(columns=["Giocatore"] + colonne).to_dict('records')
+    return {
+        r["Giocatore"]: hashlib.md5(
+            json.dumps([_valore_confronto(r[c]) for c in colonne], default=str).encode("utf-8")
+        ).hexdigest()
+        for r in righe
+    }
+
 def salva_dati_su_mongo(df):
+    """
+    Sincronizza i giocatori su MongoDB in modo incrementale.
+
+    Confronta le righe con l'ultima fotografia caricata dal DB (hash per riga sulle
+    colonne presenti nel DataFrame) e genera operazioni bulk solo per i giocatori
+    nuovi, modificati ed eliminati. I dati esistenti vengono letti con una query
+    proiettata sui soli giocatori modificati e sui soli campi necessari al merge.
+    """
+    colonne_df = list(df.columns)
     # Assicurati che le colonne obbligatorie siano presenti
     colonne_obbligatorie = ["Giocatore", "Squadra", "Potenziale", "Ruolo", "Password", "SetPwd"]
     for col in colonne_obbligatorie:
@@ -267,14 +308,36 @@ def salva_dati_su_mongo(df):
     
     # I campi trofei non vengono più forzati nel dataframe in questa fase
     # per evitare che sovrascrivano i dati già esistenti nel record_esistente.
-            
-    # Prendi i dati esistenti per il confronto
-    dati_esistenti = {d["Giocatore"]: d for d in collection_players.find({})}
+
+    giocatori_nel_df = set([str(g).strip() for g in df["Giocatore"].dropna().tolist() if str(g).strip() != ""])
+
+    # Righe modificate rispetto all'ultima sincronizzazione (tutte, se manca la fotografia)
+    sincronizzati = st.session_state.get('_giocatori_sincronizzati')
+    hash_correnti = hash_righe_giocatori(df, colonne_df)
+    if sincronizzati is not None:
+        hash_precedenti = hash_righe_giocatori(sincronizzati, colonne_df)
+        giocatori_noti = set(hash_precedenti.keys())
+    else:
+        hash_precedenti = {}
+        giocatori_noti = set(collection_players.distinct("Giocatore"))
+    giocatori_modificati = {g for g, h in hash_correnti.items() if hash_precedenti.get(g) != h}
+
+    # Prendi i dati esistenti (solo giocatori modificati, solo campi usati nel merge)
+    proiezione = {"_id": 0, "Giocatore": 1, "SetPwd": 1, "Squadra": 1, "Potenziale": 1, "Ruolo": 1, "Password": 1}
+    proiezione.update({campo: 1 for campo in CAMPI_TROFEI})
+    dati_esistenti = {}
+    if giocatori_modificati:
+        dati_esistenti = {
+            d["Giocatore"]: d
+            for d in collection_players.find({"Giocatore": {"$in": list(giocatori_modificati)}}, proiezione)
+        }
     
     # Prepara i dati per l'aggiornamento
     operazioni = []
     for record in df.to_dict('records'):
         giocatore = record["Giocatore"]
+        if giocatore not in giocatori_modificati:
+            continue
         if giocatore in dati_esistenti:
             # Prendi il record esistente
             record_esistente = dati_esistenti[giocatore]
@@ -312,17 +375,21 @@ def salva_dati_su_mongo(df):
                     record[campo] = default
             operazioni.append(InsertOne(record))
             
-    # Trova i giocatori eliminati (presenti nel DB ma rimossi dal dataframe)
-    giocatori_nel_df = set([str(g).strip() for g in df["Giocatore"].dropna().tolist() if str(g).strip() != ""])
-    giocatori_da_eliminare = set(dati_esistenti.keys()) - giocatori_nel_df
-    
-    for giocatore in giocatori_da_eliminare:
-        operazioni.append(DeleteOne({"Giocatore": giocatore}))
+    # Trova i giocatori eliminati (presenti all'ultima sincronizzazione ma rimossi dal dataframe)
+    giocatori_da_eliminare = giocatori_noti - giocatori_nel_df
+    if giocatori_da_eliminare:
+        operazioni.append(DeleteMany({"Giocatore": {"$in": list(giocatori_da_eliminare)}}))
     
     # Esegui le operazioni in batch
     if operazioni:
         collection_players.bulk_write(operazioni, ordered=False)
 
+    # Aggiorna la fotografia: valida solo se il DataFrame contiene tutte le colonne note
+    if sincronizzati is None or set(sincronizzati.columns).issubset(colonne_df):
+        st.session_state['_giocatori_sincronizzati'] = df[colonne_df].copy()
+    else:
+        st.session_state.pop('_giocatori_sincronizzati', None)
+
 # --- Sezione per la gestione dei tornei ---
 def carica_tornei_all_italiana():
     """Carica solo i nomi dei tornei all'italiana dalla collezione Superba."""
@@ -337,13 +404,6 @@ def carica_tornei_all_italiana():
             return df.sort_values(by="Torneo").reset_index(drop=True)
     return pd.DataFrame(columns=["Torneo"])
 
-def salva_tornei_all_italiana(df):
-    db_tornei = client_italiana["TorneiSubbuteo"]
-    collection_tornei = db_tornei["Superba"]
-    collection_tornei.delete_many({})
-    collection_tornei.insert_many(df.to_dict('records'))
-    st.toast("Dati dei tornei all'italiana salvati con successo!")
-
 def carica_tornei_svizzeri():
     """Carica solo i nomi dei tornei svizzeri dalla collezione SuperbaSvizzero."""
     db_tornei = client_svizzera["TorneiSubbuteo"]
@@ -357,13 +417,6 @@ def carica_tornei_svizzeri():
             return df.sort_values(by="Torneo").reset_index(drop=True)
     return pd.DataFrame(columns=["Torneo"])
 
-def salva_tornei_svizzeri(df):
-    db_tornei = client_svizzera["TorneiSubbuteo"]
-    collection_tornei = db_tornei["SuperbaSvizzero"]
-    collection_tornei.delete_many({})
-    collection_tornei.insert_many(df.to_dict('records'))
-    st.toast("Dati dei tornei svizzeri salvati con successo!")
-
 
 # Mostra la schermata di autenticazione se non si è già autenticati
 auth.require_auth(club="Superba")
@@ -924,81 +977,57 @@ def process_deletion_with_password(password, deletion_type, data):
         elif deletion_type == "tornei_ita":
             db_tornei = client_italiana["TorneiSubbuteo"]
             collection_tornei = db_tornei["Superba"]
-            for torneo in data:
-                # Log before deletion
-                torneo_data = collection_tornei.find_one({"nome_torneo": torneo})
-                collection_tornei.delete_one({"nome_torneo": torneo})
-                st.session_state.df_tornei_italiana = st.session_state.df_tornei_italiana[st.session_state.df_tornei_italiana["Torneo"] != torneo].reset_index(drop=True)
-                
-                # Log tournament deletion
-                log.log_action(
-                    username=username,
-                    action="eliminazione_torneo_italiano",
-                    torneo=torneo,
-                    details={
-                        "tipo_operazione": "eliminazione_torneo_singolo",
-                        "torneo": torneo,
-                        "tornei_eliminati": 1,
-                        "dettagli_torneo": {
-                            "tipo": "italiano",
-                            "partecipanti": torneo_data.get("partite", []) if torneo_data else []
-                        }
-                    }
-                )
-                st.toast(f"Torneo '{torneo}' eliminato!")
+            riepilogo = elimina_tornei_per_nome(collection_tornei, data)
+            st.session_state.df_tornei_italiana = st.session_state.df_tornei_italiana[~st.session_state.df_tornei_italiana["Torneo"].isin(riepilogo["tornei"])].reset_index(drop=True)
+            
+            # Log tournament deletion (solo nomi e conteggi)
+            log.log_action(
+                username=username,
+                action="eliminazione_torneo_italiano",
+                torneo=", ".join(riepilogo["tornei"]),
+                details={
+                    "tipo_operazione": "eliminazione_torneo_singolo",
+                    "tipo": "italiano",
+                    **riepilogo
+                }
+            )
+            st.toast(f"Tornei eliminati: {riepilogo['tornei_eliminati']}")
 
         elif deletion_type == "tornei_svizz":
             db_tornei = client_svizzera["TorneiSubbuteo"]
             collection_tornei = db_tornei["SuperbaSvizzero"]
-            for torneo in data:
-                # Log before deletion
-                torneo_data = collection_tornei.find_one({"nome_torneo": torneo})
-                collection_tornei.delete_one({"nome_torneo": torneo})
-                st.session_state.df_tornei_svizzeri = st.session_state.df_tornei_svizzeri[st.session_state.df_tornei_svizzeri["Torneo"] != torneo].reset_index(drop=True)
-                
-                # Log tournament deletion
-                log.log_action(
-                    username=username,
-                    action="eliminazione_torneo_svizzero",
-                    torneo=torneo,
-                    details={
-                        "tipo_operazione": "eliminazione_torneo_singolo",
-                        "torneo": torneo,
-                        "tornei_eliminati": 1,
-                        "dettagli_torneo": {
-                            "tipo": "svizzero",
-                            "partecipanti": torneo_data.get("partite", []) if torneo_data else []
-                        }
-                    }
-                )
-                st.toast(f"Torneo '{torneo}' eliminato!")
+            riepilogo = elimina_tornei_per_nome(collection_tornei, data)
+            st.session_state.df_tornei_svizzeri = st.session_state.df_tornei_svizzeri[~st.session_state.df_tornei_svizzeri["Torneo"].isin(riepilogo["tornei"])].reset_index(drop=True)
+            
+            # Log tournament deletion (solo nomi e conteggi)
+            log.log_action(
+                username=username,
+                action="eliminazione_torneo_svizzero",
+                torneo=", ".join(riepilogo["tornei"]),
+                details={
+                    "tipo_operazione": "eliminazione_torneo_singolo",
+                    "tipo": "svizzero",
+                    **riepilogo
+                }
+            )
+            st.toast(f"Tornei eliminati: {riepilogo['tornei_eliminati']}")
 
         elif deletion_type == "all_ita":
             db_tornei = client_italiana["TorneiSubbuteo"]
             collection_tornei = db_tornei["Superba"]
-            tornei_da_cancellare = [t["nome_torneo"] for t in collection_tornei.find({}) if "campionato" not in t["nome_torneo"].lower()]
-            
-            # Get count before deletion for logging
-            count_before = collection_tornei.count_documents({})
-            
-            for torneo in tornei_da_cancellare:
-                collection_tornei.delete_one({"nome_torneo": torneo})
-                
-            count_after = collection_tornei.count_documents({})
+            riepilogo = elimina_tornei_non_campionato(collection_tornei)
             st.session_state.df_tornei_italiana = carica_tornei_all_italiana()
             
-            # Log mass deletion
-            if tornei_da_cancellare:
+            # Log mass deletion (solo nomi e conteggi)
+            if riepilogo["tornei_eliminati"]:
                 log.log_action(
                     username=username,
                     action="eliminazione_massiva_tornei_italiani",
                     torneo="tutti_tornei_italiani",
                     details={
                         "tipo_operazione": "eliminazione_massiva_tornei",
-                        "tornei_eliminati": len(tornei_da_cancellare),
-                        "tornei_rimasti": count_after,
                         "esclusi_campionati": True,
-                        "tornei_esclusi": [t for t in collection_tornei.find({}) if "campionato" in t["nome_torneo"].lower()]
+                        **riepilogo
                     }
                 )
             
@@ -1007,29 +1036,19 @@ def process_deletion_with_password(password, deletion_type, data):
         elif deletion_type == "all_svizz":
             db_tornei = client_svizzera["TorneiSubbuteo"]
             collection_tornei = db_tornei["SuperbaSvizzero"]
-            tornei_da_cancellare = [t["nome_torneo"] for t in collection_tornei.find({}) if "campionato" not in t["nome_torneo"].lower()]
-            
-            # Get count before deletion for logging
-            count_before = collection_tornei.count_documents({})
-            
-            for torneo in tornei_da_cancellare:
-                collection_tornei.delete_one({"nome_torneo": torneo})
-                
-            count_after = collection_tornei.count_documents({})
+            riepilogo = elimina_tornei_non_campionato(collection_tornei)
             st.session_state.df_tornei_svizzeri = carica_tornei_svizzeri()
             
-            # Log mass deletion
-            if tornei_da_cancellare:
+            # Log mass deletion (solo nomi e conteggi)
+            if riepilogo["tornei_eliminati"]:
                 log.log_action(
                     username=username,
                     action="eliminazione_massiva_tornei_svizzeri",
                     torneo="tutti_tornei_svizzeri",
                     details={
                         "tipo_operazione": "eliminazione_massiva_tornei",
-                        "tornei_eliminati": len(tornei_da_cancellare),
-                        "tornei_rimasti": count_after,
                         "esclusi_campionati": True,
-                        "tornei_esclusi": [t for t in collection_tornei.find({}) if "campionato" in t["nome_torneo"].lower()]
+                        **riepilogo
                     }
                 )
             
@@ -1039,20 +1058,12 @@ def process_deletion_with_password(password, deletion_type, data):
             # Chiamiamo le funzioni specifiche per applicare il filtro
             db_tornei_ita = client_italiana["TorneiSubbuteo"]
             collection_tornei_ita = db_tornei_ita["Superba"]
-            tornei_prima_ita = list(collection_tornei_ita.find({}))
-            tornei_da_cancellare_ita = [t["nome_torneo"] for t in tornei_prima_ita if "campionato" not in t["nome_torneo"].lower()]
-            
             db_tornei_svizz = client_svizzera["TorneiSubbuteo"]
             collection_tornei_svizz = db_tornei_svizz["SuperbaSvizzero"]
-            tornei_prima_svizz = list(collection_tornei_svizz.find({}))
-            tornei_da_cancellare_svizz = [t["nome_torneo"] for t in tornei_prima_svizz if "campionato" not in t["nome_torneo"].lower()]
-            
-            # Esecuzione delle cancellazioni
-            for torneo in tornei_da_cancellare_ita:
-                collection_tornei_ita.delete_one({"nome_torneo": torneo})
             
-            for torneo in tornei_da_cancellare_svizz:
-                collection_tornei_svizz.delete_one({"nome_torneo": torneo})
+            # Esecuzione delle cancellazioni (un delete_many per collection)
+            riepilogo_ita = elimina_tornei_non_campionato(collection_tornei_ita)
+            riepilogo_svizz = elimina_tornei_non_campionato(collection_tornei_svizz)
             
             # Aggiornamento degli stati
             st.session_state.df_tornei_italiana = carica_tornei_all_italiana()
@@ -1065,13 +1076,13 @@ def process_deletion_with_password(password, deletion_type, data):
                 torneo="tutti_tornei",
                 details={
                     "tipo_operazione": "eliminazione_massiva_tutti_tornei",
-                    "tornei_italiani_eliminati": len(tornei_da_cancellare_ita),
-                    "tornei_svizzeri_eliminati": len(tornei_da_cancellare_svizz),
-                    "tornei_italiani_rimasti": collection_tornei_ita.count_documents({}),
-                    "tornei_svizzeri_rimasti": collection_tornei_svizz.count_documents({}),
+                    "tornei_italiani_eliminati": riepilogo_ita["tornei_eliminati"],
+                    "tornei_svizzeri_eliminati": riepilogo_svizz["tornei_eliminati"],
+                    "tornei_italiani_rimasti": riepilogo_ita["tornei_rimasti"],
+                    "tornei_svizzeri_rimasti": riepilogo_svizz["tornei_rimasti"],
                     "esclusi_campionati": True,
-                    "tornei_esclusi_ita": [t["nome_torneo"] for t in tornei_prima_ita if "campionato" in t["nome_torneo"].lower()],
-                    "tornei_esclusi_svizz": [t["nome_torneo"] for t in tornei_prima_svizz if "campionato" in t["nome_torneo"].lower()]
+                    "tornei_esclusi_ita": riepilogo_ita["tornei_esclusi"],
+                    "tornei_esclusi_svizz": riepilogo_svizz["tornei_esclusi"]
                 }
             )
             
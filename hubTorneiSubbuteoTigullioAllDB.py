@@ -21,8 +21,11 @@ except Exception:
 
 # --- CSS centralizzato ---
 from common.styles import inject_hub_styles
+from common.audio import url_asset
 inject_hub_styles()
 
+MANUALE_HUB = "Manuale_Utente_Super_Suite_Subbuteo.pdf"
+
 if st.session_state.get("authenticated"):
     user = st.session_state.get("user", {})
     st.sidebar.markdown(f"**Connesso come:** {user.get('username', '??')}")
@@ -133,24 +136,13 @@ with col_manual:
         </div>
     ''', unsafe_allow_html=True)
     
-    # Download Button Integrato
-    pdf_url = "https://raw.githubusercontent.com/legnaro72/torneo-Subbuteo-webapp/main/%F0%9F%93%96%20Manuale%20Utente_%20Hub%20tornei%20Subbuteo.pdf"
-    
-    try:
-        import requests, io
-        r = requests.get(pdf_url)
-        r.raise_for_status()
-        pdf_bytes = io.BytesIO(r.content)
-        st.download_button(
-            label="⬇️ SCARICA IL MANUALE IN PDF",
-            data=pdf_bytes,
-            file_name="Manuale_Utente_Super_Suite_Subbuteo.pdf",
-            mime="application/pdf",
-            type="primary",
-            width="stretch"
-        )
-    except Exception as e:
-        st.error(f"⚠️ Impossibile caricare il PDF in questo momento. ({e})")
+    # Il manuale è in static/: lo scarica il browser solo al click, nessun traffico in uscita dal server
+    st.link_button(
+        "⬇️ SCARICA IL MANUALE IN PDF",
+        url_asset(MANUALE_HUB),
+        type="primary",
+        width="stretch"
+    )
 
 # Footer
 st.markdown("""
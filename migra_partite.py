@@ -0,0 +1,89 @@
+"""
+migra_partite.py — Migrazione dei tornei all'italiana nel layout "una partita per documento".
+
+Sposta il calendario incorporato dei tornei indicati (o di tutti quelli con almeno
+--min-partite partite) nella collection <collection>Partite, indicizzata per
+(torneo_id, Girone, Giornata); con --ripristina riporta il calendario nel documento
+torneo. Le app leggono entrambi i layout (common.partite_torneo.completa_calendario),
+quindi i tornei possono essere migrati uno alla volta anche durante l'uso.
+
+Uso:
+    python migra_partite.py [--collection Superba] [--torneo NOME ...] [--min-partite 500]
+                            [--ripristina] [--dry-run]
+
+La stringa di connessione è letta da MONGO_URI_TOURNEMENTS
+(variabile d'ambiente oppure .streamlit/secrets.toml).
+"""
+import argparse
+import os
+import sys
+import tomllib
+
+import certifi
+from pymongo import MongoClient
+
+from common.partite_torneo import CAMPO_LAYOUT, LAYOUT_PARTITE, migra_torneo, ripristina_torneo
+
+DB_TORNEI = "TorneiSubbuteo"
+
+
+def _leggi_uri() -> str:
+    """MONGO_URI_TOURNEMENTS da ambiente o da .streamlit/secrets.toml."""
+    if os.getenv("MONGO_URI_TOURNEMENTS"):
+        return os.getenv("MONGO_URI_TOURNEMENTS")
+    percorso = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    if os.path.exists(percorso):
+        with open(percorso, "rb") as f:
+            segreti = tomllib.load(f)
+        if segreti.get("MONGO_URI_TOURNEMENTS"):
+            return segreti["MONGO_URI_TOURNEMENTS"]
+    sys.exit("❌ MONGO_URI_TOURNEMENTS non configurata")
+
+
+def tornei_da_migrare(collection, nomi: list, min_partite: int, ripristina: bool) -> list:
+    """(_id, nome_torneo, numero partite) dei tornei selezionati, senza leggere i calendari."""
+    filtro = {CAMPO_LAYOUT: LAYOUT_PARTITE} if ripristina else {CAMPO_LAYOUT: {"$ne": LAYOUT_PARTITE},
+                                                                  "calendario": {"$type": "array"}}
+    if nomi:
+        filtro["nome_torneo"] = {"$in": nomi}
+    pipeline = [
+        {"$match": filtro},
+        {"$project": {"nome_torneo": 1, "partite": {"$size": {"$ifNull": ["$calendario", []]}}}},
+    ]
+    if not ripristina and not nomi:
+        pipeline.append({"$match": {"partite": {"$gte": min_partite}}})
+    return [(d["_id"], d.get("nome_torneo"), d["partite"]) for d in collection.aggregate(pipeline)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra i calendari dei tornei nella collection delle partite.")
+    parser.add_argument("--collection", default="Superba", help="Collection dei tornei del club")
+    parser.add_argument("--torneo", action="append", default=[], help="Nome del torneo (ripetibile)")
+    parser.add_argument("--min-partite", type=int, default=500,
+                        help="Senza --torneo: migra i tornei con almeno queste partite")
+    parser.add_argument("--ripristina", action="store_true", help="Riporta il calendario nel documento torneo")
+    parser.add_argument("--dry-run", action="store_true", help="Mostra i tornei selezionati senza modificarli")
+    args = parser.parse_args()
+
+    collection = MongoClient(_leggi_uri(), tlsCAFile=certifi.where())[DB_TORNEI][args.collection]
+    tornei = tornei_da_migrare(collection, args.torneo, args.min_partite, args.ripristina)
+    operazione = "Ripristino" if args.ripristina else "Migrazione"
+    print(f"[MIGRA PARTITE] {operazione}: {len(tornei)} tornei selezionati in {args.collection}")
+
+    falliti = 0
+    for torneo_id, nome, partite in tornei:
+        if args.dry_run:
+            print(f"  {nome} ({torneo_id})" + ("" if args.ripristina else f": {partite} partite"))
+            continue
+        esito = ripristina_torneo(collection, torneo_id) if args.ripristina else migra_torneo(collection, torneo_id)
+        if esito < 0:
+            falliti += 1
+            print(f"  ⚠️ {nome}: modificato o già elaborato durante l'operazione, riprovare")
+        else:
+            print(f"  ✅ {nome}: {esito} partite")
+    if falliti:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
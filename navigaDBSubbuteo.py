@@ -1,8 +1,12 @@
 import os
-from pymongo import MongoClient
+import csv
+import tempfile
+import time
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from bson import ObjectId
 import streamlit as st
 import pandas as pd
+import numpy as np
 from logging_utils import log_action # Assumendo che esista
 from datetime import datetime
 
@@ -11,6 +15,7 @@ from datetime import datetime
 # Importa il modulo di autenticazione centralizzato
 import auth_utils as auth
 from auth_utils import verify_write_access, get_current_user # Import utili
+from common.eliminazione_tornei import elimina_tornei
 
 # Configurazione della pagina di Streamlit
 st.set_page_config(
@@ -49,9 +54,23 @@ EMOJI_MAP = {
     "success": "✅",
     "info": "💡",
     "warning": "🚨",
-    "save_table": "⬆️ Salva modifiche tabella" 
+    "save_table": "⬆️ Salva modifiche tabella",
+    "prev_page": "⬅️ Pagina precedente",
+    "next_page": "Pagina successiva ➡️",
+    "export_csv": "📥 Prepara export CSV",
+    "download_csv": "💾 Scarica CSV"
 }
 
+# Paginazione lato server (keyset): dimensioni pagina disponibili e tetto del conteggio stimato
+PAGE_SIZES = [50, 100, 250, 500]
+COUNT_LIMIT = 10000
+EXPORT_BATCH_SIZE = 1000
+# st.download_button tiene in memoria l'intero file: l'export è limitato a EXPORT_MAX_BYTES
+EXPORT_MAX_BYTES = 50 * 1024 * 1024
+# File di export in una cartella dedicata; quelli più vecchi di EXPORT_TTL (sessioni chiuse) vengono rimossi
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "navigaDBSubbuteo_export")
+EXPORT_TTL = 3600
+
 # --- Connessione a MongoDB ---
 def get_mongo_client():
     MONGO_URI = os.getenv(
@@ -104,6 +123,167 @@ def get_databases_and_collections():
         databases[db_name] = collections
     return databases
 
+# --- Paginazione keyset ---
+def get_sort_spec(selected_db, collection_name):
+    """
+    Ordinamento usato per la paginazione: i log dal più recente (timestamp, poi _id),
+    tutte le altre collection per _id crescente.
+    """
+    if selected_db == "Log":
+        return [("timestamp", DESCENDING), ("_id", DESCENDING)]
+    return [("_id", ASCENDING)]
+
+
+def keyset_filter(sort_spec, last_key):
+    """
+    Costruisce il filtro "dopo l'ultimo documento visto" per l'ordinamento dato.
+
+    Args:
+        sort_spec: Lista [(campo, verso)] con _id come ultimo criterio.
+        last_key: Tupla dei valori dei campi di ordinamento dell'ultimo documento della pagina precedente.
+
+    Returns:
+        Filtro MongoDB, oppure {} per la prima pagina.
+    """
+    if last_key is None:
+        return {}
+    op = lambda verso: "$gt" if verso == ASCENDING else "$lt"
+    if len(sort_spec) == 1:
+        campo, verso = sort_spec[0]
+        return {campo: {op(verso): last_key[0]}}
+
+    (campo, verso), (_, verso_id) = sort_spec
+    valore, last_id = last_key
+    if valore is None:
+        # I documenti senza timestamp sono in coda (ordinamento decrescente): si prosegue solo su _id
+        return {campo: None, "_id": {op(verso_id): last_id}}
+    condizioni = [
+        {campo: {op(verso): valore}},
+        {campo: valore, "_id": {op(verso_id): last_id}},
+    ]
+    if verso == DESCENDING:
+        condizioni.append({campo: None})
+    return {"$or": condizioni}
+
+
+def fetch_page(collection, query, projection, sort_spec, last_key, page_size):
+    """
+    Legge una pagina di documenti con limit/sort lato server.
+
+    Returns:
+        Tupla (docs, has_next): i documenti della pagina e se esiste una pagina successiva.
+    """
+    filtro = keyset_filter(sort_spec, last_key)
+    if query and filtro:
+        filtro = {"$and": [query, filtro]}
+    elif query:
+        filtro = query
+    cursor = collection.find(filtro, projection).sort(sort_spec).limit(page_size + 1)
+    docs = list(cursor)
+    return docs[:page_size], len(docs) > page_size
+
+
+def estimate_count(collection, query):
+    """
+    Conteggio rapido: metadati della collection senza filtri, altrimenti
+    count_documents con un tetto (COUNT_LIMIT) per non scandire tutta la collection.
+
+    Returns:
+        Tupla (conteggio, troncato).
+    """
+    try:
+        if not query:
+            return collection.estimated_document_count(), False
+        n = collection.count_documents(query, limit=COUNT_LIMIT + 1, maxTimeMS=2000)
+        return min(n, COUNT_LIMIT), n > COUNT_LIMIT
+    except Exception:
+        return None, False
+
+
+def pulisci_export_scaduti(ttl=EXPORT_TTL):
+    """Rimuove i file di export più vecchi di `ttl` secondi (sessioni chiuse senza pulizia)."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    limite = time.time() - ttl
+    for nome in os.listdir(EXPORT_DIR):
+        percorso = os.path.join(EXPORT_DIR, nome)
+        try:
+            if os.path.getmtime(percorso) < limite:
+                os.unlink(percorso)
+        except OSError:
+            pass
+
+
+def export_csv_from_cursor(collection, query, projection, sort_spec, fields, max_bytes=EXPORT_MAX_BYTES):
+    """
+    Esporta in CSV i documenti del filtro leggendo il cursore a blocchi
+    e scrivendo su file temporaneo (memoria costante durante la lettura).
+
+    Il file si ferma a circa `max_bytes` (controllo ogni EXPORT_BATCH_SIZE righe): il download (st.download_button) lo carica
+    interamente in memoria, quindi la dimensione va limitata.
+
+    Returns:
+        Tupla (percorso del file CSV generato, troncato).
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    cursor = collection.find(query, projection).sort(sort_spec).batch_size(EXPORT_BATCH_SIZE)
+    troncato = False
+    with tempfile.NamedTemporaryFile("w", newline="", suffix=".csv", delete=False, encoding="utf-8",
+                                     dir=EXPORT_DIR) as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for i, doc in enumerate(cursor):
+            # Dimensione controllata a ogni blocco (tell() su file di testo svuota il buffer)
+            if i % EXPORT_BATCH_SIZE == 0 and f.tell() >= max_bytes:
+                troncato = True
+                break
+            writer.writerow({k: str(v) if v is not None else "" for k, v in doc.items()})
+    cursor.close()
+    return f.name, troncato
+
+
+# --- Diff della tabella editabile ---
+def _to_mongo_value(value):
+    """Converte scalari numpy/pandas in tipi Python serializzabili in BSON (NaN -> None)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def diff_dataframes(original_df, edited_df, id_col="_id_orig"):
+    """
+    Calcola in modo vettoriale l'insieme minimo di modifiche tra tabella originale ed editata.
+
+    Il confronto avviene sulla rappresentazione stringa (come il confronto storico cella per cella),
+    allineando le righe per id e non per posizione.
+
+    Returns:
+        Dizionario {id: {campo: nuovo_valore}} con i soli documenti e campi cambiati.
+    """
+    columns = [c for c in edited_df.columns if c != id_col and c in original_df.columns]
+    if edited_df.empty or not columns:
+        return {}
+    original = original_df.set_index(id_col)[columns]
+    edited = edited_df.set_index(id_col)[columns]
+    original = original.reindex(edited.index)
+
+    changed = original.astype(str).ne(edited.astype(str))
+    changed_cells = changed.stack()
+    changed_cells = changed_cells[changed_cells]
+    if changed_cells.empty:
+        return {}
+
+    changes = {}
+    for (doc_id, field) in changed_cells.index:
+        changes.setdefault(doc_id, {})[field] = _to_mongo_value(edited.at[doc_id, field])
+    return changes
+
+
 # --- Interfaccia CRUD ---
 def crud_interface(selected_db, collection_name):
     db_emoji = EMOJI_MAP.get(selected_db, "")
@@ -181,8 +361,74 @@ def crud_interface(selected_db, collection_name):
                     # Se c'è un errore, forziamo una query vuota per non mostrare dati non filtrati
                     query = {"error": True} 
 
-    # Recupera documenti con filtri (il resto dello script continua da qui)
-    docs = list(collection.find(query))
+    # --- Proiezione colonne e paginazione lato server ---
+    sample_doc = collection.find_one(query) if query else collection.find_one()
+    all_fields = [f for f in (sample_doc or {}).keys() if f != "_id"]
+    sort_spec = get_sort_spec(selected_db, collection_name)
+    col_fields, col_size = st.columns([3, 1])
+    with col_fields:
+        selected_fields = st.multiselect(
+            "Colonne da caricare (vuoto = tutte)",
+            options=all_fields,
+            key=f"projection_{selected_db}_{collection_name}"
+        )
+    with col_size:
+        page_size = st.selectbox("Record per pagina", PAGE_SIZES, key=f"page_size_{selected_db}_{collection_name}")
+    projection = None
+    if selected_fields:
+        projection = {f: 1 for f in selected_fields}
+        for campo, _ in sort_spec:
+            projection[campo] = 1
+
+    # Stato della paginazione: pila delle chiavi di inizio pagina, azzerata se cambiano filtri/colonne/dimensione
+    paging_key = f"paging_{selected_db}_{collection_name}"
+    paging_signature = repr((query, selected_fields, page_size))
+    paging = st.session_state.get(paging_key)
+    if not paging or paging.get("signature") != paging_signature:
+        paging = {"signature": paging_signature, "stack": [None]}
+        st.session_state[paging_key] = paging
+
+    docs, has_next = fetch_page(collection, query, projection, sort_spec, paging["stack"][-1], page_size)
+
+    count, truncated = estimate_count(collection, query)
+    page_number = len(paging["stack"])
+    if count is not None:
+        st.caption(f"Pagina {page_number} · circa {count}{'+' if truncated else ''} record totali")
+    else:
+        st.caption(f"Pagina {page_number}")
+
+    col_prev, col_next, col_export = st.columns(3)
+    with col_prev:
+        if st.button(EMOJI_MAP['prev_page'], key=f"prev_{paging_key}", disabled=page_number == 1):
+            paging["stack"].pop()
+            st.rerun()
+    with col_next:
+        if st.button(EMOJI_MAP['next_page'], key=f"next_{paging_key}", disabled=not has_next):
+            last = docs[-1]
+            paging["stack"].append(tuple(last.get(campo) for campo, _ in sort_spec))
+            st.rerun()
+    with col_export:
+        if st.button(EMOJI_MAP['export_csv'], key=f"export_{paging_key}"):
+            fields = ["_id"] + (selected_fields or all_fields)
+            old_path = st.session_state.get(f"export_path_{paging_key}")
+            if old_path and os.path.exists(old_path):
+                os.unlink(old_path)
+            pulisci_export_scaduti()
+            export_path, troncato = export_csv_from_cursor(collection, query, projection, sort_spec, fields)
+            st.session_state[f"export_path_{paging_key}"] = export_path
+            if troncato:
+                st.warning(f"⚠️ Export limitato a {EXPORT_MAX_BYTES // (1024 * 1024)} MB: "
+                           "restringi il filtro per esportare tutti i record.")
+        export_path = st.session_state.get(f"export_path_{paging_key}")
+        if export_path and os.path.exists(export_path):
+            with open(export_path, "rb") as f:
+                st.download_button(
+                    EMOJI_MAP['download_csv'],
+                    data=f,
+                    file_name=f"{selected_db}_{collection_name}.csv",
+                    mime="text/csv",
+                    key=f"download_{paging_key}"
+                )
 
 
     # Elenco record
@@ -218,36 +464,23 @@ def crud_interface(selected_db, collection_name):
             # Logica di salvataggio
             if st.button(EMOJI_MAP['save_table'], key=f"save_table_changes_{collection_name}"):
                 
+                # Change-set minimo (solo documenti e campi modificati) applicato con un'unica bulk_write
+                changes_by_id = diff_dataframes(df, edited_df, id_col='_id_orig')
                 updates_count = 0
-                for index, row in edited_df.iterrows():
-                    original_doc_id_str = row['_id_orig']
-                    # Recupera la riga originale dal DF iniziale (più efficiente che query su mongo)
-                    original_row = df[df['_id_orig'] == original_doc_id_str].iloc[0]
+                if changes_by_id:
+                    operations = [
+                        UpdateOne({"_id": ObjectId(doc_id)}, {"$set": changes})
+                        for doc_id, changes in changes_by_id.items()
+                    ]
+                    collection.bulk_write(operations, ordered=False)
+                    updates_count = len(operations)
                     
-                    changes = {}
-                    for col in edited_df.columns:
-                        if col != '_id_orig':
-                            new_value = row[col]
-                            original_value = original_row[col]
-                            
-                            # Confronta i valori (converte a stringa per confronto robusto)
-                            if str(new_value) != str(original_value):
-                                changes[col] = new_value
-
-                    if changes:
-                        object_id = ObjectId(original_doc_id_str)
-                        collection.update_one(
-                            {"_id": object_id},
-                            {"$set": changes}
-                        )
-                        updates_count += 1
-                        
-                        log_action(
-                            username=st.session_state.get('user', 'unknown'),
-                            action='table_record_updated',
-                            torneo=f"{selected_db}.{collection_name}",
-                            details={'record_id': original_doc_id_str, 'updates': changes}
-                        )
+                    log_action(
+                        username=st.session_state.get('user', 'unknown'),
+                        action='table_records_updated',
+                        torneo=f"{selected_db}.{collection_name}",
+                        details={'updated_count': updates_count, 'updates': changes_by_id}
+                    )
                 
                 if updates_count > 0:
                     st.success(f"{EMOJI_MAP['success']} Aggiornati {updates_count} record con successo!")
@@ -350,12 +583,13 @@ def crud_interface(selected_db, collection_name):
 
                 with col2:
                     if st.form_submit_button(f"{EMOJI_MAP['delete_record']}"):
-                        collection.delete_one({"_id": ObjectId(selected_id)})
+                        # Elimina anche le partite se il record è un torneo migrato (migra_partite.py)
+                        riepilogo = elimina_tornei(collection, {"_id": ObjectId(selected_id)})
                         log_action(
                             username=st.session_state.get('user', 'unknown'),
                             action='record_deleted',
                             torneo=f"{selected_db}.{collection_name}",
-                            details={'record_id': selected_id}
+                            details={'record_id': selected_id, 'partite_eliminate': riepilogo['partite_eliminate']}
                         )
                         st.success(f"{EMOJI_MAP['success']} Record eliminato con successo!")
                         st.rerun()
@@ -460,12 +694,14 @@ if __name__ == "__main__":
             db = client[selected_db]
             collection = db[collection_name]
             query = {tournament_field: {"$not": {"$regex": "CAMPIONATO", "$options": "i"}}}
-            deleted_count = collection.delete_many(query).deleted_count
+            riepilogo = elimina_tornei(collection, query)
+            deleted_count = riepilogo['tornei_eliminati']
             log_action(
                 username=st.session_state.get('user', 'unknown'),
                 action='bulk_delete_tournaments',
                 torneo=f"{selected_db}.{collection_name}",
-                details={'deleted_count': deleted_count, 'kept_with': 'CAMPIONATO'}
+                details={'deleted_count': deleted_count, 'partite_eliminate': riepilogo['partite_eliminate'],
+                         'kept_with': 'CAMPIONATO'}
             )
             st.sidebar.success(f"{EMOJI_MAP['success']} Cancellati {deleted_count} record.")
             st.rerun()
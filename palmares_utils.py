@@ -24,9 +24,140 @@ def already_registered(lista, tournament_name: str) -> bool:
             return True
     return False
 
+# Campo con le chiavi normalizzate "<listaCampo>:<nome torneo minuscolo>" già registrate:
+# permette la deduplica lato server con $addToSet invece del confronto in Python.
+CAMPO_CHIAVI = "chiaviPalmares"
+
+PLAYERS_DB = "giocatori_subbuteo"
+PLAYERS_COLLECTIONS = {
+    "Superba": "superba_players",
+    "PierCrew": "piercrew_players",
+    "Tigullio": "tigullio_players",
+}
+
+
+@st.cache_resource
+def _get_players_client(uri: str):
+    """Client MongoDB condiviso (cached) per il palmarès."""
+    from pymongo import MongoClient
+    import certifi
+    return MongoClient(uri, tlsCAFile=certifi.where())
+
+
+def get_players_collection(club: str):
+    """Ritorna la collection dei giocatori del club (es. "PierCrew") usando il client cached."""
+    return _get_players_client(st.secrets["MONGO_URI"])[PLAYERS_DB][PLAYERS_COLLECTIONS[club]]
+
+
+def estrai_giocatore(winner_name: str) -> str:
+    """Estrae il nome giocatore da una stringa "Squadra - Giocatore"."""
+    real_winner = winner_name
+    if " - " in winner_name:
+        real_winner = winner_name.split(" - ")[-1].strip()
+    return real_winner
+
+
+def campi_trofeo(tournament_name: str, tournament_type: str, num_gironi: int = 1, mode_fasi_finali: str = None):
+    """
+    Ritorna la coppia (campo lista, campo contatore) del trofeo da assegnare, oppure None.
+    """
+    t_name_lower = tournament_name.lower()
+
+    if "eliminazionediretta" in t_name_lower or mode_fasi_finali == "eliminazione_diretta":
+        return "listaFFElimDirettaVinte", "NFFElimDirettaVinte"
+    if "fasefinaleagironi" in t_name_lower or mode_fasi_finali == "gironi":
+        return "listaGironiFFVinti", "NGironiFFVinti"
+    if tournament_type == "svizzero":
+        # Lo svizzero viene considerato CAMPIONATO come da richiesta esplicita
+        return "listaCampionatiVinti", "NCampionatiVinti"
+    if tournament_type == "italiana":
+        # Per l'italiana, si vince il campionato solo se è un girone unico (Campionato)
+        # Se ci sono più gironi, è una fase preliminare (Fase a Gironi)
+        if num_gironi == 1:
+            return "listaCampionatiVinti", "NCampionatiVinti"
+        return "listaGironiFFVinti", "NGironiFFVinti"
+    if tournament_type == "fasi_finali":
+        # Fallback
+        return "listaGironiFFVinti", "NGironiFFVinti"
+    return None
+
+
+def register_wins(batch, db_players_col) -> int:
+    """
+    Registra in blocco le vittorie nel palmarès dei giocatori del club.
+
+    Una sola query per tutti i vincitori, deduplica sul nome normalizzato tramite
+    $addToSet su CAMPO_CHIAVI (con filtro $ne, così $inc avviene una sola volta)
+    e una sola bulk_write.
+
+    :param batch: lista di dict con chiavi winner_name, tournament_name, tournament_type
+                  e opzionali num_gironi, mode_fasi_finali (stessi significati di register_win)
+    :param db_players_col: collection dei giocatori del club (es. get_players_collection("PierCrew"))
+    :return: numero di documenti giocatore aggiornati
+    """
+    from pymongo import UpdateOne
+
+    try:
+        vittorie = []
+        for voce in batch:
+            campi = campi_trofeo(
+                voce["tournament_name"], voce["tournament_type"],
+                voce.get("num_gironi", 1), voce.get("mode_fasi_finali")
+            )
+            if campi:
+                vittorie.append((estrai_giocatore(voce["winner_name"]), normalize_tournament_name(voce["tournament_name"]), campi))
+        if not vittorie:
+            return 0
+
+        # Ricerca robusta: per nome giocatore OPPURE per squadra, una query per tutto il batch
+        nomi = list({v[0] for v in vittorie})
+        proiezione = {"Giocatore": 1, "Squadra": 1, CAMPO_CHIAVI: 1,
+                      "listaCampionatiVinti": 1, "listaGironiFFVinti": 1, "listaFFElimDirettaVinte": 1}
+        per_giocatore, per_squadra = {}, {}
+        for player in db_players_col.find({"$or": [{"Giocatore": {"$in": nomi}}, {"Squadra": {"$in": nomi}}]}, proiezione):
+            per_giocatore.setdefault(player.get("Giocatore"), player)
+            per_squadra.setdefault(player.get("Squadra"), player)
+
+        operazioni = []
+        chiavi_viste = set()
+        for real_winner, name_to_save, (list_field, count_field) in vittorie:
+            player = per_giocatore.get(real_winner) or per_squadra.get(real_winner)
+            # Se il giocatore non esiste nel DB, SKIP
+            if not player:
+                print(f"[PALMARES] Vincitore '{real_winner}' non trovato nel DB (Ospite?). Skip.")
+                continue
+
+            chiave = f"{list_field}:{name_to_save.lower()}"
+            if (player["_id"], chiave) in chiavi_viste:
+                continue
+            chiavi_viste.add((player["_id"], chiave))
+
+            lista_attuale = player.get(list_field, [])
+            if isinstance(lista_attuale, list) and already_registered(lista_attuale, name_to_save):
+                # Vittoria registrata prima dell'introduzione delle chiavi: allinea solo la chiave
+                operazioni.append(UpdateOne({"_id": player["_id"]}, {"$addToSet": {CAMPO_CHIAVI: chiave}}))
+                continue
+
+            operazioni.append(UpdateOne(
+                {"_id": player["_id"], CAMPO_CHIAVI: {"$ne": chiave}},
+                {"$addToSet": {CAMPO_CHIAVI: chiave, list_field: name_to_save}, "$inc": {count_field: 1}}
+            ))
+
+        if not operazioni:
+            return 0
+        risultato = db_players_col.bulk_write(operazioni, ordered=False)
+        print(f"[PALMARES] Aggiornati {risultato.modified_count} giocatori")
+        return risultato.modified_count
+
+    except Exception as e:
+        print(f"[PALMARES ERROR] {e}")
+        return 0
+
+
 def register_win(db_players_col, winner_name: str, tournament_name: str, tournament_type: str, num_gironi: int = 1, mode_fasi_finali: str = None):
     """
-    Registra la vittoria nel palmarès del giocatore (solo per Superba_players).
+    Registra la vittoria nel palmarès del giocatore.
+    Wrapper di register_wins per un singolo vincitore.
     
     :param db_players_col: La collection MongoDB (es. Superba_players)
     :param winner_name: Il nome del giocatore o stringa "Squadra - Giocatore"
@@ -35,78 +166,10 @@ def register_win(db_players_col, winner_name: str, tournament_name: str, tournam
     :param num_gironi: numero di gironi totali (se type == 'italiana', aggiorna campionati solo se == 1)
     :param mode_fasi_finali: 'eliminazione_diretta' o 'gironi' (se type == 'fasi_finali')
     """
-    try:
-        # Estrazione pulita del nome giocatore se nel formato "Squadra - Giocatore"
-        real_winner = winner_name
-        if " - " in winner_name:
-            real_winner = winner_name.split(" - ")[-1].strip()
-        
-        # Ricerca robusta: prova per nome giocatore OPPURE per squadra
-        player = db_players_col.find_one({
-            "$or": [
-                {"Giocatore": real_winner},
-                {"Squadra": real_winner}
-            ]
-        })
-        
-        # Se il giocatore non esiste nel DB, SKIP
-        if not player:
-            print(f"[PALMARES] Vincitore '{real_winner}' non trovato nel DB (Ospite?). Skip.")
-            return
-
-        name_to_save = normalize_tournament_name(tournament_name)
-        updates = {}
-        
-        # Helper interno per gestire liste e contatori senza duplicati
-        def add_to_list(list_field, count_field):
-            current_list = player.get(list_field, [])
-            if not isinstance(current_list, list):
-                current_list = []
-            
-            if not already_registered(current_list, name_to_save):
-                current_list.append(name_to_save)
-                current_count = int(player.get(count_field, 0)) + 1
-                updates[list_field] = current_list
-                updates[count_field] = current_count
-                return True
-            return False
-
-        # LOGICA DI ASSEGNAZIONE
-        t_name_lower = tournament_name.lower()
-        
-        if "eliminazionediretta" in t_name_lower or mode_fasi_finali == "eliminazione_diretta":
-            add_to_list("listaFFElimDirettaVinte", "NFFElimDirettaVinte")
-        
-        elif "fasefinaleagironi" in t_name_lower or mode_fasi_finali == "gironi":
-            add_to_list("listaGironiFFVinti", "NGironiFFVinti")
-            
-        elif tournament_type == "svizzero":
-            # Lo svizzero viene considerato CAMPIONATO come da richiesta esplicita
-            add_to_list("listaCampionatiVinti", "NCampionatiVinti")
-            
-        elif tournament_type == "italiana":
-            # Per l'italiana, si vince il campionato solo se è un girone unico (Campionato)
-            # Se ci sono più gironi, è una fase preliminare (Fase a Gironi)
-            if num_gironi == 1:
-                add_to_list("listaCampionatiVinti", "NCampionatiVinti")
-            else:
-                add_to_list("listaGironiFFVinti", "NGironiFFVinti")
-        
-        else:
-            # Fallback
-            if tournament_type == "fasi_finali":
-                add_to_list("listaGironiFFVinti", "NGironiFFVinti")
-
-        # Se c'è stato un aggiornamento, salva nel DB
-        if updates:
-            db_players_col.update_one(
-                {"_id": player["_id"]},
-                {"$set": updates}
-            )
-            print(f"[PALMARES] Aggiornato {real_winner} con: {updates}")
-            return True
-        return False
-        
-    except Exception as e:
-        print(f"[PALMARES ERROR] {e}")
-        return False
+    return register_wins([{
+        "winner_name": winner_name,
+        "tournament_name": tournament_name,
+        "tournament_type": tournament_type,
+        "num_gironi": num_gironi,
+        "mode_fasi_finali": mode_fasi_finali,
+    }], db_players_col=db_players_col) > 0
@@ -0,0 +1,235 @@
+"""
+ricostruisci_palmares.py — Ricostruzione offline del palmarès dei giocatori di un club.
+
+Scansiona tutti i tornei conclusi (Italiana "completato_*", fasi finali KO "finito_*",
+Svizzero con torneo_finito) leggendo solo i campi necessari, calcola i vincitori
+con il kernel di classifica condiviso in processi paralleli e riscrive i campi
+trofeo di tutti i giocatori con un'unica bulk_write.
+
+Il club (--club) seleziona le collection: tornei all'italiana e fasi finali in <club>,
+svizzeri in <club>Svizzero, giocatori in PLAYERS_COLLECTIONS[<club>].
+
+Uso:
+    python ricostruisci_palmares.py [--club Superba|PierCrew|Tigullio] [--workers N] [--dry-run]
+
+Le stringhe di connessione sono lette da MONGO_URI / MONGO_URI_TOURNEMENTS
+(variabili d'ambiente oppure .streamlit/secrets.toml).
+"""
+import argparse
+import os
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pymongo import MongoClient, UpdateOne
+import certifi
+
+from common.classifica import calcola_classifica
+from common.partite_torneo import CAMPO_LAYOUT, completa_calendario
+from common.tabellone import tabellone_da_calendario
+from palmares_utils import (
+    CAMPO_CHIAVI, PLAYERS_DB, PLAYERS_COLLECTIONS,
+    campi_trofeo, estrai_giocatore, normalize_tournament_name,
+)
+
+DB_TORNEI = "TorneiSubbuteo"
+SUFFISSO_SVIZZERO = "Svizzero"
+GIRONE_KO = "Eliminazione Diretta"
+
+CAMPI_LISTA = {
+    "listaCampionatiVinti": "NCampionatiVinti",
+    "listaGironiFFVinti": "NGironiFFVinti",
+    "listaFFElimDirettaVinte": "NFFElimDirettaVinte",
+}
+
+PROIEZIONE_ITALIANA = {"nome_torneo": 1, "calendario": 1, "tabellone_ko": 1, CAMPO_LAYOUT: 1}
+PROIEZIONE_SVIZZERO = {"nome_torneo": 1, "df_torneo": 1, "df_squadre": 1, "torneo_finito": 1}
+
+
+def _leggi_segreti() -> dict:
+    """Legge MONGO_URI / MONGO_URI_TOURNEMENTS da ambiente o da .streamlit/secrets.toml."""
+    segreti = {}
+    percorso = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+    if os.path.exists(percorso):
+        with open(percorso, "rb") as f:
+            segreti = tomllib.load(f)
+    for chiave in ("MONGO_URI", "MONGO_URI_TOURNEMENTS"):
+        if os.getenv(chiave):
+            segreti[chiave] = os.getenv(chiave)
+    return segreti
+
+
+def _giocatore_italiana(vincitore: str) -> str:
+    """Come parse_team_player dell'app Italiana: 'Squadra-Giocatore' -> 'Giocatore'."""
+    if isinstance(vincitore, str) and "-" in vincitore:
+        return vincitore.split("-", 1)[1].strip() or vincitore
+    return vincitore
+
+
+def vincitori_italiana(doc: dict) -> list:
+    """Vincitori di girone di un torneo all'italiana concluso."""
+    df = pd.DataFrame(doc.get("calendario") or [])
+    if df.empty or "Girone" not in df.columns:
+        return []
+    df = df[df["Girone"] != GIRONE_KO]
+    classifica = calcola_classifica(df, gruppo="Girone", col_valida="Valida", spareggi=("Punti", "DR"))
+    if classifica.empty:
+        return []
+    num_gironi = len(df["Girone"].unique())
+    primi = classifica.groupby("Girone", sort=False).head(1)
+    return [
+        {"winner_name": _giocatore_italiana(sq), "tournament_name": doc["nome_torneo"],
+         "tournament_type": "italiana", "num_gironi": num_gironi}
+        for sq in primi["Squadra"]
+    ]
+
+
+def vincitore_ko(doc: dict) -> list:
+    """Vincitore della finale di una fase finale a eliminazione diretta."""
+    tabellone = doc.get("tabellone_ko")
+    if not tabellone:
+        df = pd.DataFrame(doc.get("calendario") or [])
+        if df.empty or "Girone" not in df.columns:
+            return []
+        tabellone = tabellone_da_calendario(df[df["Girone"] == GIRONE_KO])
+    if not tabellone or not tabellone.get("rounds"):
+        return []
+    finale = tabellone["rounds"][-1]["slots"]
+    vincitore = finale[0].get("Vincitore") if len(finale) == 1 else None
+    if not vincitore:
+        return []
+    return [{"winner_name": vincitore, "tournament_name": doc["nome_torneo"],
+             "tournament_type": "fasi_finali", "mode_fasi_finali": "eliminazione_diretta"}]
+
+
+def vincitore_svizzero(doc: dict) -> list:
+    """Primo classificato di un torneo svizzero concluso (regole di spareggio dello Svizzero)."""
+    df = pd.DataFrame(doc.get("df_torneo") or [])
+    classifica = calcola_classifica(
+        df, col_valida="Validata",
+        spareggi=("Punti", "scontri_diretti", "DR", "GF", "Squadra_ci"),
+        bye="RIPOSA", includi_non_giocate=True,
+    )
+    if classifica.empty:
+        return []
+    vincitore = classifica.iloc[0]["Squadra"]
+    giocatore = vincitore
+    squadre = pd.DataFrame(doc.get("df_squadre") or [])
+    if not squadre.empty and {"Squadra", "Giocatore"}.issubset(squadre.columns):
+        match = squadre[squadre["Squadra"] == vincitore]
+        if not match.empty:
+            giocatore = match.iloc[0]["Giocatore"]
+    elif "-" in vincitore:
+        giocatore = vincitore.split("-", 1)[1].strip()
+    return [{"winner_name": giocatore, "tournament_name": doc["nome_torneo"], "tournament_type": "svizzero"}]
+
+
+def vincitori_documento(item) -> list:
+    """Worker: (tipo, documento) -> lista di vittorie nel formato di register_wins."""
+    tipo, doc = item
+    try:
+        if tipo == "italiana":
+            return vincitori_italiana(doc)
+        if tipo == "ko":
+            return vincitore_ko(doc)
+        return vincitore_svizzero(doc)
+    except Exception as e:
+        print(f"[PALMARES REBUILD] Errore su '{doc.get('nome_torneo')}': {e}")
+        return []
+
+
+def documenti_conclusi(client_tornei, client_svizzero, club: str):
+    """Genera (tipo, documento) per tutti i tornei conclusi del club, con query proiettate."""
+    italiana = client_tornei[DB_TORNEI][club]
+    for doc in italiana.find({"nome_torneo": {"$regex": "^completato_"}}, PROIEZIONE_ITALIANA):
+        yield "italiana", completa_calendario(italiana, doc)
+    for doc in italiana.find({"nome_torneo": {"$regex": "^finito_"}}, PROIEZIONE_ITALIANA):
+        yield "ko", completa_calendario(italiana, doc)
+    svizzero = client_svizzero[DB_TORNEI][club + SUFFISSO_SVIZZERO]
+    filtro = {"$or": [{"torneo_finito": True}, {"nome_torneo": {"$regex": "^finito_"}}]}
+    for doc in svizzero.find(filtro, PROIEZIONE_SVIZZERO):
+        yield "svizzero", doc
+
+
+def calcola_palmares(vittorie: list, giocatori: list) -> dict:
+    """
+    Aggrega le vittorie per giocatore (deduplica sul nome torneo normalizzato).
+
+    Returns:
+        {_id giocatore: {campo lista: [...], campo contatore: n, CAMPO_CHIAVI: [...]}}
+    """
+    per_giocatore, per_squadra = {}, {}
+    for p in giocatori:
+        per_giocatore.setdefault(p.get("Giocatore"), p)
+        per_squadra.setdefault(p.get("Squadra"), p)
+
+    palmares = {p["_id"]: {campo: [] for campo in CAMPI_LISTA} for p in giocatori}
+    chiavi = {p["_id"]: [] for p in giocatori}
+    for v in vittorie:
+        campi = campi_trofeo(v["tournament_name"], v["tournament_type"],
+                             v.get("num_gironi", 1), v.get("mode_fasi_finali"))
+        nome = estrai_giocatore(v["winner_name"])
+        player = per_giocatore.get(nome) or per_squadra.get(nome)
+        if not player:
+            # Formato "Squadra-Giocatore" (calendari Italiana e tabellone KO)
+            nome = _giocatore_italiana(nome)
+            player = per_giocatore.get(nome) or per_squadra.get(nome)
+        if not campi or not player:
+            continue
+        lista_campo = campi[0]
+        nome_torneo = normalize_tournament_name(v["tournament_name"])
+        chiave = f"{lista_campo}:{nome_torneo.lower()}"
+        if chiave in chiavi[player["_id"]]:
+            continue
+        chiavi[player["_id"]].append(chiave)
+        palmares[player["_id"]][lista_campo].append(nome_torneo)
+
+    risultato = {}
+    for _id, liste in palmares.items():
+        campi = dict(liste)
+        for lista_campo, campo_contatore in CAMPI_LISTA.items():
+            campi[campo_contatore] = len(liste[lista_campo])
+        campi[CAMPO_CHIAVI] = chiavi[_id]
+        risultato[_id] = campi
+    return risultato
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ricostruisce il palmarès dei giocatori dai tornei conclusi.")
+    parser.add_argument("--club", choices=list(PLAYERS_COLLECTIONS), default="Superba",
+                        help="Club di cui ricostruire il palmarès")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processi paralleli per il calcolo dei vincitori")
+    parser.add_argument("--dry-run", action="store_true", help="Calcola e mostra il riepilogo senza scrivere sul DB")
+    args = parser.parse_args()
+
+    segreti = _leggi_segreti()
+    client = MongoClient(segreti["MONGO_URI"], tlsCAFile=certifi.where())
+    client_tornei = MongoClient(segreti.get("MONGO_URI_TOURNEMENTS", segreti["MONGO_URI"]), tlsCAFile=certifi.where())
+
+    documenti = list(documenti_conclusi(client_tornei, client, args.club))
+    print(f"[PALMARES REBUILD] {args.club}: tornei conclusi trovati: {len(documenti)}")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        vittorie = [v for lista in pool.map(vincitori_documento, documenti, chunksize=8) for v in lista]
+    print(f"[PALMARES REBUILD] Vittorie calcolate: {len(vittorie)}")
+
+    players_col = client[PLAYERS_DB][PLAYERS_COLLECTIONS[args.club]]
+    giocatori = list(players_col.find({}, {"Giocatore": 1, "Squadra": 1}))
+    palmares = calcola_palmares(vittorie, giocatori)
+
+    if args.dry_run:
+        for p in giocatori:
+            campi = palmares[p["_id"]]
+            totale = sum(campi[c] for c in CAMPI_LISTA.values())
+            if totale:
+                print(f"  {p.get('Giocatore')}: " + ", ".join(f"{c}={campi[c]}" for c in CAMPI_LISTA.values()))
+        return
+
+    operazioni = [UpdateOne({"_id": _id}, {"$set": campi}) for _id, campi in palmares.items()]
+    if operazioni:
+        risultato = players_col.bulk_write(operazioni, ordered=False)
+        print(f"[PALMARES REBUILD] Giocatori aggiornati: {risultato.modified_count} / {len(operazioni)}")
+
+
+if __name__ == "__main__":
+    main()
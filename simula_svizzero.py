@@ -0,0 +1,256 @@
+"""
+simula_svizzero.py — Simulatore headless del torneo svizzero per tarare le fasi di accoppiamento.
+
+Gioca migliaia di tornei sintetici in processi paralleli usando le stesse regole
+dell'app (common.accoppiamenti_svizzero) e confronta strategie di accoppiamento
+(soglie delle fasi potenziale / mix / classifica) e modelli di forza dei giocatori.
+
+Metriche riportate per strategia:
+  - fallback: quota di turni in cui è servito l'accoppiamento "permissivo"
+  - esauriti / turno esaurimento: tornei in cui gli incroci sono finiti e turno medio
+  - tempo ms/turno (medio e p95): tempo di ordinamento + riposo + accoppiamento
+  - accuratezza: correlazione di Spearman tra classifica finale e forza reale
+  - divario: differenza media di forza reale tra le due squadre di un incontro
+
+Uso:
+    python simula_svizzero.py [--tornei 2000] [--squadre 16] [--turni 7]
+                              [--strategie attuale,solo_classifica,3-5] [--modello potenziale_rumoroso]
+                              [--workers N] [--seed 0] [--json risultati.json]
+                              [--baseline riferimento.json] [--tolleranza 0.25]
+
+Con --baseline il simulatore funziona da test di regressione: termina con codice 1 se
+il tempo medio di accoppiamento peggiora oltre la tolleranza relativa o se la quota di
+fallback cresce oltre --tolleranza-fallback (assoluta).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.accoppiamenti_svizzero import (
+    BYE, fase_turno, ordina_squadre, scegli_riposo, accoppia, classifica_svizzera
+)
+
+# Soglie (ultimo turno "potenziale", ultimo turno "mix")
+STRATEGIE = {
+    "attuale": (2, 4),
+    "solo_classifica": (0, 0),
+    "solo_potenziale": (99, 99),
+    "potenziale_breve": (1, 2),
+    "mix_lungo": (2, 6),
+}
+
+MEDIA_GOL = 1.3
+# Sensibilità dei gol attesi alla differenza di forza (scala 0-10)
+BETA_FORZA = 0.25
+
+
+def _forza_uniforme(rng, n):
+    """Forza U(0, 10); il potenziale dichiarato è la forza arrotondata (informazione perfetta)."""
+    forza = rng.uniform(0, 10, n)
+    return forza, np.round(forza)
+
+
+def _forza_potenziale_rumoroso(rng, n):
+    """Forza N(5, 2); il potenziale dichiarato è la forza con errore N(0, 1.5), arrotondato."""
+    forza = np.clip(rng.normal(5, 2, n), 0, 10)
+    return forza, np.clip(np.round(forza + rng.normal(0, 1.5, n)), 0, 10)
+
+
+def _forza_potenziale_assente(rng, n):
+    """Forza N(5, 2); nessun potenziale inserito (tutti 5)."""
+    return np.clip(rng.normal(5, 2, n), 0, 10), np.full(n, 5.0)
+
+
+MODELLI_FORZA = {
+    "uniforme": _forza_uniforme,
+    "potenziale_rumoroso": _forza_potenziale_rumoroso,
+    "potenziale_assente": _forza_potenziale_assente,
+}
+
+
+def soglie_strategia(nome: str) -> tuple:
+    """Nome di STRATEGIE oppure soglie esplicite 'P-M' (es. '3-5')."""
+    if nome in STRATEGIE:
+        return STRATEGIE[nome]
+    fine_potenziale, fine_mix = (int(x) for x in nome.split("-"))
+    return fine_potenziale, fine_mix
+
+
+def _spearman(a, b) -> float:
+    ra = pd.Series(a).rank().to_numpy()
+    rb = pd.Series(b).rank().to_numpy()
+    if ra.std() == 0 or rb.std() == 0:
+        return float("nan")
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def simula_torneo(job: tuple) -> dict:
+    """
+    Gioca un torneo sintetico completo.
+
+    Args:
+        job: (nome strategia, soglie, nome modello di forza, numero squadre, numero turni, seed).
+
+    Returns:
+        Metriche del torneo.
+    """
+    strategia, soglie, modello, n_squadre, n_turni, seed = job
+    rng = np.random.default_rng(seed)
+    rnd = random.Random(seed)
+
+    forza_vera, potenziale = MODELLI_FORZA[modello](rng, n_squadre)
+    squadre = [f"S{i:02d}" for i in range(n_squadre)]
+    forza = dict(zip(squadre, forza_vera))
+    df_squadre = pd.DataFrame({"Squadra": squadre, "Potenziale": potenziale})
+
+    righe, precedenti, tempi, divari = [], set(), [], []
+    turni_fallback, esaurimento = 0, None
+    for turno in range(1, n_turni + 1):
+        fase = fase_turno(turno, soglie)
+        inizio = time.perf_counter()
+
+        classifica = df_squadre.copy()
+        if fase != "potenziale" and righe:
+            classifica = classifica_svizzera(pd.DataFrame(righe)).merge(df_squadre, on="Squadra", how="left")
+        classifica["Potenziale"] = pd.to_numeric(classifica["Potenziale"], errors="coerce").fillna(0)
+        classifica = ordina_squadre(fase, classifica)
+
+        lista = classifica["Squadra"].tolist()
+        riposa = None
+        if len(lista) % 2 != 0:
+            gia_riposo = {r["Casa"] for r in righe if r["Ospite"] == BYE}
+            riposa, _ = scegli_riposo(classifica, fase, gia_riposo)
+            lista.remove(riposa)
+        accoppiamenti, permissivo = accoppia(lista, precedenti, rnd)
+        tempi.append((time.perf_counter() - inizio) * 1000)
+
+        if accoppiamenti is None:
+            esaurimento = turno
+            break
+        turni_fallback += int(permissivo)
+
+        casa = np.array([forza[c] for c, _ in accoppiamenti])
+        ospite = np.array([forza[o] for _, o in accoppiamenti])
+        divari.extend(np.abs(casa - ospite).tolist())
+        gol_casa = rng.poisson(MEDIA_GOL * np.exp(BETA_FORZA * (casa - ospite) / 2))
+        gol_ospite = rng.poisson(MEDIA_GOL * np.exp(BETA_FORZA * (ospite - casa) / 2))
+        for (c, o), gc, go in zip(accoppiamenti, gol_casa, gol_ospite):
+            righe.append({"Casa": c, "Ospite": o, "GolCasa": int(gc), "GolOspite": int(go),
+                          "Validata": True, "Turno": turno})
+            precedenti.add(tuple(sorted((c, o))))
+        if riposa:
+            righe.append({"Casa": riposa, "Ospite": BYE, "GolCasa": 0, "GolOspite": 0,
+                          "Validata": True, "Turno": turno})
+            precedenti.add(tuple(sorted((riposa, BYE))))
+
+    finale = classifica_svizzera(pd.DataFrame(righe)) if righe else pd.DataFrame(columns=["Squadra"])
+    posizione = {s: i for i, s in enumerate(finale["Squadra"])}
+    ordine = [posizione.get(s, len(squadre)) for s in squadre]
+    return {
+        "strategia": strategia,
+        "turni": len(tempi) - (1 if esaurimento else 0),
+        "turni_fallback": turni_fallback,
+        "esaurimento": esaurimento,
+        "tempi_ms": tempi,
+        "accuratezza": _spearman(-forza_vera, ordine),
+        "divario": float(np.mean(divari)) if divari else float("nan"),
+    }
+
+
+def aggrega(risultati: list) -> dict:
+    """Aggrega le metriche dei singoli tornei per strategia."""
+    per_strategia = {}
+    for r in risultati:
+        per_strategia.setdefault(r["strategia"], []).append(r)
+
+    riepilogo = {}
+    for strategia, tornei in per_strategia.items():
+        tempi = np.concatenate([t["tempi_ms"] for t in tornei if t["tempi_ms"]])
+        turni = sum(t["turni"] for t in tornei)
+        esauriti = [t["esaurimento"] for t in tornei if t["esaurimento"]]
+        riepilogo[strategia] = {
+            "tornei": len(tornei),
+            "tasso_fallback": sum(t["turni_fallback"] for t in tornei) / turni if turni else 0.0,
+            "quota_esauriti": len(esauriti) / len(tornei),
+            "turno_esaurimento_medio": float(np.mean(esauriti)) if esauriti else None,
+            "tempo_medio_ms": float(tempi.mean()) if len(tempi) else 0.0,
+            "tempo_p95_ms": float(np.percentile(tempi, 95)) if len(tempi) else 0.0,
+            "accuratezza": float(np.nanmean([t["accuratezza"] for t in tornei])),
+            "divario_medio": float(np.nanmean([t["divario"] for t in tornei])),
+        }
+    return riepilogo
+
+
+def confronta_con_baseline(riepilogo: dict, baseline: dict, tolleranza: float, tolleranza_fallback: float) -> list:
+    """Ritorna l'elenco delle regressioni rispetto al riferimento (vuoto = nessuna)."""
+    regressioni = []
+    for strategia, metriche in riepilogo.items():
+        rif = baseline.get(strategia)
+        if not rif:
+            continue
+        if metriche["tempo_medio_ms"] > rif["tempo_medio_ms"] * (1 + tolleranza):
+            regressioni.append(f"{strategia}: tempo medio {metriche['tempo_medio_ms']:.2f} ms "
+                               f"> {rif['tempo_medio_ms']:.2f} ms (+{tolleranza:.0%})")
+        if metriche["tasso_fallback"] > rif["tasso_fallback"] + tolleranza_fallback:
+            regressioni.append(f"{strategia}: fallback {metriche['tasso_fallback']:.3f} "
+                               f"> {rif['tasso_fallback']:.3f} (+{tolleranza_fallback})")
+    return regressioni
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula tornei svizzeri per confrontare le strategie di accoppiamento.")
+    parser.add_argument("--tornei", type=int, default=2000, help="Tornei simulati per strategia")
+    parser.add_argument("--squadre", type=int, default=16, help="Squadre per torneo")
+    parser.add_argument("--turni", type=int, default=7, help="Turni per torneo")
+    parser.add_argument("--strategie", default="attuale", help=f"Elenco separato da virgole: {', '.join(STRATEGIE)} o soglie 'P-M'")
+    parser.add_argument("--modello", default="potenziale_rumoroso", choices=sorted(MODELLI_FORZA), help="Modello di forza dei giocatori")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processi paralleli")
+    parser.add_argument("--seed", type=int, default=0, help="Seme iniziale (stessi tornei per tutte le strategie)")
+    parser.add_argument("--json", help="Scrive il riepilogo in questo file JSON")
+    parser.add_argument("--baseline", help="Riepilogo JSON di riferimento per il controllo di regressione")
+    parser.add_argument("--tolleranza", type=float, default=0.25, help="Peggioramento relativo ammesso del tempo medio")
+    parser.add_argument("--tolleranza-fallback", type=float, default=0.02, help="Aumento assoluto ammesso della quota di fallback")
+    args = parser.parse_args()
+
+    strategie = [s.strip() for s in args.strategie.split(",") if s.strip()]
+    jobs = [
+        (strategia, soglie_strategia(strategia), args.modello, args.squadre, args.turni, args.seed + i)
+        for strategia in strategie
+        for i in range(args.tornei)
+    ]
+
+    inizio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        risultati = list(pool.map(simula_torneo, jobs, chunksize=max(1, len(jobs) // (4 * (args.workers or 1)))))
+    riepilogo = aggrega(risultati)
+    print(f"[SIMULATORE SVIZZERO] {len(jobs)} tornei in {time.perf_counter() - inizio:.1f} s "
+          f"({args.squadre} squadre, {args.turni} turni, modello {args.modello})")
+
+    tabella = pd.DataFrame(riepilogo).T
+    with pd.option_context("display.width", 160, "display.float_format", "{:.3f}".format):
+        print(tabella.to_string())
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(riepilogo, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressioni = confronta_con_baseline(riepilogo, baseline, args.tolleranza, args.tolleranza_fallback)
+        for r in regressioni:
+            print(f"[REGRESSIONE] {r}")
+        if regressioni:
+            sys.exit(1)
+        print("[SIMULATORE SVIZZERO] Nessuna regressione rispetto al riferimento.")
+
+
+if __name__ == "__main__":
+    main()
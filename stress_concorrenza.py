@@ -0,0 +1,179 @@
+"""
+stress_concorrenza.py — Stress test dei salvataggi concorrenti di più arbitri sullo stesso torneo.
+
+Simula più tablet che inseriscono risultati in giornate diverse dello stesso torneo
+all'italiana, ognuno con la propria copia (non aggiornata) del calendario, usando lo
+stesso protocollo dell'app (common.concorrenza.salva_calendario_versionato). Alla fine
+verifica che sul DB ci sia, per ogni partita, l'ultimo risultato inserito dal suo
+arbitro: nessun risultato deve andare perso.
+
+Uso:
+    python stress_concorrenza.py [--uri mongodb://localhost:27017] [--mongomock]
+                                 [--arbitri 8] [--salvataggi 50] [--gironi 4] [--squadre 6]
+                                 [--seed 0] [--senza-rev]
+
+Con --mongomock usa un DB in memoria (pacchetto mongomock, non incluso nei requisiti)
+al posto di un'istanza MongoDB locale; con --senza-rev ripete il test con il vecchio
+salvataggio "cieco" ($set dell'intero calendario) per confronto.
+Termina con codice 1 se qualche risultato è andato perso.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+from common.concorrenza import CAMPO_REV, chiave_partita, salva_calendario_versionato
+
+DB_STRESS = "StressConcorrenza"
+COLLECTION_STRESS = "tornei"
+
+
+class _CollectionAtomica:
+    """
+    Serializza le operazioni di mongomock: MongoDB garantisce l'atomicità delle scritture
+    su un singolo documento, il DB in memoria no.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._lock = threading.Lock()
+
+    def __getattr__(self, nome):
+        metodo = getattr(self._collection, nome)
+
+        def atomico(*args, **kwargs):
+            with self._lock:
+                return metodo(*args, **kwargs)
+        return atomico
+
+
+def genera_calendario(n_gironi: int, n_squadre: int) -> list:
+    """Calendario all'italiana (solo andata, metodo del cerchio) a risultati vuoti."""
+    partite = []
+    for g in range(1, n_gironi + 1):
+        squadre = [f"G{g}S{i}" for i in range(n_squadre + n_squadre % 2)]
+        for giornata in range(1, len(squadre)):
+            for i in range(len(squadre) // 2):
+                casa, ospite = squadre[i], squadre[-(i + 1)]
+                if f"G{g}S{n_squadre}" in (casa, ospite):
+                    continue  # riposo con numero di squadre dispari
+                partite.append({"Girone": f"Girone {g}", "Giornata": giornata, "Casa": casa,
+                                "Ospite": ospite, "GolCasa": 0, "GolOspite": 0, "Valida": False})
+            squadre = [squadre[0]] + [squadre[-1]] + squadre[1:-1]
+    return partite
+
+
+def arbitro(collection, filtro, giornate, n_salvataggi, seed, senza_rev, attesi, statistiche, lock, via):
+    """Thread di un arbitro: salva `n_salvataggi` volte i risultati delle sue giornate."""
+    rnd = random.Random(seed)
+    documento = collection.find_one(filtro)
+    base = documento["calendario"]
+    calendario = list(base)
+    rev = documento.get(CAMPO_REV, 0)
+    mie = [i for i, p in enumerate(calendario) if (p["Girone"], p["Giornata"]) in giornate]
+    via.wait()
+
+    for _ in range(n_salvataggi):
+        i = rnd.choice(mie)
+        partita = {**calendario[i], "GolCasa": rnd.randint(0, 6), "GolOspite": rnd.randint(0, 6), "Valida": True}
+        precedente = calendario
+        calendario = calendario[:i] + [partita] + calendario[i + 1:]
+
+        inizio = time.perf_counter()
+        if senza_rev:
+            collection.update_one(filtro, {"$set": {"calendario": calendario, "data_modifica": datetime.now()}})
+            esito = {"conflitti": 0, "sovrascritte": []}
+        else:
+            esito = salva_calendario_versionato(collection, filtro, base, calendario, rev,
+                                                campi={"data_modifica": datetime.now()})
+        durata = time.perf_counter() - inizio
+
+        with lock:
+            statistiche["salvataggi"] += 1
+            statistiche["tempi"].append(durata)
+            if esito is None:
+                # Salvataggio segnalato come fallito: il risultato non è atteso sul DB e
+                # non deve ricomparire nei salvataggi successivi dello stesso arbitro
+                statistiche["falliti"] += 1
+                calendario = precedente
+                continue
+            statistiche["conflitti"] += esito["conflitti"]
+            statistiche["sovrascritte"] += len(esito["sovrascritte"])
+            attesi[chiave_partita(partita)] = (partita["GolCasa"], partita["GolOspite"])
+        if not senza_rev:
+            base = calendario = esito["calendario"]
+            rev = esito["rev"]
+
+
+def esegui(collection, args, senza_rev: bool) -> int:
+    """Esegue una prova completa e ritorna il numero di risultati persi."""
+    calendario = genera_calendario(args.gironi, args.squadre)
+    filtro = {"_id": collection.insert_one({"nome_torneo": "stress", "calendario": calendario,
+                                            CAMPO_REV: 0, "data_modifica": datetime.now()}).inserted_id}
+
+    # Giornate distribuite a rotazione tra gli arbitri (nessuna partita condivisa)
+    giornate = sorted({(p["Girone"], p["Giornata"]) for p in calendario})
+    assegnate = [set(giornate[i::args.arbitri]) for i in range(args.arbitri) if giornate[i::args.arbitri]]
+
+    attesi, lock, via = {}, threading.Lock(), threading.Barrier(len(assegnate))
+    statistiche = {"salvataggi": 0, "conflitti": 0, "sovrascritte": 0, "falliti": 0, "tempi": []}
+    threads = [
+        threading.Thread(target=arbitro, args=(collection, filtro, assegnate[i], args.salvataggi,
+                                               args.seed + i, senza_rev, attesi, statistiche, lock, via))
+        for i in range(len(assegnate))
+    ]
+    inizio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durata = time.perf_counter() - inizio
+
+    finale = {chiave_partita(p): (p["GolCasa"], p["GolOspite"]) for p in collection.find_one(filtro)["calendario"]}
+    persi = [k for k, risultato in attesi.items() if finale.get(k) != risultato]
+    collection.delete_one(filtro)
+
+    tempi = sorted(statistiche["tempi"])
+    modo = "senza rev" if senza_rev else "versionato"
+    print(f"[STRESS {modo}] {len(threads)} arbitri, {statistiche['salvataggi']} salvataggi in {durata:.2f} s "
+          f"(p50 {tempi[len(tempi) // 2] * 1000:.1f} ms, p95 {tempi[int(len(tempi) * 0.95)] * 1000:.1f} ms)")
+    print(f"[STRESS {modo}] conflitti risolti: {statistiche['conflitti']}, partite sovrascritte: "
+          f"{statistiche['sovrascritte']}, salvataggi falliti: {statistiche['falliti']}, "
+          f"risultati persi: {len(persi)}/{len(attesi)}")
+    return len(persi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test dei salvataggi concorrenti sullo stesso torneo.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB locale da usare")
+    parser.add_argument("--mongomock", action="store_true", help="Usa un DB in memoria (mongomock)")
+    parser.add_argument("--arbitri", type=int, default=8, help="Sessioni (thread) concorrenti")
+    parser.add_argument("--salvataggi", type=int, default=50, help="Salvataggi per arbitro")
+    parser.add_argument("--gironi", type=int, default=4, help="Gironi del torneo")
+    parser.add_argument("--squadre", type=int, default=6, help="Squadre per girone")
+    parser.add_argument("--seed", type=int, default=0, help="Seme dei risultati casuali")
+    parser.add_argument("--senza-rev", action="store_true", help="Ripete il test anche con il salvataggio cieco")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ --mongomock richiede il pacchetto mongomock (pip install mongomock)")
+        collection = _CollectionAtomica(mongomock.MongoClient()[DB_STRESS][COLLECTION_STRESS])
+    else:
+        from pymongo import MongoClient
+        collection = MongoClient(args.uri, serverSelectionTimeoutMS=5000)[DB_STRESS][COLLECTION_STRESS]
+
+    persi = esegui(collection, args, senza_rev=False)
+    if args.senza_rev:
+        esegui(collection, args, senza_rev=True)
+    if persi:
+        sys.exit(1)
+    print("[STRESS] Nessun risultato perso.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import json
 import time
 from pymongo import MongoClient
 from pymongo.server_api import ServerApi
+from common.classifica import calcola_classifica
 
 
 
@@ -155,54 +156,13 @@ def aggiorna_classifica(df):
     if 'Girone' not in df.columns:
         return pd.DataFrame()
 
-    gironi = df['Girone'].dropna().unique()
-    classifiche = []
-
-    for girone in gironi:
-        partite = df[(df['Girone'] == girone) & (df['Valida'] == True)]
-        if partite.empty:
-            continue
-        squadre = pd.unique(partite[['Casa','Ospite']].values.ravel())
-        stats = {s: {'Punti':0,'V':0,'P':0,'S':0,'GF':0,'GS':0,'DR':0} for s in squadre}
-
-        for _, r in partite.iterrows():
-            try:
-                gc, go = int(r['GolCasa']), int(r['GolOspite'])
-            except:
-                gc, go = 0, 0
-            casa, ospite = r['Casa'], r['Ospite']
-            stats[casa]['GF'] += gc
-            stats[casa]['GS'] += go
-            stats[ospite]['GF'] += go
-            stats[ospite]['GS'] += gc
-
-            if gc > go:
-                stats[casa]['Punti'] += 2
-                stats[casa]['V'] += 1
-                stats[ospite]['S'] += 1
-            elif gc < go:
-                stats[ospite]['Punti'] += 2
-                stats[ospite]['V'] += 1
-                stats[casa]['S'] += 1
-            else:
-                stats[casa]['Punti'] += 1
-                stats[ospite]['Punti'] += 1
-                stats[casa]['P'] += 1
-                stats[ospite]['P'] += 1
-
-        for s in squadre:
-            stats[s]['DR'] = stats[s]['GF'] - stats[s]['GS']
-
-        df_stat = pd.DataFrame.from_dict(stats, orient='index').reset_index().rename(columns={'index':'Squadra'})
-        df_stat['Girone'] = girone
-        classifiche.append(df_stat)
-
-    if len(classifiche) == 0:
+    # Conta solo Valida == True, come in origine (non 'true', 'si', ... accettati da to_bool_series)
+    df_classifica = calcola_classifica(df.assign(Valida=df['Valida'] == True), gruppo='Girone',
+                                       col_valida='Valida', spareggi=('Punti', 'DR'))
+    if df_classifica.empty:
         return None
-
-    df_classifica = pd.concat(classifiche, ignore_index=True)
-    df_classifica = df_classifica.sort_values(by=['Girone','Punti','DR'], ascending=[True,False,False])
-    return df_classifica
+    # P = pareggi, S = sconfitte
+    return df_classifica.rename(columns={'N': 'P'})[['Squadra', 'Punti', 'V', 'P', 'S', 'GF', 'GS', 'DR', 'Girone']]
 
 def esporta_pdf(df_torneo, df_classifica):
     pdf = FPDF(orientation='P', unit='mm', format='A4')
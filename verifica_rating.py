@@ -0,0 +1,151 @@
+"""
+verifica_rating.py — Verifica del motore Elo (common.rating) su un fixture noto.
+
+Carica su un DB di prova un campionato all'italiana e un torneo svizzero (con riposo)
+dai risultati fissati qui sotto, aggiorna il rating con aggiorna_rating_da_db() come fa
+l'app e lo confronta con un calcolo Elo di riferimento, scritto con un semplice ciclo
+giornata per giornata. Ripete il confronto dopo le operazioni che l'aggiornamento
+incrementale deve gestire:
+  - salvataggio della copia "completato_<nome>" a fine campionato (nessun incontro ripetuto)
+  - correzione di un risultato già applicato (ricalcolo completo)
+  - partita non più validata (ricalcolo completo)
+
+Uso:
+    python verifica_rating.py [--uri mongodb://localhost:27017] [--mongomock]
+
+Termina con codice 1 se un rating non coincide con il riferimento.
+"""
+import argparse
+import copy
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+from common.rating import ELO_BASE, ELO_K, aggiorna_rating_da_db, stato_vuoto
+
+DB_VERIFICA = "VerificaRating"
+GIOCATORI = {"Juventus": "Anna", "Milan": "Bruno", "Inter": "Carlo", "Torino": "Dario"}
+
+# (giornata, casa, ospite, gol casa, gol ospite)
+CAMPIONATO = [
+    (1, "Juventus", "Milan", 2, 0), (1, "Inter", "Torino", 1, 1),
+    (2, "Juventus", "Inter", 0, 1), (2, "Milan", "Torino", 3, 2),
+    (3, "Juventus", "Torino", 2, 2), (3, "Milan", "Inter", 0, 0),
+]
+# (turno, casa, ospite, gol casa, gol ospite); "RIPOSA" non conta per il rating
+SVIZZERO = [
+    (1, "Juventus", "Inter", 1, 0), (1, "Milan", "RIPOSA", 0, 0),
+    (2, "Milan", "Juventus", 2, 1), (2, "Inter", "RIPOSA", 0, 0),
+    (3, "Inter", "Milan", 1, 3), (3, "Torino", "Juventus", 0, 0),
+]
+
+
+def elo_riferimento(tornei: list) -> dict:
+    """Elo con un ciclo per incontro; gli attesi di una giornata usano i rating di inizio giornata."""
+    rating = {}
+    for partite in tornei:
+        for giornata in sorted({p[0] for p in partite}):
+            inizio = dict(rating)
+            for _, casa, ospite, gc, go in (p for p in partite if p[0] == giornata):
+                if "RIPOSA" in (casa, ospite):
+                    continue
+                a, b = GIOCATORI[casa], GIOCATORI[ospite]
+                ra, rb = inizio.get(a, ELO_BASE), inizio.get(b, ELO_BASE)
+                atteso = 1 / (1 + 10 ** ((rb - ra) / 400))
+                esito = 1.0 if gc > go else 0.0 if gc < go else 0.5
+                rating[a] = rating.get(a, ELO_BASE) + ELO_K * (esito - atteso)
+                rating[b] = rating.get(b, ELO_BASE) - ELO_K * (esito - atteso)
+    return rating
+
+
+def calendario(partite: list, non_validate=()) -> list:
+    """Righe del calendario Italiana ('Squadra-Giocatore' come nell'app)."""
+    return [{"Girone": "Girone 1", "Giornata": g, "Casa": f"{c}-{GIOCATORI[c]}", "Ospite": f"{o}-{GIOCATORI[o]}",
+             "GolCasa": gc, "GolOspite": go, "Valida": (g, c, o) not in non_validate}
+            for g, c, o, gc, go in partite]
+
+
+def confronta(passo: str, stato: dict, campionato: list) -> bool:
+    attesi = elo_riferimento([campionato, SVIZZERO])
+    ottenuti = stato["rating"]
+    errori = {g: (ottenuti.get(g), r) for g, r in attesi.items() if abs(ottenuti.get(g, float("nan")) - r) > 1e-9}
+    if errori or set(ottenuti) != set(attesi):
+        print(f"❌ [{passo}] rating diversi dal riferimento (ottenuto, atteso): {errori or ottenuti}")
+        return False
+    print(f"[OK] {passo}: " + ", ".join(f"{g} {r:.2f}" for g, r in sorted(ottenuti.items())))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica del motore Elo su un fixture noto.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB locale da usare")
+    parser.add_argument("--mongomock", action="store_true", help="Usa un DB in memoria (mongomock)")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("❌ --mongomock richiede il pacchetto mongomock (pip install mongomock)")
+        db = mongomock.MongoClient()[DB_VERIFICA]
+    else:
+        from pymongo import MongoClient
+        db = MongoClient(args.uri, serverSelectionTimeoutMS=5000)[DB_VERIFICA]
+
+    italiana, svizzero = db["tornei"], db["torneiSvizzero"]
+    originale = ObjectId.from_datetime(datetime(2025, 1, 10))
+    italiana.insert_one({"_id": originale, "nome_torneo": "Coppa Autunno",
+                         "calendario": calendario(CAMPIONATO), "data_modifica": datetime(2025, 1, 20)})
+    svizzero.insert_one({"_id": ObjectId.from_datetime(datetime(2025, 2, 1)), "nome_torneo": "Svizzero Inverno",
+                         "df_torneo": [{"Turno": t, "Casa": c, "Ospite": o, "GolCasa": gc, "GolOspite": go,
+                                        "Validata": True} for t, c, o, gc, go in SVIZZERO],
+                         "df_squadre": [{"Squadra": s, "Giocatore": g} for s, g in GIOCATORI.items()],
+                         "data_modifica": datetime(2025, 2, 10)})
+
+    def aggiorna(stato):
+        return aggiorna_rating_da_db(stato, [italiana], [svizzero])
+
+    esiti = []
+    try:
+        stato = aggiorna(stato_vuoto())
+        esiti.append(confronta("lettura completa", stato, CAMPIONATO))
+
+        # Fine campionato: l'app inserisce una copia "completato_" e lascia l'originale
+        italiana.insert_one({"_id": ObjectId.from_datetime(datetime(2025, 3, 1)),
+                             "nome_torneo": "completato_Coppa Autunno",
+                             "calendario": calendario(CAMPIONATO), "data_modifica": datetime(2025, 3, 1)})
+        partite_prima = dict(stato["partite"])
+        aggiorna(stato)
+        esiti.append(confronta("copia completato_", stato, CAMPIONATO)
+                     and stato["partite"] == partite_prima)
+
+        # Correzione di un risultato già applicato nell'originale
+        corretto = copy.deepcopy(CAMPIONATO)
+        corretto[0] = (1, "Juventus", "Milan", 0, 2)
+        italiana.update_one({"_id": originale}, {"$set": {"calendario": calendario(corretto),
+                                                          "data_modifica": datetime(2025, 3, 5)}})
+        aggiorna(stato)
+        esiti.append(confronta("risultato corretto", stato, corretto))
+
+        # Partita non più validata
+        italiana.update_one({"_id": originale}, {"$set": {
+            "calendario": calendario(corretto, non_validate={(3, "Milan", "Inter")}),
+            "data_modifica": datetime(2025, 3, 6)}})
+        aggiorna(stato)
+        esiti.append(confronta("partita non validata", stato, [p for p in corretto if p[0:3] != (3, "Milan", "Inter")]))
+
+        # Nessuna modifica: l'aggiornamento non cambia nulla
+        rating_prima = dict(stato["rating"])
+        aggiorna(stato)
+        esiti.append(stato["rating"] == rating_prima)
+    finally:
+        db.client.drop_database(DB_VERIFICA)
+
+    if not all(esiti):
+        sys.exit(1)
+    print("[VERIFICA RATING] Tutti i passi coincidono con il riferimento")
+
+
+if __name__ == "__main__":
+    main()